@@ -0,0 +1,5 @@
+import sys
+
+from boxDetector.commandLine import main
+
+sys.exit(main())
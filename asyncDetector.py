@@ -0,0 +1,211 @@
+"""Async detection
+    get_filled_contours_from_buffer for asyncio code, the decode and the
+    contour analysis run on an executor so the event loop is never
+    blocked.
+
+    Requests wait on a bounded queue, detect raises DetectorBusy when it
+    is full instead of letting the latency grow, and every request has a
+    timeout covering its wait and its run. A fixed number of dispatchers
+    take the requests, so at most that many run at once. Small images
+    waiting together are sent to the executor as a single batch, one
+    executor round trip for many uploads.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+
+from boxDetector.checkBoxDetector import get_filled_contours_from_buffer
+
+
+class DetectorBusy(Exception):
+    """The request queue is full"""
+
+
+def detect_buffers(requests):
+    """Boxes of every (buffer, params) request, run on the executor
+
+    Returns:
+        List[Tuple(List,Exception)]: boxes and error of each request, one
+            of them is None
+    """
+    results = []
+    for buffer, params in requests:
+        try:
+            results.append((get_filled_contours_from_buffer(buffer, **params), None))
+        except Exception as error:
+            results.append((None, error))
+    return results
+
+
+class AsyncDetector:
+
+    """Bounded queue of detection requests served by an executor
+
+    Attributes:
+        workers (int): dispatchers, the max batches running at once
+        processes (bool): run on a process pool instead of threads
+        max_queue (int): requests waiting before DetectorBusy
+        timeout (float): default seconds of a request, None waits forever
+        batch_size (int): max small requests run together
+        batch_delay (float): seconds a small request waits for others
+        small_bytes (int): max encoded size of a request to be batched
+        params (dict): get_filled_contours_from_buffer default arguments
+        completed (int): requests answered
+        rejected (int): requests refused with DetectorBusy
+        timeouts (int): requests over their timeout
+        batches (int): executor calls
+    """
+
+    def __init__(self, workers=None, processes=False, max_queue=64, timeout=30.0,
+                 batch_size=8, batch_delay=0.002, small_bytes=64*1024, executor=None, **params):
+        """
+        Args:
+            executor (Executor): optional executor to use, it is not shut
+                down on close
+            the others are the attributes
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.processes = processes
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.batch_size = max(batch_size, 1)
+        self.batch_delay = batch_delay
+        self.small_bytes = small_bytes
+        self.params = params
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.batches = 0
+        self._executor = executor
+        self._own_executor = executor is None
+        self._queue = None
+        self._tasks = None
+
+    async def start(self):
+        """Start the dispatchers on the running loop"""
+        if self._tasks is not None:
+            return
+        if self._executor is None:
+            pool = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+            self._executor = pool(max_workers=self.workers)
+        self._queue = asyncio.Queue(self.max_queue)
+        self._tasks = [asyncio.ensure_future(self._dispatch()) for _ in range(self.workers)]
+
+    async def close(self):
+        """Stop the dispatchers, the queued requests are cancelled"""
+        if self._tasks is None:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = None
+        while not self._queue.empty():
+            self._queue.get_nowait()[2].cancel()
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def queued(self):
+        """Requests waiting for a dispatcher"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def detect(self, buffer, timeout=None, wait=False, **params):
+        """Filled boxes of an encoded image
+
+        Args:
+            buffer (bytes): encoded image
+            timeout (float): seconds before asyncio.TimeoutError, the
+                detector timeout by default
+            wait (bool): wait for room on a full queue instead of raising
+                DetectorBusy
+            params: get_filled_contours_from_buffer keyword arguments
+        Returns:
+            List: the boxes
+        """
+        if self._tasks is None:
+            raise RuntimeError("The detector is not started")
+        if self.processes:
+            buffer = bytes(buffer)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        request = (buffer, dict(self.params, **params), future)
+        timeout = self.timeout if timeout is None else timeout
+        # One deadline for the wait on a full queue and the run
+        deadline = None if timeout is None else loop.time() + timeout
+        try:
+            if wait:
+                await asyncio.wait_for(self._submit(request), timeout)
+            else:
+                self._submit_nowait(request)
+            remaining = None if deadline is None else max(deadline - loop.time(), 0)
+            # The queued request is skipped once its future is cancelled
+            return await asyncio.wait_for(future, remaining)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            future.cancel()
+            raise
+
+    async def _submit(self, request):
+        await self._queue.put(request)
+
+    def _submit_nowait(self, request):
+        try:
+            self._queue.put_nowait(request)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise DetectorBusy("%d requests are waiting" % self.max_queue)
+
+    def _is_small(self, request):
+        return len(request[0]) <= self.small_bytes
+
+    async def _dispatch(self):
+        leftover = None
+        while True:
+            if leftover is not None:
+                batch, leftover = [leftover], None
+            else:
+                batch = [await self._queue.get()]
+            if self._is_small(batch[0]) and self.batch_size > 1:
+                if self.batch_delay and self._queue.empty():
+                    await asyncio.sleep(self.batch_delay)
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    request = self._queue.get_nowait()
+                    if not self._is_small(request):
+                        # A big image runs on its own, right after the batch
+                        leftover = request
+                        break
+                    batch.append(request)
+            await self._run(batch)
+
+    async def _run(self, batch):
+        batch = [request for request in batch if not request[2].done()]
+        if not batch:
+            return
+        self.batches += 1
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self._executor, detect_buffers, [(buffer, params) for buffer, params, _ in batch])
+        except asyncio.CancelledError:
+            for _, _, future in batch:
+                future.cancel()
+            raise
+        except Exception as error:
+            # The executor itself failed, e.g. a killed worker process
+            results = [(None, error)]*len(batch)
+        for (_, _, future), (boxes, error) in zip(batch, results):
+            if future.done():
+                continue
+            self.completed += 1
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(boxes)
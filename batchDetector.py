@@ -0,0 +1,107 @@
+"""Batch detection
+    This module runs get_filled_contours over many images using a pool
+    of worker processes.
+
+    Every image gives a BatchResult, an image that fails gets its error
+    on the result instead of stopping the batch. At most max_in_flight
+    images are submitted at once so only that many images are decoded
+    or waiting to be consumed at any time.
+"""
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import os
+from time import perf_counter
+
+from boxDetector.checkBoxDetector import get_filled_contours
+from boxDetector.detectionStats import DetectionStats
+
+BatchResult = namedtuple("BatchResult", "index img_path boxes error stats seconds")
+
+
+def detect_image(img_path, params, collect_stats=False):
+    """Run get_filled_contours catching the error
+
+    Args:
+        img_path (str): image path
+        params (dict): get_filled_contours keyword arguments
+        collect_stats (bool): also time the image stages
+    Returns:
+        Tuple(List,str,dict,float): boxes and the error message, one of
+            them is None, the DetectionStats.as_dict of the image when
+            collect_stats is set and the wall seconds of the image
+    """
+    stats = None
+    if collect_stats:
+        stats = DetectionStats()
+        params = dict(params, stats=stats)
+    start = perf_counter()
+    try:
+        boxes, error = get_filled_contours(img_path, **params), None
+    except Exception as failure:
+        boxes, error = None, "%s: %s" % (type(failure).__name__, failure)
+    seconds = perf_counter() - start
+    return boxes, error, None if stats is None else stats.as_dict(), seconds
+
+
+def get_filled_contours_batch(img_paths, workers=None, ordered=True, max_in_flight=None, collect_stats=False, **params):
+    """Detect the filled boxes of many images on worker processes
+
+    Args:
+        img_paths (Iterable[str]): image paths, read lazily
+        workers (int): number of processes, defaults to the cpu count
+        ordered (bool): yield on the input order, otherwise as they complete
+        max_in_flight (int): max images submitted and not yet yielded,
+            defaults to twice the workers
+        collect_stats (bool): fill the stats of every result, see detect_image
+        params: get_filled_contours keyword arguments
+    Yields:
+        BatchResult: one per image
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max(max_in_flight or 2*workers, 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        try:
+            for result in _run_batch(pool, running, img_paths, ordered, max_in_flight,
+                                     collect_stats, params):
+                yield result
+        finally:
+            # Stopping early should not wait for the images not started
+            for future in running:
+                future.cancel()
+
+
+def _run_batch(pool, running, img_paths, ordered, max_in_flight, collect_stats, params):
+    paths = enumerate(img_paths)
+    done = {}
+    next_index = 0
+    exhausted = False
+    while True:
+        # Finished results waiting for their turn count as in flight
+        while not exhausted and len(running) + len(done) < max_in_flight:
+            item = next(paths, None)
+            if item is None:
+                exhausted = True
+                break
+            index, img_path = item
+            future = pool.submit(detect_image, img_path, params, collect_stats)
+            running[future] = (index, img_path)
+        if not running and not done:
+            return
+        if running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index, img_path = running.pop(future)
+                try:
+                    boxes, error, stats, seconds = future.result()
+                except Exception as failure:
+                    # the worker itself failed, e.g. it was killed
+                    boxes, error, stats, seconds = None, "%s: %s" % (type(failure).__name__, failure), None, None
+                done[index] = BatchResult(index, img_path, boxes, error, stats, seconds)
+        if ordered:
+            while next_index in done:
+                yield done.pop(next_index)
+                next_index += 1
+        else:
+            for index in sorted(done):
+                yield done.pop(index)
@@ -0,0 +1,103 @@
+"""Import time benchmark
+    Cold start time of the package modules, each one imported on a fresh
+    interpreter, and whether the import loaded OpenCV.
+
+    The point list modules must not load cv2, the run fails when one does
+    or when an import is over --max-ms.
+
+    python -m boxDetector.benchmark.importTime --repeat 5 --max-ms 150
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Modules whose import must not load cv2
+LIGHT_MODULES = (
+    "boxDetector.boxGeometry",
+    "boxDetector.checkBoxDetector",
+    "boxDetector.contourArray",
+    "boxDetector.lineSegment",
+)
+REFERENCE_MODULES = ("numpy", "cv2")
+
+CHILD = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "cv2": "cv2" in sys.modules}))
+"""
+
+
+def child_env():
+    """Environment of the child interpreters, with the current sys.path"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(path for path in sys.path if path)
+    return env
+
+
+def import_time(module, repeat=3, env=None):
+    """Best import time of a module over repeat fresh interpreters
+
+    Returns:
+        dict: seconds and whether cv2 was loaded
+    """
+    env = env or child_env()
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD, module], env=env, check=True,
+            stdout=subprocess.PIPE, universal_newlines=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+def run(modules=LIGHT_MODULES, repeat=3, max_ms=None):
+    """Import time of the reference and package modules
+
+    Args:
+        modules (Iterable[str]): modules that must not load cv2
+        repeat (int): interpreters started per module
+        max_ms (float): optional import time budget of every module
+    Returns:
+        dict: times plus the failures, empty when the budget holds
+    """
+    env = child_env()
+    reference = dict((module, import_time(module, repeat, env)) for module in REFERENCE_MODULES)
+    results = dict((module, import_time(module, repeat, env)) for module in modules)
+    failures = []
+    for module, result in sorted(results.items()):
+        if result["cv2"]:
+            failures.append("%s loads cv2" % module)
+        if max_ms is not None and result["seconds"]*1000 > max_ms:
+            failures.append("%s took %.1fms, over %.1fms" % (module, result["seconds"]*1000, max_ms))
+    return {
+        "python": sys.version.split()[0],
+        "reference": reference,
+        "modules": results,
+        "failures": failures,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Box detector import time")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-ms", type=float, help="import time budget of every module")
+    parser.add_argument("--output", help="result file, stdout by default")
+    args = parser.parse_args(argv)
+    result = run(repeat=args.repeat, max_ms=args.max_ms)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=2, sort_keys=True)
+    else:
+        json.dump(result, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
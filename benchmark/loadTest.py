@@ -0,0 +1,153 @@
+"""Load test
+    Concurrent uploads of synthetic pages to the HTTP service, with the
+    latency percentiles and the answer of every status.
+
+    Without --port an in-process service is started on a free port, so
+    the whole test runs on one machine:
+
+    python -m boxDetector.benchmark.loadTest --concurrency 32 --requests 500 -j 4
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from boxDetector.asyncDetector import AsyncDetector
+from boxDetector.benchmark.syntheticPage import make_page
+from boxDetector.httpService import serve
+
+
+async def post(reader, writer, path, body, host="127.0.0.1"):
+    """Send a keep-alive POST and read its answer
+
+    Returns:
+        Tuple(int,dict): status and JSON payload
+    """
+    writer.write(("POST %s HTTP/1.1\r\nHost: %s\r\nContent-Length: %d\r\n\r\n"
+                  % (path, host, len(body))).encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads((await reader.readexactly(length)).decode())
+
+
+def percentiles(latencies):
+    if not latencies:
+        return {}
+    values = np.percentile(latencies, [50, 95, 99])
+    return {"p50": values[0], "p95": values[1], "p99": values[2], "max": max(latencies)}
+
+
+async def load(host, port, bodies, concurrency=16, requests=200, path="/detect"):
+    """Send requests uploads over concurrency keep-alive connections
+
+    Returns:
+        dict: statuses, latency percentiles in seconds and throughput
+    """
+    latencies = []
+    statuses = {}
+    counter = iter(range(requests))
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for number in counter:
+                start = time.perf_counter()
+                status, _ = await post(reader, writer, path, bodies[number % len(bodies)], host)
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    seconds = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": seconds,
+        "per_second": requests/seconds if seconds > 0 else None,
+        "statuses": dict((str(status), count) for status, count in sorted(statuses.items())),
+        "latency": percentiles(latencies),
+    }
+
+
+def make_bodies(pages=4, seed=0, width=600, height=800, checkboxes=12):
+    """PNG bodies of synthetic pages"""
+    bodies = []
+    for number in range(pages):
+        page = make_page(seed=seed + number, width=width, height=height,
+                         checkboxes=checkboxes, distractors=4)
+        bodies.append(cv2.imencode(".png", page.img)[1].tobytes())
+    return bodies
+
+
+async def run(host=None, port=None, concurrency=16, requests=200, pages=4, seed=0,
+              width=600, height=800, checkboxes=12, path="/detect", **detector_params):
+    """Load test a running service, or one started here when port is None
+
+    Args:
+        detector_params: AsyncDetector arguments of the in-process service
+    """
+    bodies = make_bodies(pages, seed, width, height, checkboxes)
+    if port is not None:
+        return await load(host or "127.0.0.1", port, bodies, concurrency, requests, path)
+    async with AsyncDetector(**detector_params) as detector:
+        server = await serve(detector, "127.0.0.1", 0)
+        try:
+            port = server.sockets[0].getsockname()[1]
+            result = await load("127.0.0.1", port, bodies, concurrency, requests, path)
+        finally:
+            server.close()
+            await server.wait_closed()
+        result["detector"] = {"completed": detector.completed, "rejected": detector.rejected,
+                              "timeouts": detector.timeouts, "batches": detector.batches}
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Box detector HTTP load test")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="running service, one is started by default")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--width", type=int, default=600)
+    parser.add_argument("--height", type=int, default=800)
+    parser.add_argument("--checkboxes", type=int, default=12)
+    parser.add_argument("-j", "--workers", type=int, help="in-process service workers")
+    parser.add_argument("--processes", action="store_true")
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--output", help="result file, stdout by default")
+    args = parser.parse_args(argv)
+    detector_params = {}
+    if args.port is None:
+        detector_params = dict(workers=args.workers, processes=args.processes,
+                               max_queue=args.max_queue, batch_size=args.batch_size)
+    result = asyncio.run(run(
+        args.host, args.port, concurrency=args.concurrency, requests=args.requests,
+        pages=args.pages, seed=args.seed, width=args.width, height=args.height,
+        checkboxes=args.checkboxes, **detector_params))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=2, sort_keys=True)
+    else:
+        json.dump(result, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
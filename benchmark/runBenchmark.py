@@ -0,0 +1,253 @@
+"""Benchmark suite
+    Times the detection stages on synthetic pages and writes a JSON result
+    file that can be compared between runs.
+
+    python -m boxDetector.benchmark.runBenchmark --pages 5 --output result.json
+"""
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from boxDetector.benchmark.syntheticPage import make_page, match_boxes
+from boxDetector.checkBoxDetector import (
+    build_segments_angle_map,
+    filled_candidates,
+    flatten_angles,
+    flatten_line_segment,
+    get_filled_contours_from_image,
+    getRadAngle,
+    is_boxy
+)
+from boxDetector.contourArray import is_boxy_many, pack_contours
+from boxDetector.shapeEngines import ENGINES
+
+
+def best_time(func, repeat=3):
+    """Best wall time of func over repeat runs, with its last result"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def stage_result(seconds, items, unit):
+    return {
+        "seconds": seconds,
+        "items": items,
+        "unit": unit,
+        "per_second": items/seconds if seconds > 0 else None,
+    }
+
+
+def page_contours(img):
+    """All findContours contours of a page and the filled candidates"""
+    ret, thresh = cv2.threshold(img, 127, 255, 0)
+    contours, hierarchy = cv2.findContours(thresh, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)[-2:]
+    if hierarchy is None:
+        return contours, []
+    return contours, [cnt for cnt, _ in filled_candidates(contours, hierarchy)]
+
+
+def time_stages(candidates, repeat=3):
+    """Time every is_boxy stage over the candidate contours"""
+    results = {}
+    rad_angle_epsilon = getRadAngle(8)
+    seconds, maps = best_time(
+        lambda: [build_segments_angle_map(cnt) for cnt in candidates], repeat)
+    segments = sum(len(group.lines) for angle_map in maps for group in angle_map.values())
+    results["build_segments_angle_map"] = stage_result(seconds, len(candidates), "contours")
+    seconds, flats = best_time(
+        lambda: [flatten_angles(angle_map, rad_angle_epsilon) for angle_map in maps], repeat)
+    results["flatten_angles"] = stage_result(seconds, segments, "segments")
+    groups = [group for flat in flats for group in flat.values()]
+    seconds, _ = best_time(
+        lambda: [flatten_line_segment(group.lines, group.norm) for group in groups], repeat)
+    results["flatten_line_segment"] = stage_result(
+        seconds, sum(len(group.lines) for group in groups), "segments")
+    seconds, _ = best_time(lambda: [is_boxy(cnt) for cnt in candidates], repeat)
+    results["is_boxy"] = stage_result(seconds, len(candidates), "contours")
+    seconds, _ = best_time(lambda: is_boxy_many(*pack_contours(candidates)), repeat)
+    results["is_boxy_many"] = stage_result(seconds, len(candidates), "contours")
+    return results
+
+
+def single_contours(seed=0):
+    """A clean 5 point box and a 60 point random walk"""
+    rng = np.random.default_rng(seed)
+    walk = np.cumsum(rng.integers(-8, 9, size=(60, 2)), axis=0) + 100
+    return {
+        "box_5_points": [(0, 0), (50, 0), (50, 50), (0, 50), (0, 0)],
+        "walk_60_points": [tuple(point) for point in walk.tolist()],
+    }
+
+
+def time_single_contour(calls=200, repeat=3, seed=0):
+    """Microseconds of one is_boxy call on a single point list
+
+    The per call overhead a validation worker pays, angle_map is the
+    build_segments_angle_map dict API.
+    """
+    rad_angle_epsilon = getRadAngle(8)
+
+    def angle_map(points):
+        flat = flatten_angles(build_segments_angle_map(points), rad_angle_epsilon)
+        return [flatten_line_segment(group.lines, group.norm) for group in flat.values()]
+
+    results = {}
+    for name, points in single_contours(seed).items():
+        for func in (is_boxy, angle_map):
+            seconds, _ = best_time(lambda: [func(points) for _ in range(calls)], repeat)
+            results["%s.%s" % (func.__name__, name)] = {
+                "points": len(points), "microseconds": seconds/calls*1e6}
+    return results
+
+
+def compare(result, baseline):
+    """Time of every stage of result over the one of a baseline result
+
+    Returns:
+        dict: ratio per stage, under 1 is faster than the baseline
+    """
+    ratios = {}
+    for section, key in (("stages", "seconds"), ("single_contour", "microseconds")):
+        old = baseline.get(section, {})
+        for name, value in result.get(section, {}).items():
+            if name in old and old[name].get(key):
+                ratios["%s.%s" % (section, name)] = value[key]/old[name][key]
+    return ratios
+
+
+def accuracy(synthetic, found):
+    """Precision and recall of the boxes found on the synthetic pages"""
+    matched = detected = expected = 0
+    for page, boxes in zip(synthetic, found):
+        page_matched, page_detected, page_expected = match_boxes(boxes, page.boxes)
+        matched += page_matched
+        detected += page_detected
+        expected += page_expected
+    return {
+        "precision": matched/detected if detected else None,
+        "recall": matched/expected if expected else None,
+        "true_positives": matched,
+        "detected": detected,
+        "expected": expected,
+    }
+
+
+def time_engines(synthetic, candidates, repeat=3):
+    """Speed and accuracy of every shape engine
+
+    shape_seconds is the engine alone on the filled candidates, seconds
+    the whole pipeline on the pages
+    """
+    results = {}
+    for name in sorted(ENGINES):
+        engine = ENGINES[name]
+        shape_seconds, _ = best_time(lambda: engine(candidates), repeat)
+        seconds, found = best_time(
+            lambda: [get_filled_contours_from_image(page.img, engine=name) for page in synthetic],
+            repeat)
+        result = stage_result(seconds, len(synthetic), "pages")
+        result["shape_seconds"] = shape_seconds
+        result["contours_per_second"] = len(candidates)/shape_seconds if shape_seconds > 0 else None
+        result["accuracy"] = accuracy(synthetic, found)
+        results[name] = result
+    return results
+
+
+def run(pages=5, seed=0, repeat=3, **page_params):
+    """Run the whole suite
+
+    Args:
+        pages (int): synthetic pages to generate
+        seed (int): seed of the first page
+        repeat (int): runs of each stage, the best one is kept
+        page_params: make_page keyword arguments
+    Returns:
+        dict: JSON ready results
+    """
+    synthetic = [make_page(seed=seed + i, **page_params) for i in range(pages)]
+    contour_count = 0
+    candidates = []
+    for page in synthetic:
+        contours, page_candidates = page_contours(page.img)
+        contour_count += len(contours)
+        candidates.extend(page_candidates)
+
+    stages = time_stages(candidates, repeat=repeat)
+    single = time_single_contour(repeat=repeat, seed=seed)
+    seconds, found = best_time(
+        lambda: [get_filled_contours_from_image(page.img) for page in synthetic], repeat)
+    pipeline = stage_result(seconds, pages, "pages")
+    pipeline["contours_per_second"] = contour_count/seconds if seconds > 0 else None
+
+    tracemalloc.start()
+    for page in synthetic:
+        get_filled_contours_from_image(page.img)
+    pipeline["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    pipeline["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    stages["pipeline"] = pipeline
+
+    return {
+        "params": dict(page_params, pages=pages, seed=seed, repeat=repeat),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+        },
+        "contours": contour_count,
+        "candidates": len(candidates),
+        "stages": stages,
+        "single_contour": single,
+        "accuracy": accuracy(synthetic, found),
+        "engines": time_engines(synthetic, candidates, repeat=repeat),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Box detector benchmark")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--width", type=int, default=1240)
+    parser.add_argument("--height", type=int, default=1754)
+    parser.add_argument("--checkboxes", type=int, default=40)
+    parser.add_argument("--filled-ratio", type=float, default=0.5)
+    parser.add_argument("--noise", type=float, default=0.0)
+    parser.add_argument("--rotation", type=float, default=0.0)
+    parser.add_argument("--box-size", type=int, default=40)
+    parser.add_argument("--distractors", type=int, default=20)
+    parser.add_argument("--baseline", help="result file of a previous run to compare with")
+    parser.add_argument("--output", help="result file, stdout by default")
+    args = parser.parse_args(argv)
+    result = run(
+        pages=args.pages, seed=args.seed, repeat=args.repeat, width=args.width,
+        height=args.height, checkboxes=args.checkboxes, filled_ratio=args.filled_ratio,
+        noise=args.noise, rotation=args.rotation, box_size=args.box_size,
+        distractors=args.distractors)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            result["vs_baseline"] = compare(result, json.load(baseline))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=2, sort_keys=True)
+    else:
+        json.dump(result, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Synthetic form pages
+    Deterministic generator of form pages with checkboxes, filled or not,
+    and distractor text. The generated boxes are the ground truth of the
+    page.
+
+    The page is split on a grid of cells and every box or text line gets
+    its own cell, so nothing overlaps.
+"""
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+SyntheticPage = namedtuple("SyntheticPage", "img boxes")
+GroundTruthBox = namedtuple("GroundTruthBox", "center size angle filled corners")
+
+WORDS = ("Name", "Date", "Yes", "No", "Address", "Signature", "Total", "Approved")
+
+
+def draw_box(img, center, size, angle, filled, thickness=3):
+    """Draw a checkbox, a filled one has an X mark splitting its inside
+
+    Returns:
+        ndarray: the 4 corners
+    """
+    corners = cv2.boxPoints((center, (size, size), angle))
+    points = np.rint(corners).astype(np.int32)
+    cv2.polylines(img, [points], True, 0, thickness)
+    if filled:
+        cv2.line(img, tuple(points[0].tolist()), tuple(points[2].tolist()), 0, thickness)
+        cv2.line(img, tuple(points[1].tolist()), tuple(points[3].tolist()), 0, thickness)
+    return corners
+
+
+def make_page(seed=0, width=1240, height=1754, checkboxes=40, filled_ratio=0.5,
+              noise=0.0, rotation=0.0, box_size=40, distractors=20):
+    """Build a synthetic form page
+
+    Args:
+        seed (int): random seed, the same arguments give the same page
+        width (int): page width
+        height (int): page height
+        checkboxes (int): number of checkboxes
+        filled_ratio (float): part of the checkboxes that are filled
+        noise (float): part of the pixels flipped as salt and pepper noise
+        rotation (float): max rotation of each box in degrees
+        box_size (int): checkbox side in pixels
+        distractors (int): number of text lines
+    Returns:
+        SyntheticPage: grayscale image and the ground truth boxes
+    """
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width), 255, np.uint8)
+    cell = box_size*3
+    columns = max(width//cell - 1, 1)
+    rows = max(height//cell - 1, 1)
+    cells = rng.permutation(columns*rows)
+    if checkboxes + distractors > len(cells):
+        raise ValueError("The page only has room for %d items" % len(cells))
+    filled_count = int(round(checkboxes*filled_ratio))
+    filled = rng.permutation([True]*filled_count + [False]*(checkboxes - filled_count))
+    boxes = []
+    for i in range(checkboxes):
+        row, column = divmod(int(cells[i]), columns)
+        center = ((column + 1)*cell, (row + 1)*cell)
+        angle = float(rng.uniform(-rotation, rotation)) if rotation else 0.0
+        corners = draw_box(img, center, box_size, angle, bool(filled[i]))
+        boxes.append(GroundTruthBox(center, box_size, angle, bool(filled[i]), corners))
+    for i in range(checkboxes, checkboxes + distractors):
+        row, column = divmod(int(cells[i]), columns)
+        word = WORDS[int(rng.integers(len(WORDS)))]
+        origin = (column*cell + cell//2, (row + 1)*cell + box_size//3)
+        cv2.putText(img, word, origin, cv2.FONT_HERSHEY_SIMPLEX, box_size/40.0, 0, 2)
+    if noise:
+        flipped = rng.random(img.shape) < noise
+        img[flipped] = 255 - img[flipped]
+    return SyntheticPage(img, boxes)
+
+
+def match_boxes(found, truth, max_distance=None):
+    """Match detected boxes with the filled ground truth boxes by center
+
+    Args:
+        found (List): detected boxes as lists of 4 points
+        truth (List[GroundTruthBox]): ground truth of the page
+        max_distance (float): max center distance, half a box by default
+    Returns:
+        Tuple(int,int,int): true positives, detected, expected
+    """
+    expected = [box for box in truth if box.filled]
+    centers = np.array([box.center for box in expected], dtype=np.float64).reshape(-1, 2)
+    used = np.zeros(len(expected), dtype=bool)
+    matched = 0
+    for box in found:
+        if not len(centers):
+            break
+        center = np.mean(np.asarray(box, dtype=np.float64), axis=0)
+        distance = np.hypot(*(centers - center).T)
+        distance[used] = np.inf
+        nearest = int(np.argmin(distance))
+        limit = max_distance or expected[nearest].size/2.0
+        if distance[nearest] <= limit:
+            used[nearest] = True
+            matched += 1
+    return matched, len(found), len(expected)
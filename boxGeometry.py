@@ -0,0 +1,154 @@
+"""Box geometry
+    The box test on point lists, without the image pipeline.
+
+    Only NumPy is needed, so callers that already have the contour points
+    (validation workers, is_boxy on stored shapes) never load OpenCV.
+    checkBoxDetector re-exports every name of this module.
+"""
+from collections import namedtuple
+
+from boxDetector.lineSegment import SegmentArray
+from boxDetector.contourArray import (
+    angle_bins,
+    bin_groups,
+    contour_points,
+    is_boxy_many,
+    segment_arrays
+)
+import numpy as np
+
+LineGroup = namedtuple("LineGroup", "norm pivotPoint lines")
+Checkbox = namedtuple("Checkbox", "a b c d")
+
+def build_segments_angle_map(points, angle_precision=4, min_size=5):
+    """ Given a list of points build a line segment list
+
+    The orientation of every segment with the x axis, on [0,pi), is used as key
+    The vector of the 1st segment on a angle becames the pivotPoint
+    all angles are indexed by distance with the pivot
+
+    Args:
+        points (List[Tuple(int,int)]): list of points on contour
+        angle_precision (int): decimal point precision,defaults to 4
+        min_size (int) : minimun segment size to consider
+    Returns:
+        dict: LineGroup indexed by angle, lines is a SegmentArray
+    """
+    points = contour_points(points)
+    _, segments = segment_arrays(
+        points, [0, len(points)], min_size=min_size, angle_precision=angle_precision)
+    angles = segments.orientations()
+    # Keeping the order of the first segment of each angle
+    levels, first, level = np.unique(angles, return_index=True, return_inverse=True)
+    point_a, point_b = split_rows(segments, level, len(levels))
+    norms = segments.unit[first].tolist()
+    pivots = segments.vector[first].tolist()
+    angle_segment_map = dict()
+    for i in np.argsort(first).tolist():
+        angle_segment_map[levels[i].item()] = LineGroup(
+            norms[i], pivots[i], SegmentArray.wrap(point_a[i], point_b[i], angle_precision))
+    return angle_segment_map
+
+
+def split_rows(segments, label, count):
+    """Points of the segments of every label, keeping their order
+
+    Args:
+        segments (SegmentArray): the segments
+        label (ndarray): label of each segment, from 0 to count-1
+        count (int): number of labels
+    Returns:
+        Tuple(List,List): a and b points of each label
+    """
+    order = np.argsort(label, kind="stable")
+    bounds = [0] + np.cumsum(np.bincount(label, minlength=count)).tolist()
+    point_a, point_b = segments.a[order], segments.b[order]
+    return ([point_a[start:end] for start, end in zip(bounds, bounds[1:])],
+            [point_b[start:end] for start, end in zip(bounds, bounds[1:])])
+
+
+def getRadAngle(degreeAngle):
+    radAngle = (degreeAngle*np.pi)/180
+    return round(radAngle, 4)
+
+minRadAngle = getRadAngle(8)
+
+def flatten_angles(angle_map, rad_angle_epsilon=minRadAngle):
+    """Concat similar angles together
+
+    The angles go on bins rad_angle_epsilon wide and a group holds 2
+    neighbour bins, wrapping from pi to 0. The first angle of the map on
+    a group is its key, the lines of the other angles are projected on it
+
+    Args:
+        angle_map (dict): list of something indexed by angles
+        rad_angle_epsilon (float): how much of the difference to squash in rad
+    """
+    angles = list(angle_map)
+    if not angles:
+        return {}
+    bins, count = angle_bins(angles, rad_angle_epsilon)
+    groups = bin_groups(np.zeros(len(angles), dtype=np.intp), bins, count)
+    key = {}
+    for angle, group in zip(angles, groups.tolist()):
+        key.setdefault(group, angle)
+    angle_key = dict((angle, key[group]) for angle, group in zip(angles, groups.tolist()))
+    ordered = sorted(angle_map)
+    if len(key) == len(angles):
+        # Nothing to project, every angle is its own group
+        return dict((angle, LineGroup(angle_map[angle].norm, angle_map[angle].pivotPoint,
+                                      SegmentArray.from_segments(angle_map[angle].lines)))
+                    for angle in ordered)
+
+    # All the lines at once, the ones off their group angle are projected on its norm
+    keys = [angle_key[angle] for angle in ordered]
+    lines = [SegmentArray.from_segments(angle_map[angle].lines) for angle in ordered]
+    sizes = [len(item) for item in lines]
+    norm = np.repeat(np.array([angle_map[last_angle].norm for last_angle in keys], dtype=np.float64),
+                     sizes, axis=0)
+    moved = np.repeat([angle != last_angle for angle, last_angle in zip(ordered, keys)], sizes)
+    lines = SegmentArray.concat(lines).project(norm, where=moved)
+
+    # The groups keep the order of their first angle
+    index = dict((last_angle, i) for i, last_angle in enumerate(dict.fromkeys(keys)))
+    point_a, point_b = split_rows(
+        lines, np.repeat([index[last_angle] for last_angle in keys], sizes), len(index))
+    ret = {}
+    for last_angle, i in index.items():
+        group = angle_map[last_angle]
+        ret[last_angle] = LineGroup(
+            group.norm, group.pivotPoint, SegmentArray.wrap(point_a[i], point_b[i], lines.angle_precision))
+    return ret
+
+
+def flatten_line_segment(segments,norm, gap_epsilon=10, line_epsilon=3):
+    """Join the segments on the same line that are closer than gap_epsilon
+    Args:
+        segments (SegmentArray): All segments, a list of LineSegment also works
+        norm (ArrayLike): unit vector of the segments
+        gap_epsilon: what is the gap_epsilon to merge
+        line_epsilon: max offset between segments of the same line
+    Returns:
+        SegmentArray: merged lines sorted by offset, lines.offsets(norm)
+            gives their signed distance to the origin
+    """
+    segments = SegmentArray.from_segments(segments)
+    return segments.merge_lines(norm, gap_epsilon=gap_epsilon, line_epsilon=line_epsilon)[0]
+
+def is_boxy(points, angle_epsilon=8, parallel_epsilon=0.5, min_size=5, gap_epsilon=10, line_epsilon=3, stats=None):
+    """Wheter a point set resemble a box
+
+    Runs is_boxy_many on a single contour, both always give the same answer
+
+    Args:
+        angle_epsilon: angle diff that can be merged
+        parallel_epsilon: how much can parallel lines differ
+        min_size: min size that a segment must have
+        gap_epsilon: min gap before merging segments
+        line_epsilon: max offset between segments of the same line
+        stats (DetectionStats): optional sub-stage times and segment counts
+    """
+    points = contour_points(points)
+    return bool(is_boxy_many(
+        points, [0, len(points)], angle_epsilon=angle_epsilon, parallel_epsilon=parallel_epsilon,
+        min_size=min_size, gap_epsilon=gap_epsilon, line_epsilon=line_epsilon, stats=stats)[0])
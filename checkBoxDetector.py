@@ -6,199 +6,371 @@
     perpendicular to each other and each paralel segment is roughly
     the same size
 """
-from collections import namedtuple
-from boxDetector.lineSegment import LineSegment as Segment
+from itertools import islice
+from time import perf_counter
+from boxDetector.boxGeometry import (
+    Checkbox,
+    LineGroup,
+    build_segments_angle_map,
+    flatten_angles,
+    flatten_line_segment,
+    getRadAngle,
+    is_boxy,
+    minRadAngle
+)
+from boxDetector.detectionStats import stage_timer
+from boxDetector.fillScore import ScoredBox, fill_ratios, ink_integral
+from boxDetector.lazyImport import lazy_module
+from boxDetector.rejectionCascade import RejectionCascade
+from boxDetector.resultCache import content_key
+from boxDetector.shapeEngines import engine_name, get_engine
+from boxDetector.spatialIndex import non_max_suppression
 import numpy as np
-import cv2
 
-LineGroup = namedtuple("LineGroup", "norm pivotPoint lines")
-Checkbox = namedtuple("Checkbox", "a b c d")
+cv2 = lazy_module("cv2")
 
-def build_segments_angle_map(points, angle_precision=4, min_size=5):
-    """ Given a list of points build a line segment list
+def formatBox(box):
+    ret =[]
+    for item in box:
+        ret.append((item[0].item(),item[1].item()))
+    return ret
+
+def filled_indices(hierarchy):
+    """Indexes of the closed and filled contours
 
-    All segments are compared to [0,1] and it's angle is used as key
-    The vector of the 1st segment on a angle becames the pivotPoint
-    all angles are indexed by distance with the pivot
+    A contour is closed when it has a child and filled when that first
+    child has a sibling, so the mark splits the inside of the box.
+    Root contours are outer containers (the page) and never a box.
 
     Args:
-        points (List[Tuple(int,int)]): list of points on contour
-        angle_precision (int): decimal point precision,defaults to 4
-        min_size (int) : minimun segment size to consider
+        hierarchy (ndarray): (1,N,4) hierarchy from findContours with RETR_TREE
+            [0] = next contour at the same hierarchical level
+            [1] = previous contour at the same hierarchical level
+            [2] = denotes its first child contour
+            [3] = denotes index of its parent contour
     """
+    next_contour, _, child, parent = hierarchy.reshape(-1, 4).T
+    closed = (child != -1) & (parent != -1)
+    filled = np.zeros_like(closed)
+    filled[closed] = next_contour[child[closed]] != -1
+    return np.flatnonzero(filled)
 
-    def add_segment(segment,angle_map):
-        angle = segment.get_angle()
-        angle = round(angle, angle_precision)
-        if angle in angle_map:
-            angle_map[angle].lines.append(segment)
-        else:
-            norm = segment.unit_vector
-            pivotPoint = segment.vector
-            angle_map[angle] = LineGroup(
-                norm, pivotPoint, [segment])
-
-    angle_segment_map = dict()
-    ref_point = points[0]
-    to_add = False
-    segment = None
-    # Indexing all line segments by angle in relation to a randle vector
-    for i in range(1, len(points)):
-        next_point = points[i]
-        segment = Segment(
-            ref_point, next_point, angle_precision=angle_precision)
-        if segment.length < min_size:
-            to_add = True
-            continue
-        to_add = False
-        ref_point = next_point
-        add_segment(segment,angle_segment_map)
-    if to_add:
-        add_segment(segment,angle_segment_map)
-    return angle_segment_map
-
-
-def getRadAngle(degreeAngle):
-    radAngle = (degreeAngle*np.pi)/180
-    return round(radAngle, 4)
-
-def flatten_angles(angle_map, rad_angle_epsilon=8):
-    """Concat similar angles together
+def filled_candidates(contours, hierarchy, min_rect_size=30, cascade=None, stats=None):
+    """Yield the closed and filled contours big enough to be a box
     Args:
-        angle_map (dict): list of something indexed by angles
-        rad_angle_epsilon (float): how much of the difference to squash in rad
+        contours (List): contours from findContours with RETR_TREE
+        hierarchy (ndarray): hierarchy from findContours
+        min_rect_size: min width of the minimun area rectangle
+        cascade (RejectionCascade): optional cheap tests to pass
+        stats (DetectionStats): optional times and counts of each filter
+    Yields:
+        Tuple(ndarray,ndarray): contour and its boxPoints
     """
-    ret = {}
-    last_angle = None
-
-    for angle in sorted(angle_map):
-        if last_angle is None:
-            last_angle = angle
-        if angle - last_angle > rad_angle_epsilon:
-            last_angle = angle
-        if last_angle in ret:
-            current_lines = angle_map[angle].lines
-            norm = ret[last_angle].norm
-            for segment in current_lines:
-                projected = segment.get_projected_segment(norm)
-                ret[last_angle].lines.append(projected)
-        else:
-            ret[last_angle] = angle_map[angle]
-    return ret
+    with stage_timer(stats, "hierarchy"):
+        indices = filled_indices(hierarchy)
+    if stats is not None:
+        stats.add_count("filled", len(indices))
+    yield from rect_candidates(
+        contours, indices, min_rect_size=min_rect_size, cascade=cascade, stats=stats)
 
+def rect_candidates(contours, indices, min_rect_size=30, cascade=None, stats=None, stage="cascade"):
+    """Yield the contours big enough to be a box
+    Args:
+        contours (List): contours from findContours
+        indices (Iterable[int]): contours to check
+        min_rect_size: min width of the minimun area rectangle
+        cascade (RejectionCascade): optional cheap tests to pass
+        stats (DetectionStats): optional times and counts of each filter
+        stage (str): stats name of the cascade
+    Yields:
+        Tuple(ndarray,ndarray): contour and its boxPoints
+    """
+    for i in indices:
+        cnt = contours[i]
+        if stats is not None:
+            start = perf_counter()
+        #Finds the minimun area rectangle for the contour
+        rect = cv2.minAreaRect(cnt)
+        box = cv2.boxPoints(rect)
+        #box[0] and box[3] share a side on every OpenCV version
+        width = np.linalg.norm(box[3] - box[0])
+        if stats is not None:
+            stats.add_time("min_rect", perf_counter() - start)
+        if width< min_rect_size:
+            continue
+        if stats is not None:
+            stats.add_count("min_rect_size")
+        if cascade is not None:
+            with stage_timer(stats, stage):
+                accepted = cascade.accept(cnt, rect)
+            if not accepted:
+                continue
+            if stats is not None:
+                stats.add_count(stage)
+        yield cnt, box
 
-def flatten_line_segment(segments,norm, gap_epsilon=10):
-    """Join multiple distance segments that are on the same gap_epsilon
+def to_gray(img):
+    """Grayscale version of an image, a gray image is returned as it is
     Args:
-        segments (List): List of all segments
-        gap_epsilon: what is the gap_epsilon to merge
+        img (ndarray): BGR, BGRA or grayscale image
     """
-    def get_distance(point,norm):
-        return abs(np.cross(norm,point))
-
-    dist_dict = {}
-    last_distance = None
-    distance_segment_map = {}
-    segments.sort()
-    base = segments[0]
-    for i in range(1, len(segments)):
-        segment = segments[i]
-        gap = [base.b[0]-segment.a[0], base.b[1]-segment.a[1]]
-        dist = (gap[0]**2+gap[1]**2)**0.5
-        if dist < gap_epsilon:
-            base.add_segment(segment)
-        else:
-            distance = get_distance(base.a,norm)
-            dist_dict[distance] = base
-            base = segment
-    distance = get_distance(base.a,norm)
-    dist_dict[distance] = base
-    return dist_dict
-
-def is_boxy(points, angle_epsilon=8, parallel_epsilon=0.5, min_size=5, gap_epsilon=10):
-    """Wheter a point set resemble a box
+    if img.ndim == 2:
+        return img
+    channels = img.shape[2]
+    if channels == 1:
+        return img.reshape(img.shape[:2])
+    if channels == 4:
+        return cv2.cvtColor(img,cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(img,cv2.COLOR_BGR2GRAY)
+
+# findContours retrieval flag of each mode, only "tree" gives the hierarchy
+RETRIEVAL = {
+    "tree": "RETR_TREE",
+    "list": "RETR_LIST",
+    "external": "RETR_EXTERNAL",
+}
+DEFAULT_FILL_THRESHOLD = 0.1
+#Min contour area / rect area of an outline found without the hierarchy
+OUTLINE_FILL_RATIO = 0.85
+
+def iter_scored_contours(img, min_rect_size = 30, angle_epsilon=8, parallel_epsilon=0.5, min_size=5, gap_epsilon=10, line_epsilon=3, chunk_size=None, cascade=None, stats=None, engine="robust", fill_threshold=None, retrieval="tree", fill_border=0.25, score_fill=True, suppress=False):
+    """Yield the filled boxes of an image with their fill ratio
     Args:
+        img (ndarray): BGR, BGRA or grayscale image
+        min_rect_size: min width of the minimun area rectangle
         angle_epsilon: angle diff that can be merged
         parallel_epsilon: how much can parallel lines differ
         min_size: min size that a segment must have
         gap_epsilon: min gap before merging segments
+        line_epsilon: max offset between segments of the same line
+        chunk_size (int): candidates checked on each engine call,
+            all of them at once by default
+        cascade (RejectionCascade): optional cheap tests run before is_boxy,
+            its counters are updated
+        stats (DetectionStats): optional wall time of each stage and count
+            of the contours left after each filter
+        engine (str|Callable): box test, "robust", "fast", "cascade" or
+            a function like shapeEngines.robust_engine
+        fill_threshold (float): min ink part inside a box, None keeps every
+            box filled by the hierarchy test
+        retrieval (str): "tree" uses the hierarchy to find the filled boxes,
+            "list" and "external" skip it and only use the fill ratio, the
+            ink outline of every box is checked and, without a cascade,
+            it must cover OUTLINE_FILL_RATIO of its rect
+        fill_border (float): part of the box half side left out of the fill
+            ratio, so the outline is not counted
+        score_fill (bool): False skips the fill ratio, it is None, when
+            there is no fill_threshold or it is 0
+        suppress (bool): drop the boxes overlapping a bigger one with
+            non_max_suppression, e.g. the near duplicate quads of a rotated
+            or noisy box. The boxes are only yielded once all are found
+    Yields:
+        ScoredBox: the 4 box points and their fill ratio
     """
-    angle_epsilon = getRadAngle(angle_epsilon)
-
-    angle_map = build_segments_angle_map(points, min_size=min_size)
-    flatted = flatten_angles(angle_map, rad_angle_epsilon=angle_epsilon)
-    ninety_degree = np.pi/2
-    angles_to_check = []
-
-    for angle in flatted:
-        flated_lines = flatten_line_segment(
-            flatted[angle].lines,flatted[angle].norm, gap_epsilon=gap_epsilon)
-        has_parallel = False
-        length_to_compare = None
-        for distance in flated_lines:
-            if flated_lines[distance].length < min_size:
+    if suppress:
+        found = list(iter_scored_contours(
+            img, min_rect_size=min_rect_size, angle_epsilon=angle_epsilon,
+            parallel_epsilon=parallel_epsilon, min_size=min_size, gap_epsilon=gap_epsilon,
+            line_epsilon=line_epsilon, chunk_size=chunk_size, cascade=cascade, stats=stats,
+            engine=engine, fill_threshold=fill_threshold, retrieval=retrieval,
+            fill_border=fill_border, score_fill=score_fill))
+        with stage_timer(stats, "suppress"):
+            kept = sorted(non_max_suppression([scored.box for scored in found]))
+        if stats is not None:
+            stats.add_count("suppressed", len(found) - len(kept))
+        for i in kept:
+            yield found[i]
+        return
+    if retrieval not in RETRIEVAL:
+        raise ValueError("Unknown retrieval %r, use one of %s" % (retrieval, ", ".join(sorted(RETRIEVAL))))
+    engine = get_engine(engine)
+    with stage_timer(stats, "to_gray"):
+        imgray = to_gray(img)
+    #reducing noise
+    with stage_timer(stats, "threshold"):
+        if retrieval == "tree":
+            ret,thresh = cv2.threshold(imgray,127,255,0)
+        else:
+            #Without a hierarchy the ink is the foreground, so a box is found once
+            ret,thresh = cv2.threshold(imgray,127,255,cv2.THRESH_BINARY_INV)
+            if fill_threshold is None:
+                fill_threshold = DEFAULT_FILL_THRESHOLD
+    #OpenCV 3 also returns the image, the last 2 items are always the same
+    with stage_timer(stats, "findContours"):
+        contours, hierarchy = cv2.findContours(thresh,getattr(cv2, RETRIEVAL[retrieval]),cv2.CHAIN_APPROX_SIMPLE)[-2:]
+    if stats is not None:
+        stats.add_count("contours", len(contours))
+    if hierarchy is None:
+        return
+    if retrieval == "tree":
+        candidates = filled_candidates(
+            contours, hierarchy, min_rect_size=min_rect_size, cascade=cascade, stats=stats)
+    elif cascade is not None:
+        candidates = rect_candidates(
+            contours, range(len(contours)), min_rect_size=min_rect_size, cascade=cascade, stats=stats)
+    else:
+        #Without the hierarchy an outline is told from a solid glyph by its area
+        outline = RejectionCascade(max_aspect_ratio=None, min_fill_ratio=OUTLINE_FILL_RATIO,
+                                   min_vertices=None, max_vertices=None)
+        candidates = rect_candidates(
+            contours, range(len(contours)), min_rect_size=min_rect_size, cascade=outline, stats=stats,
+            stage="outline_fill")
+    integral = None
+    while True:
+        chunk = list(islice(candidates, chunk_size))
+        if not chunk:
+            return
+        #All the candidates of a chunk are checked on a single call
+        shapes = [cnt for cnt, _ in chunk]
+        if retrieval != "tree":
+            #The ink outline ends next to its first point, is_boxy needs it closed
+            shapes = [np.concatenate((cnt, cnt[:1])) for cnt in shapes]
+        with stage_timer(stats, "is_boxy"):
+            boxy = engine(shapes, angle_epsilon=angle_epsilon,
+                parallel_epsilon=parallel_epsilon, min_size=min_size,
+                gap_epsilon=gap_epsilon, line_epsilon=line_epsilon, stats=stats)
+        boxes = [box for (_, box), is_box in zip(chunk, boxy) if is_box]
+        if not boxes:
+            continue
+        if not score_fill and (fill_threshold is None or fill_threshold <= 0):
+            for box in boxes:
+                yield ScoredBox(formatBox(box), None)
+            continue
+        with stage_timer(stats, "fill"):
+            if integral is None:
+                integral = ink_integral(thresh, 0 if retrieval == "tree" else 255)
+            fill = fill_ratios(integral, boxes, border=fill_border)
+        for box, ratio in zip(boxes, fill.tolist()):
+            if fill_threshold is not None and ratio < fill_threshold:
                 continue
-            if not length_to_compare:
-                length_to_compare = flated_lines[distance].length
-            else:
-                size_diff = 0.0
-                if length_to_compare > flated_lines[distance].length:
-                    size_diff = flated_lines[distance].length/length_to_compare
-                else:
-                    size_diff = length_to_compare/flated_lines[distance].length
-                    length_to_compare = flated_lines[distance].length
-                if (1-size_diff) < parallel_epsilon:
-                    has_parallel = True
-                    break
-
-        if has_parallel:
-            angles_to_check.append(angle)
-    for angle in angles_to_check:
-        start = 1
-        for i, next_angle in enumerate(angles_to_check, start):
-            if (ninety_degree-angle_epsilon) <= abs(angle-next_angle) <= (ninety_degree+angle_epsilon):
-                return True
-        start += 1
-    return False
+            yield ScoredBox(formatBox(box), ratio)
 
-def formatBox(box):
-    ret =[]
-    for item in box:
-        ret.append((item[0].item(),item[1].item()))
-    return ret
+def iter_filled_contours(img, **params):
+    """Yield the filled boxes of an image as they are found
+    Args:
+        img (ndarray): BGR, BGRA or grayscale image
+        params: iter_scored_contours keyword arguments
+    Yields:
+        List[Tuple(float,float)]: the 4 box points
+    """
+    for scored in iter_scored_contours(img, score_fill=False, **params):
+        yield scored.box
 
-def get_filled_contours(img_path,min_rect_size = 30):
-    filled_coordinates = []
-    img = cv2.imread(img_path)
-    #Make it gray
-    imgray = cv2.cvtColor(img,cv2.COLOR_BGR2GRAY)
-    #reducing noise
-    ret,thresh = cv2.threshold(imgray,127,255,0)
-    _,contours, hierarchy = cv2.findContours(thresh,cv2.RETR_TREE,cv2.CHAIN_APPROX_SIMPLE)
-    #hierarchy fix and skipping outer container
-    hierarchy = hierarchy[0][1:]
-    #the first one is always the outer container skipping it 
-    contours = contours[1:]
-    for i,cnt in enumerate(contours):
-            #[0] = next contour at the same hierarchical level
-            #[1] = previous contour at the same hierarchical level
-            #[2] = denotes its first child contour
-            #[3] = denotes index of its parent contour
-            child_index = hierarchy[i][2]
-            isClosedShape = child_index != -1
-            if isClosedShape:
-                # -1 because we skipped the outer contour
-                firtstChildHierarchy = hierarchy[child_index-1]
-                isFilled = firtstChildHierarchy[0]!=-1
-                if isFilled:
-                    #Finds the minimun area rectangle for the contour
-                    rect = cv2.minAreaRect(cnt)
-                    box = cv2.boxPoints(rect)
-                    width = box[3][0] - box[0][0]
-                    if width< min_rect_size:
-                        continue
-                    contour_list=list(map(lambda x: x[0], cnt))
-                    if not is_boxy(contour_list):
-                        continue
-                    filled_coordinates.append(formatBox(box))                 
-    return filled_coordinates
\ No newline at end of file
+def get_scored_contours_from_image(img, **params):
+    """Filled boxes of an image already in memory with their fill ratio
+    Args:
+        img (ndarray): BGR, BGRA or grayscale image
+        params: iter_scored_contours keyword arguments
+    Returns:
+        List[ScoredBox]: box points and fill ratio
+    """
+    return list(iter_scored_contours(img, **params))
+
+def cacheable(params):
+    """Whether the boxes of a detection can go on the result cache
+
+    Pages checked with a cascade are not cached, a hit would not update
+    its counters. Engines without a stable name, like lambdas, are not
+    cached either, their key could be the one of another engine.
+    """
+    return params.get("cascade") is None and engine_name(params.get("engine", "robust")) is not None
+
+def cache_lookup(cache, content, params, stats=None):
+    """Key and cached boxes of an image content
+
+    Args:
+        cache (ResultCache): the cache, None disables it
+        content (bytes|ndarray): encoded bytes or decoded pixels
+        params (dict): detector keyword arguments
+        stats (DetectionStats): optional lookup time and hit counts
+    Returns:
+        Tuple(str,List): key and boxes, each one is None when missing
+    """
+    if cache is None or not cacheable(params):
+        return None, None
+    with stage_timer(stats, "cache"):
+        key = content_key(content, params)
+        boxes = cache.get(key)
+    if stats is not None:
+        stats.add_count("cache.hits" if boxes is not None else "cache.misses")
+    return key, boxes
+
+def get_filled_contours(img_path,min_rect_size = 30, angle_epsilon=8, parallel_epsilon=0.5, min_size=5, gap_epsilon=10, line_epsilon=3, cascade=None, stats=None, cache=None, engine="robust", fill_threshold=None, retrieval="tree", suppress=False):
+    """Filled boxes of an image file
+    Args:
+        img_path (str): image path
+        cache (ResultCache): optional cache, the file bytes are hashed and
+            a hit skips decoding the image
+        the others are iter_scored_contours arguments
+    """
+    params = dict(min_rect_size=min_rect_size, angle_epsilon=angle_epsilon,
+        parallel_epsilon=parallel_epsilon, min_size=min_size,
+        gap_epsilon=gap_epsilon, line_epsilon=line_epsilon, cascade=cascade, stats=stats, engine=engine,
+        fill_threshold=fill_threshold, retrieval=retrieval, suppress=suppress)
+    if cache is not None and not cacheable(params):
+        cache = None
+    if cache is None:
+        with stage_timer(stats, "imread"):
+            img = cv2.imread(img_path)
+    else:
+        with stage_timer(stats, "imread"):
+            with open(img_path, "rb") as img_file:
+                encoded = img_file.read()
+        key, boxes = cache_lookup(cache, encoded, params, stats)
+        if boxes is not None:
+            return boxes
+        with stage_timer(stats, "imdecode"):
+            img = cv2.imdecode(np.frombuffer(encoded, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise IOError("Could not read the image %s" % img_path)
+    boxes = list(iter_filled_contours(img, **params))
+    if cache is not None:
+        cache.put(key, boxes)
+    return boxes
+
+def get_filled_contours_from_image(img, cache=None, **params):
+    """Filled boxes of an image already in memory
+    Args:
+        img (ndarray): BGR, BGRA or grayscale image, a gray one is not converted
+        cache (ResultCache): optional cache keyed by the pixels
+        params: iter_filled_contours keyword arguments
+    """
+    key, boxes = cache_lookup(cache, img, params, params.get("stats"))
+    if boxes is not None:
+        return boxes
+    boxes = list(iter_filled_contours(img, **params))
+    if key is not None:
+        cache.put(key, boxes)
+    return boxes
+
+def get_filled_contours_from_buffer(buffer, cache=None, **params):
+    """Filled boxes of an encoded image (png, jpg...) without a temp file
+    Args:
+        buffer (bytes|memoryview|bytearray): encoded image, used without a copy
+        cache (ResultCache): optional cache, a hit skips decoding the image
+        params: iter_filled_contours keyword arguments
+    """
+    key, boxes = cache_lookup(cache, buffer, params, params.get("stats"))
+    if boxes is not None:
+        return boxes
+    encoded = np.frombuffer(buffer, dtype=np.uint8)
+    img = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+    if img is None:
+        raise IOError("Could not decode the image buffer")
+    boxes = list(iter_filled_contours(img, **params))
+    if key is not None:
+        cache.put(key, boxes)
+    return boxes
+
+def get_filled_contours_from_raw(raw_path, width, height, offset=0, cache=None, **params):
+    """Filled boxes of a raw 8 bit grayscale file, memory mapped
+    Args:
+        raw_path (str): file with height rows of width bytes
+        width (int): image width
+        height (int): image height
+        offset (int): bytes to skip before the first row
+        cache (ResultCache): optional cache keyed by the pixels
+        params: iter_filled_contours keyword arguments
+    """
+    img = np.memmap(raw_path, dtype=np.uint8, mode="r", offset=offset, shape=(height, width))
+    return get_filled_contours_from_image(img, cache=cache, **params)
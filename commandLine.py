@@ -0,0 +1,114 @@
+"""Command line
+    python -m boxDetector [options] [paths...]
+
+    Detects the filled boxes of every image on a pool of worker processes
+    and writes one JSON Lines record per image as soon as it finishes:
+
+    {"index": 0, "path": "a.png", "boxes": [[[x, y], ...], ...], "error": null, "seconds": 0.12}
+
+    seconds is the wall time of the image on its worker, --stats adds the
+    time and counts of every stage.
+
+    Paths come from the arguments, directories give their images sorted by
+    name. Without paths, or with "-", they are read from stdin one per
+    line, so a long find | python -m boxDetector -j 8 runs on a single
+    process pool. The exit status is 1 when an image failed.
+"""
+import argparse
+import json
+import os
+import sys
+
+from boxDetector.batchDetector import get_filled_contours_batch
+from boxDetector.checkBoxDetector import RETRIEVAL
+from boxDetector.resultCache import ResultCache
+from boxDetector.shapeEngines import ENGINES
+from boxDetector.streamDetector import IMAGE_EXTENSIONS
+
+
+def iter_paths(paths, stdin=None):
+    """Yield the image paths of the arguments, lazily
+
+    Args:
+        paths (List[str]): files, directories or "-" for stdin
+        stdin (TextIO): where "-" reads from, sys.stdin by default
+    """
+    for path in paths or ["-"]:
+        if path == "-":
+            for line in stdin or sys.stdin:
+                line = line.strip()
+                if line:
+                    yield line
+        elif os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                full_path = os.path.join(path, name)
+                if os.path.isfile(full_path) and name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield full_path
+        else:
+            yield path
+
+
+def result_record(result):
+    """JSON Lines record of a BatchResult"""
+    record = {
+        "index": result.index,
+        "path": result.img_path,
+        "boxes": result.boxes,
+        "error": result.error,
+        "seconds": result.seconds,
+    }
+    if result.stats is not None:
+        record["stats"] = result.stats
+    return record
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m boxDetector",
+        description="Detect the filled boxes of images, one JSON line per image")
+    parser.add_argument("paths", nargs="*", help="images or directories, - or nothing reads stdin")
+    parser.add_argument("-j", "--workers", type=int, help="worker processes, the cpu count by default")
+    parser.add_argument("--ordered", action="store_true",
+                        help="write on the input order instead of as images finish")
+    parser.add_argument("--max-in-flight", type=int, help="images queued at once, twice the workers by default")
+    parser.add_argument("--stats", action="store_true", help="add the stage times and counts of every image")
+    parser.add_argument("--cache-dir", help="disk cache shared by the workers")
+    parser.add_argument("--min-rect-size", type=float, default=30)
+    parser.add_argument("--angle-epsilon", type=float, default=8)
+    parser.add_argument("--parallel-epsilon", type=float, default=0.5)
+    parser.add_argument("--min-size", type=float, default=5)
+    parser.add_argument("--gap-epsilon", type=float, default=10)
+    parser.add_argument("--line-epsilon", type=float, default=3)
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="robust")
+    parser.add_argument("--fill-threshold", type=float)
+    parser.add_argument("--retrieval", choices=sorted(RETRIEVAL), default="tree")
+    parser.add_argument("--suppress", action="store_true",
+                        help="drop the boxes overlapping a bigger one (non max suppression)")
+    return parser
+
+
+def main(argv=None, stdin=None, stdout=None):
+    """Run the command line, returns the exit status"""
+    args = build_parser().parse_args(argv)
+    stdout = stdout or sys.stdout
+    params = dict(
+        min_rect_size=args.min_rect_size, angle_epsilon=args.angle_epsilon,
+        parallel_epsilon=args.parallel_epsilon, min_size=args.min_size,
+        gap_epsilon=args.gap_epsilon, line_epsilon=args.line_epsilon, engine=args.engine,
+        fill_threshold=args.fill_threshold, retrieval=args.retrieval, suppress=args.suppress)
+    if args.cache_dir:
+        params["cache"] = ResultCache(directory=args.cache_dir)
+    results = get_filled_contours_batch(
+        iter_paths(args.paths, stdin), workers=args.workers, ordered=args.ordered,
+        max_in_flight=args.max_in_flight, collect_stats=args.stats, **params)
+    failed = False
+    try:
+        for result in results:
+            failed = failed or result.error is not None
+            stdout.write(json.dumps(result_record(result)) + "\n")
+            stdout.flush()
+    except BrokenPipeError:
+        # The reader stopped, e.g. head, the images left are not needed
+        results.close()
+        return 0
+    return 1 if failed else 0
@@ -0,0 +1,362 @@
+"""Vectorized box test
+    This module runs the segment/angle analysis behind
+    checkBoxDetector.is_boxy with whole NumPy array operations
+    instead of one LineSegment object per contour point.
+
+    Many contours are handled on a single call as a ragged buffer: all
+    points concatenated on one (N,2) array plus an offsets array where
+    contour i is points[offsets[i]:offsets[i+1]].
+
+    The contour returned by cv2.findContours ((N,1,2) int32) is used
+    as a zero-copy (N,2) view.
+"""
+import numpy as np
+from boxDetector.detectionStats import stage_timer
+from boxDetector.lineSegment import SegmentArray
+
+ninety_degree = np.pi/2
+
+
+def contour_points(contour):
+    """View a contour as an (N,2) point array
+
+    Args:
+        contour (ArrayLike): (N,1,2) contour from cv2.findContours
+            or a list of (x,y) points
+    """
+    points = np.asarray(contour)
+    return points.reshape(-1, 2)
+
+
+def pack_contours(contours):
+    """Concatenate contours on a ragged buffer
+
+    Args:
+        contours (List[ArrayLike]): contours or point lists
+    Returns:
+        Tuple(ndarray,ndarray): (N,2) points and offsets
+    """
+    points = [contour_points(contour) for contour in contours]
+    offsets = np.zeros(len(points) + 1, dtype=np.intp)
+    np.cumsum([len(item) for item in points], out=offsets[1:])
+    if not points:
+        return np.empty((0, 2), dtype=np.int32), offsets
+    return np.concatenate(points), offsets
+
+
+def follow_chain(nxt, roots):
+    """All indexes reachable from roots following nxt, sorted
+
+    Uses pointer doubling so there is no python loop per visited index.
+
+    Args:
+        nxt (ndarray): next index for each index, len(nxt) means none,
+            it must always be greater than the index itself
+        roots (ArrayLike): indexes where the chains start
+    """
+    sink = len(nxt)
+    jump = np.append(nxt, sink)
+    visited = np.asarray(roots, dtype=np.intp)
+    while True:
+        # visited holds the first 2^k steps and jump moves 2^k steps
+        reached = jump[visited]
+        reached = reached[reached != sink]
+        if not len(reached):
+            break
+        visited = np.concatenate((visited, reached))
+        jump = jump[jump]
+    return np.unique(visited)
+
+
+def contour_ends(offsets, total):
+    """End (exclusive) of the contour of every point"""
+    counts = np.diff(offsets)
+    return np.repeat(offsets[1:], counts)[:total]
+
+
+def next_far_index(points, offsets, min_size=5):
+    """For every point the first following point at least min_size away
+
+    Args:
+        points (ndarray): (N,2) points
+        offsets (ndarray): contour offsets
+        min_size (int) : minimun segment size to consider
+    Returns:
+        ndarray: next index on the same contour, N when there is none
+    """
+    total = len(points)
+    nxt = np.full(total, total, dtype=np.intp)
+    pts = points.astype(np.float64)
+    end = contour_ends(offsets, total)
+    pending = np.flatnonzero(np.arange(1, total + 1) < end)
+    window = max(int(np.ceil(min_size)), 1) + 1
+    while len(pending):
+        candidates = pending[:, None] + np.arange(1, window + 1)
+        inside = candidates < end[pending][:, None]
+        delta = pts[np.minimum(candidates, total - 1)] - pts[pending][:, None]
+        length = (delta[..., 0]**2 + delta[..., 1]**2)**0.5
+        far = (length >= min_size) & inside
+        hit = far.any(axis=1)
+        nxt[pending[hit]] = candidates[hit, far[hit].argmax(axis=1)]
+        # A row that already looked at its contour last point has no next one
+        exhausted = pending + window >= end[pending] - 1
+        pending = pending[~hit & ~exhausted]
+        window *= 2
+    return nxt
+
+
+def segment_arrays(points, offsets, min_size=5, angle_precision=4):
+    """Build the contour segments, merging the ones smaller than min_size
+
+    Same segments as build_segments_angle_map, in contour order
+
+    Args:
+        points (ndarray): (N,2) points of all contours
+        offsets (ndarray): contour offsets
+        min_size (int) : minimun segment size to consider
+        angle_precision (int): decimal point precision,defaults to 4
+    Returns:
+        Tuple(ndarray,SegmentArray): contour of each segment and the segments
+    """
+    offsets = np.asarray(offsets, dtype=np.intp)
+    total = len(points)
+    step = points[1:].astype(np.float64) - points[:-1]
+    short = (step[:, 0]**2 + step[:, 1]**2)**0.5 < min_size
+    # a step across 2 contours is never followed
+    inner = offsets[1:-1]
+    short[inner[(inner > 0) & (inner < total)] - 1] = False
+    if not short.any():
+        # every point is min_size away from the previous one, all are kept
+        kept = np.arange(total)
+    else:
+        closed = np.diff(offsets) >= 2
+        kept = follow_chain(
+            next_far_index(points, offsets, min_size), offsets[:-1][closed])
+        # the remaining points of a contour too near make a last short segment
+        kept = np.union1d(kept, offsets[1:][closed] - 1)
+    owner = np.searchsorted(offsets, kept, side="right") - 1
+    same = owner[1:] == owner[:-1]
+    segments = SegmentArray(
+        points[kept[:-1][same]], points[kept[1:][same]],
+        angle_precision=angle_precision)
+    return owner[:-1][same], segments
+
+
+def angle_bins(angles, rad_angle_epsilon):
+    """Integer bin of every orientation, bins are rad_angle_epsilon wide
+
+    A width of 0 or less groups the exact angles only, every angle gets
+    its own bin with an empty one after it.
+
+    Args:
+        angles (ndarray): orientations on [0,pi)
+        rad_angle_epsilon (float): bin width in rad
+    Returns:
+        Tuple(ndarray,int): bin of each angle and number of bins
+    """
+    angles = np.asarray(angles)
+    if rad_angle_epsilon <= 0:
+        levels, inverse = np.unique(angles, return_inverse=True)
+        return 2*inverse.reshape(-1).astype(np.intp), max(2*len(levels), 1)
+    count = max(int(np.ceil(np.pi/rad_angle_epsilon)), 1)
+    bins = np.floor(angles/rad_angle_epsilon).astype(np.intp) % count
+    return bins, count
+
+
+def bin_groups(owner, bins, count):
+    """Angle group of every angle, from its contour and bin
+
+    A group starts on the first used bin after the current group and
+    holds that bin and the next one. The bins of a contour are scanned
+    from an empty one, so a group can wrap from the last bin to the first.
+    Only the used (contour, bin) pairs are handled, a run of consecutive
+    used bins starts a group on every other bin, so the cost does not
+    depend on the number of bins.
+
+    The used pairs come from one sort of contour*count+bin, not from a
+    bincount histogram: the histogram has contours*count cells and count
+    grows with 1/rad_angle_epsilon. After the sort, the scan is linear.
+
+    Args:
+        owner (ndarray): contour of each angle
+        bins (ndarray): bin of each angle
+        count (int): number of bins
+    Returns:
+        ndarray: group id of each angle, the ids are sorted by contour
+    """
+    owner = np.asarray(owner, dtype=np.intp)
+    bins = np.asarray(bins, dtype=np.intp)
+    total = len(bins)
+    if not total:
+        return np.empty(0, dtype=np.intp)
+    key = owner*count + bins
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+    new_pair = np.empty(total, dtype=bool)
+    new_pair[0] = True
+    new_pair[1:] = key[1:] != key[:-1]
+    pair = np.cumsum(new_pair) - 1
+    pair_owner, pair_bin = np.divmod(key[new_pair], count)
+    pairs = len(pair_bin)
+
+    # Bins 0 to first-1 are used, first is the empty bin where the scan starts
+    new_contour = np.empty(pairs, dtype=bool)
+    new_contour[0] = True
+    new_contour[1:] = pair_owner[1:] != pair_owner[:-1]
+    contour_start = np.flatnonzero(new_contour)
+    sizes = np.diff(np.append(contour_start, pairs))
+    start = np.repeat(contour_start, sizes)
+    used = np.repeat(sizes, sizes)
+    position = np.arange(pairs)
+    rank = position - start
+    first = np.repeat(np.minimum.reduceat(np.where(pair_bin == rank, used, rank), contour_start), sizes)
+    # The scan order is the bin order of the contour rotated by first
+    scan = start + (rank - first) % used
+    scanned = np.empty(pairs, dtype=np.intp)
+    scanned[scan] = (pair_bin - first) % count
+    run_start = np.empty(pairs, dtype=bool)
+    run_start[0] = True
+    run_start[1:] = new_contour[1:] | (scanned[1:] != scanned[:-1] + 1)
+    in_run = position - np.maximum.accumulate(np.where(run_start, position, 0))
+    pair_group = (np.cumsum(in_run % 2 == 0) - 1)[scan]
+    groups = np.empty(total, dtype=np.intp)
+    groups[order] = pair_group[pair]
+    return groups
+
+
+def orientation_diff(angle, other):
+    """Smallest difference between orientations, pi is the same as 0"""
+    diff = np.abs(angle - other) % np.pi
+    return np.minimum(diff, np.pi - diff)
+
+
+def has_parallel_groups(group, length, parallel_epsilon=0.5):
+    """Groups that have 2 lines of about the same length
+
+    Compares each line with the longest previous one of its group,
+    like is_boxy
+
+    Args:
+        group (ndarray): group of each line, lines sorted by group
+        length (ndarray): length of each line
+        parallel_epsilon: how much can parallel lines differ
+    """
+    if len(length) < 2:
+        return np.empty(0, dtype=group.dtype)
+    by_length = np.argsort(length, kind="stable")
+    rank = np.empty_like(by_length)
+    rank[by_length] = np.arange(len(length))
+    # running max of the rank restarted on every group
+    offset = group * len(length)
+    longest = np.maximum.accumulate(rank + offset) - offset
+    previous = length[by_length[longest[:-1]]]
+    current = length[1:]
+    larger = np.maximum(current, previous)
+    # 2 empty lines are never parallel, like on is_boxy
+    compared = (group[1:] == group[:-1]) & (larger > 0)
+    size_diff = np.zeros_like(larger)
+    np.divide(np.minimum(current, previous), larger, out=size_diff, where=compared)
+    return np.unique(group[1:][compared & ((1-size_diff) < parallel_epsilon)])
+
+
+def has_perpendicular(owner, angles, rad_angle_epsilon, total):
+    """Contours that have 2 angles about 90 degrees apart
+
+    Args:
+        owner (ndarray): contour of each angle, sorted
+        angles (ndarray): angles to check
+        rad_angle_epsilon (float): angle diff that can be merged
+        total (int): number of contours
+    """
+    boxy = np.zeros(total, dtype=bool)
+    for step in range(1, len(angles)):
+        same = owner[step:] == owner[:-step]
+        if not same.any():
+            break
+        # orientation_diff is at most 90 degrees
+        near_ninety = orientation_diff(angles[step:], angles[:-step]) >= ninety_degree-rad_angle_epsilon
+        boxy[owner[step:][same & near_ninety]] = True
+    return boxy
+
+
+def is_boxy_many(points, offsets, angle_epsilon=8, parallel_epsilon=0.5, min_size=5, gap_epsilon=10, line_epsilon=3, stats=None):
+    """Wheter each contour of a ragged buffer resemble a box
+
+    Same answer as calling is_boxy on every contour
+
+    Args:
+        points (ArrayLike): (N,2) or (N,1,2) points of all contours
+        offsets (ArrayLike): contour i is points[offsets[i]:offsets[i+1]]
+        angle_epsilon: angle diff that can be merged
+        parallel_epsilon: how much can parallel lines differ
+        min_size: min size that a segment must have
+        gap_epsilon: min gap before merging segments
+        line_epsilon: max offset between segments of the same line
+        stats (DetectionStats): optional sub-stage times and segment counts
+    Returns:
+        ndarray: boolean mask, one item per contour
+    """
+    rad_angle_epsilon = round((angle_epsilon*np.pi)/180, 4)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    total = len(offsets) - 1
+    with stage_timer(stats, "is_boxy.segments"):
+        owner, segments = segment_arrays(
+            contour_points(points), offsets, min_size=min_size)
+    if stats is not None:
+        stats.add_count("is_boxy.contours", total)
+        stats.add_count("is_boxy.segments", len(segments))
+    if not len(segments):
+        return np.zeros(total, dtype=bool)
+
+    with stage_timer(stats, "is_boxy.flatten_angles"):
+        angle = segments.orientations()
+        # Angles binned per contour, grouped on a scan of the used bins
+        bins, count = angle_bins(angle, rad_angle_epsilon)
+        group = bin_groups(owner, bins, count)
+        # The first segment of a group is its pivot
+        _, first_segment = np.unique(group, return_index=True)
+        group_owner = owner[first_segment]
+        group_angle = angle[first_segment]
+        pivot = angle == group_angle[group]
+        norm = segments.unit[first_segment][group]
+
+        # Segments not on the group angle are projected on the group norm
+        if not pivot.all():
+            segments = segments.project(norm, where=~pivot)
+    if stats is not None:
+        stats.add_count("is_boxy.angle_groups", len(first_segment))
+
+    with stage_timer(stats, "is_boxy.flatten_line_segment"):
+        lines, line_group = segments.merge_lines(
+            norm, gap_epsilon=gap_epsilon, line_epsilon=line_epsilon, group=group)
+    if stats is not None:
+        stats.add_count("is_boxy.lines", len(lines))
+
+    with stage_timer(stats, "is_boxy.parallel"):
+        valid = lines.length >= min_size
+        parallel = has_parallel_groups(
+            line_group[valid], lines.length[valid], parallel_epsilon=parallel_epsilon)
+
+    with stage_timer(stats, "is_boxy.perpendicular"):
+        boxy = has_perpendicular(
+            group_owner[parallel], group_angle[parallel], rad_angle_epsilon, total)
+    if stats is not None:
+        stats.add_count("is_boxy.boxy", boxy.sum())
+    return boxy
+
+
+def is_boxy_array(points, angle_epsilon=8, parallel_epsilon=0.5, min_size=5, gap_epsilon=10, line_epsilon=3):
+    """Wheter a point set resemble a box, vectorized version of is_boxy
+    Args:
+        points (ArrayLike): (N,1,2) contour or list of (x,y) points
+        angle_epsilon: angle diff that can be merged
+        parallel_epsilon: how much can parallel lines differ
+        min_size: min size that a segment must have
+        gap_epsilon: min gap before merging segments
+        line_epsilon: max offset between segments of the same line
+    """
+    points = contour_points(points)
+    return bool(is_boxy_many(
+        points, [0, len(points)], angle_epsilon=angle_epsilon,
+        parallel_epsilon=parallel_epsilon, min_size=min_size,
+        gap_epsilon=gap_epsilon, line_epsilon=line_epsilon)[0])
@@ -0,0 +1,72 @@
+"""Detection stats
+    Optional wall time per stage and counters of the detection pipeline.
+
+    Every instrumented function takes stats=None, when it is None the
+    only cost is that check, so leaving it out keeps the pipeline as fast
+    as before.
+"""
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+NULL_TIMER = nullcontext()
+
+
+class DetectionStats:
+
+    """Wall time per stage and counters of one or more detection runs
+
+    Attributes:
+        times (OrderedDict): seconds spent on each stage
+        counts (OrderedDict): items that reached each point of the pipeline
+        callback (Callable): optional hook called as callback(stage, seconds)
+            every time a stage finishes
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        """Zero all times and counters"""
+        self.times = OrderedDict()
+        self.counts = OrderedDict()
+
+    def add_time(self, stage, seconds):
+        self.times[stage] = self.times.get(stage, 0.0) + seconds
+        if self.callback is not None:
+            self.callback(stage, seconds)
+
+    def add_count(self, name, count=1):
+        self.counts[name] = self.counts.get(name, 0) + int(count)
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the block as stage"""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, perf_counter() - start)
+
+    def merge(self, other):
+        """Add the times and counters of other stats"""
+        for stage, seconds in other.times.items():
+            self.times[stage] = self.times.get(stage, 0.0) + seconds
+        for name, count in other.counts.items():
+            self.add_count(name, count)
+
+    def as_dict(self):
+        return {"times": dict(self.times), "counts": dict(self.counts)}
+
+    def __repr__(self):
+        times = ", ".join("%s=%.6fs" % item for item in self.times.items())
+        counts = ", ".join("%s=%d" % item for item in self.counts.items())
+        return "DetectionStats(%s; %s)" % (times, counts)
+
+
+def stage_timer(stats, stage):
+    """stats.timer(stage), or a context doing nothing when stats is None"""
+    if stats is None:
+        return NULL_TIMER
+    return stats.timer(stage)
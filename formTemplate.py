@@ -0,0 +1,216 @@
+"""Form templates
+    Pages of a known form layout are checked only around the boxes found
+    on a reference page of that form.
+
+    Every template box gets a small ROI, grown by max_offset, where the
+    closed contour of about the same size nearest to the expected center
+    is taken as the box. The median shift of the boxes found is the page
+    offset, a page where too few boxes agree with it is not aligned and
+    goes through the full page scan instead.
+"""
+from collections import OrderedDict, namedtuple
+import json
+
+import numpy as np
+
+from boxDetector.checkBoxDetector import (
+    formatBox,
+    get_filled_contours_from_image,
+    iter_filled_contours,
+    to_gray
+)
+from boxDetector.lazyImport import lazy_module
+from boxDetector.shapeEngines import get_engine
+from boxDetector.tiledDetector import box_center
+
+cv2 = lazy_module("cv2")
+
+FormTemplate = namedtuple("FormTemplate", "name width height boxes")
+TemplateResult = namedtuple("TemplateResult", "name aligned offset filled boxes")
+
+# iter_filled_contours arguments used by the ROI engine check
+BOXY_PARAMS = ("angle_epsilon", "parallel_epsilon", "min_size", "gap_epsilon", "line_epsilon")
+
+
+def box_side(box):
+    """Mean side of a box given by its 4 points"""
+    points = np.asarray(box, dtype=np.float64)
+    return float(np.mean(np.linalg.norm(points - np.roll(points, 1, axis=0), axis=1)))
+
+
+def find_box(thresh, left, top, center, side, size_tolerance=0.25):
+    """Closed contour of an ROI nearest to the expected box
+
+    Args:
+        thresh (ndarray): thresholded ROI
+        left (int): ROI left on the page
+        top (int): ROI top on the page
+        center (Tuple(float,float)): expected center on the page
+        side (float): expected box side
+        size_tolerance (float): max side difference as part of side
+    Returns:
+        Tuple(ndarray,ndarray,bool): contour, its boxPoints on the page and
+            whether it is filled, None when no box is found
+    """
+    contours, hierarchy = cv2.findContours(thresh, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)[-2:]
+    if hierarchy is None:
+        return None
+    next_contour, _, child, parent = hierarchy.reshape(-1, 4).T
+    best = None
+    best_distance = None
+    for i in np.flatnonzero((child != -1) & (parent != -1)):
+        rect = cv2.minAreaRect(contours[i])
+        width, height = rect[1]
+        if max(abs(width - side), abs(height - side)) > size_tolerance*side:
+            continue
+        distance = np.hypot(rect[0][0] + left - center[0], rect[0][1] + top - center[1])
+        if best is None or distance < best_distance:
+            best, best_distance = (i, rect), distance
+    if best is None:
+        return None
+    i, rect = best
+    box = cv2.boxPoints(rect) + np.array([left, top], dtype=np.float32)
+    return contours[i], box, next_contour[child[i]] != -1
+
+
+class TemplateRegistry:
+
+    """Registered form templates by name
+
+    Attributes:
+        templates (OrderedDict): FormTemplate by name
+        max_offset (int): max page shift searched, in pixels
+        margin (int): pixels added to every ROI besides max_offset
+        min_aligned (float): part of the boxes that must agree on the offset
+        offset_tolerance (float): max distance of a box from the page offset
+        size_tolerance (float): max box side difference as part of the side
+    """
+
+    def __init__(self, max_offset=12, margin=4, min_aligned=0.6, offset_tolerance=3.0,
+                 size_tolerance=0.25):
+        self.templates = OrderedDict()
+        self.max_offset = max_offset
+        self.margin = margin
+        self.min_aligned = min_aligned
+        self.offset_tolerance = offset_tolerance
+        self.size_tolerance = size_tolerance
+
+    def register(self, name, img, **params):
+        """Register the boxes get_filled_contours finds on a reference page
+
+        Every box of the form must be checked on the reference page.
+
+        Args:
+            name (str): template name
+            img (ndarray): reference page
+            params: iter_filled_contours keyword arguments
+        Returns:
+            FormTemplate: the registered template
+        """
+        boxes = get_filled_contours_from_image(img, **params)
+        return self.add(name, img.shape[1], img.shape[0], boxes)
+
+    def add(self, name, width, height, boxes):
+        """Register a template from its boxes"""
+        boxes = [[(float(x), float(y)) for x, y in box] for box in boxes]
+        template = FormTemplate(name, width, height, boxes)
+        self.templates[name] = template
+        return template
+
+    def __contains__(self, name):
+        return name in self.templates
+
+    def __len__(self):
+        return len(self.templates)
+
+    def save(self, path):
+        with open(path, "w") as output:
+            json.dump([template._asdict() for template in self.templates.values()], output)
+
+    def load(self, path):
+        """Register the templates of a file written by save"""
+        with open(path) as source:
+            for template in json.load(source):
+                self.add(template["name"], template["width"], template["height"],
+                         template["boxes"])
+
+    def detect(self, name, img, **params):
+        """Filled state of the template boxes on a page of that form
+
+        Args:
+            name (str): template name
+            img (ndarray): BGR, BGRA or grayscale page
+            params: iter_filled_contours keyword arguments
+        Returns:
+            TemplateResult: aligned is False when the full scan was used,
+                filled has one item per template box and boxes are the
+                filled boxes on the page
+        """
+        template = self.templates[name]
+        gray = to_gray(img)
+        found = []
+        for box in template.boxes:
+            found.append(self._find_box(gray, box, (0.0, 0.0)))
+        shifts = np.array([shift for shift, _ in filter(None, found)]).reshape(-1, 2)
+        if not len(shifts):
+            return self._full_scan(template, img, params)
+        offset = np.median(shifts, axis=0)
+        agreeing = np.hypot(*(shifts - offset).T) <= self.offset_tolerance
+        if agreeing.sum() < self.min_aligned*len(template.boxes):
+            return self._full_scan(template, img, params)
+
+        filled = []
+        boxes = []
+        candidates = []
+        for box, match in zip(template.boxes, found):
+            if match is not None and np.hypot(*(match[0] - offset)) > self.offset_tolerance:
+                # Another contour was taken, look again where the offset puts the box
+                match = self._find_box(gray, box, offset)
+            if match is None or not match[1][2]:
+                filled.append(False)
+                continue
+            filled.append(None)
+            candidates.append((len(filled) - 1, match[1]))
+        if candidates:
+            boxy_params = {key: params[key] for key in BOXY_PARAMS if key in params}
+            engine = get_engine(params.get("engine", "robust"))
+            boxy = engine([cnt for _, (cnt, _, _) in candidates], **boxy_params)
+            for (index, (_, box, _)), is_box in zip(candidates, boxy):
+                filled[index] = bool(is_box)
+                if is_box:
+                    boxes.append(formatBox(box))
+        return TemplateResult(name, True, (float(offset[0]), float(offset[1])), filled, boxes)
+
+    def _find_box(self, gray, box, offset):
+        """Shift and match of a template box, None when it is not found"""
+        height, width = gray.shape
+        points = np.asarray(box, dtype=np.float64) + offset
+        grow = self.max_offset + self.margin
+        left = max(int(np.floor(points[:, 0].min())) - grow, 0)
+        top = max(int(np.floor(points[:, 1].min())) - grow, 0)
+        right = min(int(np.ceil(points[:, 0].max())) + grow + 1, width)
+        bottom = min(int(np.ceil(points[:, 1].max())) + grow + 1, height)
+        if right <= left or bottom <= top:
+            return None
+        ret, thresh = cv2.threshold(gray[top:bottom, left:right], 127, 255, 0)
+        center = points.mean(axis=0)
+        match = find_box(thresh, left, top, center, box_side(box),
+                         size_tolerance=self.size_tolerance)
+        if match is None:
+            return None
+        shift = match[1].mean(axis=0) - center + offset
+        if np.hypot(*shift) > self.max_offset:
+            return None
+        return shift, match
+
+    def _full_scan(self, template, img, params):
+        """Full page scan, the template boxes are matched to the boxes found"""
+        boxes = list(iter_filled_contours(img, **params))
+        centers = np.array([box_center(box) for box in boxes], dtype=np.float64).reshape(-1, 2)
+        filled = []
+        for box in template.boxes:
+            x, y = box_center(box)
+            limit = box_side(box)/2.0 + self.max_offset
+            filled.append(bool(len(centers)) and
+                          bool(np.min(np.hypot(centers[:, 0] - x, centers[:, 1] - y)) <= limit))
+        return TemplateResult(template.name, False, None, filled, boxes)
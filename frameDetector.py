@@ -0,0 +1,241 @@
+"""Frame detection
+    Stateful detector for a stream of nearly identical frames, e.g. a
+    document camera.
+
+    Every frame is thresholded and compared with the previous one on a
+    grid of blocks. Only the dirty blocks, grown to hold every known box
+    they touch, go through findContours and is_boxy again, a static frame
+    costs the threshold and the comparison.
+
+    Every box, filled or not, is tracked with an id kept across frames.
+    Boxes are found with the "list" retrieval and their fill ratio, so a
+    box being checked keeps its id and only changes its filled state.
+"""
+from collections import namedtuple
+from itertools import count
+
+import numpy as np
+
+from boxDetector.checkBoxDetector import DEFAULT_FILL_THRESHOLD, iter_scored_contours, to_gray
+from boxDetector.detectionStats import stage_timer
+from boxDetector.lazyImport import lazy_module
+from boxDetector.spatialIndex import box_bounds, non_max_suppression
+from boxDetector.tiledDetector import Tile, box_center
+
+cv2 = lazy_module("cv2")
+
+TrackedBox = namedtuple("TrackedBox", "id box fill filled")
+BoxChange = namedtuple("BoxChange", "id kind")
+FrameResult = namedtuple("FrameResult", "index boxes changes dirty")
+
+
+def dirty_regions(changed, block_size=32, min_changed=0):
+    """Tiles covering the changed pixels, on whole blocks
+
+    The changed pixels of every block are counted on an integral image,
+    an unchanged frame stops at a single countNonZero.
+
+    Args:
+        changed (ndarray): mask of the changed pixels, nonzero is changed
+        block_size (int): side of the comparison blocks
+        min_changed (int): changed pixels a block can have and stay clean
+    Returns:
+        List[Tile]: one tile per group of touching dirty blocks
+    """
+    mask = (changed != 0).view(np.uint8)
+    if cv2.countNonZero(mask) <= min_changed:
+        return []
+    height, width = mask.shape
+    rows, columns = -(-height//block_size), -(-width//block_size)
+    integral = cv2.integral(mask)
+    ys = np.minimum(np.arange(rows + 1)*block_size, height)
+    xs = np.minimum(np.arange(columns + 1)*block_size, width)
+    corners = integral[np.ix_(ys, xs)]
+    counts = corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+    dirty = (counts > min_changed).astype(np.uint8)
+    if not dirty.any():
+        return []
+    found, _, blocks, _ = cv2.connectedComponentsWithStats(dirty, connectivity=8)
+    regions = []
+    for left, top, block_width, block_height, _ in blocks[1:].tolist():
+        regions.append(Tile(left*block_size, top*block_size,
+                            min((left + block_width)*block_size, width),
+                            min((top + block_height)*block_size, height)))
+    return regions
+
+
+def overlaps(first, second):
+    return (first.left < second.right and second.left < first.right
+            and first.top < second.bottom and second.top < first.bottom)
+
+
+def inside(inner, outer):
+    return (inner.left >= outer.left and inner.top >= outer.top
+            and inner.right <= outer.right and inner.bottom <= outer.bottom)
+
+
+def merge_regions(regions):
+    """Join the overlapping tiles until none overlap"""
+    regions = list(regions)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                if overlaps(regions[i], regions[j]):
+                    first, second = regions[i], regions.pop(j)
+                    regions[i] = Tile(min(first.left, second.left), min(first.top, second.top),
+                                      max(first.right, second.right), max(first.bottom, second.bottom))
+                    merged = True
+                    break
+            if merged:
+                break
+    return regions
+
+
+class FrameDetector:
+
+    """Boxes of a frame stream, re-detected only where the frames change
+
+    Attributes:
+        block_size (int): side of the comparison blocks
+        min_changed (int): changed pixels a block can have and stay clean
+        margin (int): pixels added around a dirty region
+        fill_threshold (float): min fill ratio of a filled box
+        match_distance (float): max center move of a box keeping its id,
+            half the box side by default
+        params (dict): iter_scored_contours keyword arguments
+        boxes (dict): TrackedBox of every id
+        frames (int): frames seen
+    """
+
+    def __init__(self, block_size=32, min_changed=0, margin=8, fill_threshold=DEFAULT_FILL_THRESHOLD,
+                 match_distance=None, **params):
+        self.block_size = block_size
+        self.min_changed = min_changed
+        self.margin = margin
+        self.fill_threshold = fill_threshold
+        self.match_distance = match_distance
+        self.params = params
+        self.reset()
+
+    def reset(self):
+        """Forget the previous frame and every box"""
+        self.boxes = {}
+        self.frames = 0
+        self._thresh = None
+        self._ids = count()
+
+    def update(self, frame, stats=None):
+        """Detect the boxes of the next frame
+
+        Args:
+            frame (ndarray): BGR, BGRA or grayscale frame
+            stats (DetectionStats): optional times and dirty region counts
+        Returns:
+            FrameResult: frame index, TrackedBox list sorted by id, the
+                BoxChange list and the re-detected tiles
+        """
+        with stage_timer(stats, "frame.diff"):
+            gray = to_gray(frame)
+            _, thresh = cv2.threshold(gray, 127, 255, 0)
+            height, width = thresh.shape
+            if self._thresh is None or self._thresh.shape != thresh.shape:
+                self.boxes = {}
+                regions = [Tile(0, 0, width, height)]
+            else:
+                regions = dirty_regions(cv2.compare(self._thresh, thresh, cv2.CMP_NE),
+                                        self.block_size, self.min_changed)
+            self._thresh = thresh
+        index = self.frames
+        self.frames += 1
+        if stats is not None:
+            stats.add_count("frame.dirty_regions", len(regions))
+        if not regions:
+            return FrameResult(index, self.tracked(), [], [])
+        with stage_timer(stats, "frame.detect"):
+            regions = self._grow(regions, width, height)
+            changes = []
+            for region in regions:
+                changes.extend(self._detect_region(gray, region, width, height))
+        return FrameResult(index, self.tracked(), changes, regions)
+
+    def tracked(self):
+        """TrackedBox list sorted by id"""
+        return [self.boxes[box_id] for box_id in sorted(self.boxes)]
+
+    def _grow(self, regions, width, height):
+        """Pad the regions and grow them over the known boxes they touch"""
+        regions = [Tile(max(region.left - self.margin, 0), max(region.top - self.margin, 0),
+                        min(region.right + self.margin, width), min(region.bottom + self.margin, height))
+                   for region in regions]
+        bounds = [self._padded_bounds(tracked.box, width, height) for tracked in self.boxes.values()]
+        while True:
+            regions = merge_regions(regions)
+            grown = []
+            for region in regions:
+                for box in bounds:
+                    if overlaps(region, box) and not inside(box, region):
+                        region = Tile(min(region.left, box.left), min(region.top, box.top),
+                                      max(region.right, box.right), max(region.bottom, box.bottom))
+                grown.append(region)
+            if grown == regions:
+                return regions
+            regions = grown
+
+    def _padded_bounds(self, box, width, height):
+        left, top, right, bottom = box_bounds([box])[0].tolist()
+        return Tile(max(int(left) - self.margin, 0), max(int(top) - self.margin, 0),
+                    min(int(np.ceil(right)) + self.margin + 1, width),
+                    min(int(np.ceil(bottom)) + self.margin + 1, height))
+
+    def _detect_region(self, gray, region, width, height):
+        view = gray[region.top:region.bottom, region.left:region.right]
+        found = []
+        for scored in iter_scored_contours(view, retrieval="list", fill_threshold=0.0, **self.params):
+            box = [(x + region.left, y + region.top) for x, y in scored.box]
+            left, top, right, bottom = box_bounds([box])[0].tolist()
+            # A box cut by an inner edge of the region is not whole
+            if (region.left > 0 and left <= region.left) or (region.top > 0 and top <= region.top) \
+                    or (region.right < width and right >= region.right - 1) \
+                    or (region.bottom < height and bottom >= region.bottom - 1):
+                continue
+            found.append((box, scored.fill))
+        # The inner outline of an empty box is inside the outer one
+        kept = non_max_suppression([box for box, _ in found])
+        found = [found[i] for i in sorted(kept)]
+
+        old = dict((box_id, tracked) for box_id, tracked in self.boxes.items()
+                   if inside(Tile(*box_bounds([tracked.box])[0].tolist()), region))
+        for box_id in old:
+            del self.boxes[box_id]
+        changes = []
+        for box, fill in found:
+            filled = fill >= self.fill_threshold
+            match = self._match(box, old)
+            if match is None:
+                box_id = next(self._ids)
+                changes.append(BoxChange(box_id, "new"))
+            else:
+                box_id = match.id
+                del old[box_id]
+                if filled != match.filled:
+                    changes.append(BoxChange(box_id, "filled" if filled else "cleared"))
+            self.boxes[box_id] = TrackedBox(box_id, box, fill, filled)
+        changes.extend(BoxChange(box_id, "removed") for box_id in sorted(old))
+        return changes
+
+    def _match(self, box, candidates):
+        """The candidate box nearest to box, if it is close enough"""
+        x, y = box_center(box)
+        left, top, right, bottom = box_bounds([box])[0].tolist()
+        limit = self.match_distance
+        if limit is None:
+            limit = min(right - left, bottom - top)/2.0
+        best, best_distance = None, None
+        for tracked in candidates.values():
+            other_x, other_y = box_center(tracked.box)
+            distance = np.hypot(x - other_x, y - other_y)
+            if distance <= limit and (best is None or distance < best_distance):
+                best, best_distance = tracked, distance
+        return best
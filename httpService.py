@@ -0,0 +1,211 @@
+"""HTTP service
+    A small local HTTP/1.1 server over AsyncDetector, only the standard
+    library is needed.
+
+    POST /detect with the encoded image as body, the detector parameters
+    go on the query string (/detect?engine=cascade&min_rect_size=20).
+    The answer is {"boxes": [...]}, or {"error": ...} with
+    400 for an empty body, an image or parameter that can not be used
+    413 for a body over max_body
+    500 for any other detection error
+    503 when the queue is full, with a Retry-After header
+    504 when the request timed out
+    GET /health gives the detector counters.
+
+    python -m boxDetector.httpService --port 8080 -j 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qsl, urlsplit
+
+from boxDetector.asyncDetector import AsyncDetector, DetectorBusy
+from boxDetector.lazyImport import lazy_module
+
+cv2 = lazy_module("cv2")
+logger = logging.getLogger(__name__)
+
+# Query string parameters and their type
+QUERY_PARAMS = {
+    "min_rect_size": float,
+    "angle_epsilon": float,
+    "parallel_epsilon": float,
+    "min_size": float,
+    "gap_epsilon": float,
+    "line_epsilon": float,
+    "engine": str,
+    "fill_threshold": float,
+    "retrieval": str,
+    "timeout": float,
+}
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+def query_params(query):
+    """Detector keyword arguments of a query string
+
+    Raises:
+        ValueError: unknown parameter or value of the wrong type
+    """
+    params = {}
+    for name, value in parse_qsl(query, keep_blank_values=True):
+        if name not in QUERY_PARAMS:
+            raise ValueError("Unknown parameter %r" % name)
+        params[name] = QUERY_PARAMS[name](value)
+    return params
+
+
+async def read_request(reader):
+    """Method, target, headers and content length of the next request
+
+    Returns None when the client closed the connection.
+    """
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    method, target, version = line.decode("latin-1").split()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    keep_alive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+    return method, target, int(headers.get("content-length", 0)), keep_alive
+
+
+class DetectionService:
+
+    """Routes of the HTTP service
+
+    Attributes:
+        detector (AsyncDetector): started detector
+        max_body (int): max request body in bytes
+    """
+
+    def __init__(self, detector, max_body=32*1024*1024):
+        self.detector = detector
+        self.max_body = max_body
+
+    async def handle(self, reader, writer):
+        """Serve the requests of a connection until it is closed"""
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ValueError:
+                    await self.respond(writer, 400, {"error": "Malformed request"}, False)
+                    break
+                if request is None:
+                    break
+                method, target, length, keep_alive = request
+                if length > self.max_body:
+                    await self.respond(writer, 413, {"error": "Body over %d bytes" % self.max_body}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.route(method, target, body)
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, target, body):
+        """Status and JSON payload of a request"""
+        url = urlsplit(target)
+        if url.path == "/health":
+            if method != "GET":
+                return 405, {"error": "Use GET"}
+            detector = self.detector
+            return 200, {"queued": detector.queued, "completed": detector.completed,
+                         "rejected": detector.rejected, "timeouts": detector.timeouts,
+                         "batches": detector.batches}
+        if url.path != "/detect":
+            return 404, {"error": "Not found"}
+        if method != "POST":
+            return 405, {"error": "Use POST"}
+        if not body:
+            return 400, {"error": "Empty body, send the encoded image"}
+        try:
+            params = query_params(url.query)
+            boxes = await self.detector.detect(body, **params)
+        except DetectorBusy as error:
+            return 503, {"error": str(error)}
+        except asyncio.TimeoutError:
+            return 504, {"error": "Timed out"}
+        except (ValueError, IOError, cv2.error) as error:
+            return 400, {"error": "%s: %s" % (type(error).__name__, error)}
+        except Exception as error:
+            # Every request gets an answer, the connection stays usable
+            logger.exception("Detection failed on %s", target)
+            return 500, {"error": "%s: %s" % (type(error).__name__, error)}
+        return 200, {"boxes": boxes}
+
+    async def respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        headers = [
+            "HTTP/1.1 %d %s" % (status, REASONS[status]),
+            "Content-Type: application/json",
+            "Content-Length: %d" % len(body),
+            "Connection: %s" % ("keep-alive" if keep_alive else "close"),
+        ]
+        if status == 503:
+            headers.append("Retry-After: 1")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(detector, host="127.0.0.1", port=8080, max_body=32*1024*1024):
+    """Start the service of a started detector
+
+    Returns:
+        asyncio.AbstractServer: the listening server, port 0 picks a free one
+    """
+    service = DetectionService(detector, max_body=max_body)
+    return await asyncio.start_server(service.handle, host, port)
+
+
+async def run_service(args):
+    detector = AsyncDetector(
+        workers=args.workers, processes=args.processes, max_queue=args.max_queue,
+        timeout=args.timeout, batch_size=args.batch_size, batch_delay=args.batch_delay)
+    async with detector:
+        server = await serve(detector, args.host, args.port, args.max_body)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Box detector HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("-j", "--workers", type=int, help="requests run at once, the cpu count by default")
+    parser.add_argument("--processes", action="store_true", help="run on processes instead of threads")
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--batch-delay", type=float, default=0.002)
+    parser.add_argument("--max-body", type=int, default=32*1024*1024)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run_service(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Lazy import
+    Modules loaded on their first attribute access.
+
+    OpenCV takes most of the package import time, the modules that use it
+    keep a lazy_module("cv2") so importing them, or the geometry they
+    share with point list callers, does not load it.
+"""
+import importlib
+import threading
+
+
+class LazyModule:
+
+    """Stand in for a module, imported when an attribute is first read
+
+    Attributes:
+        name (str): module name
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """The real module, importing it on the first call"""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self.name)
+        return self._module
+
+    @property
+    def loaded(self):
+        """Whether the module was imported"""
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        if attr.startswith("__") or attr in ("_module", "_lock"):
+            raise AttributeError(attr)
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        return "LazyModule(%r, loaded=%r)" % (self.name, self.loaded)
+
+
+def lazy_module(name):
+    """A LazyModule of name, the module itself when it is already imported"""
+    module = importlib.sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
@@ -1,14 +1,280 @@
 # -*- coding: latin-1 -*-
+import math
+
 import numpy as np
 
 def vector_length(vector):
     return (vector[0]**2+vector[1]**2)**0.5
 
+def orient_points(start, end):
+    """Order segment ends so a is the point nearest to the origin
+
+    Same rule as LineSegment, swapping when start is after end on x or y
+
+    Args:
+        start (ndarray): (M,2) first points
+        end (ndarray): (M,2) second points
+    Returns:
+        Tuple(ndarray,ndarray): a and b points
+    """
+    swap = ((start[:, 0] > end[:, 0]) | (start[:, 1] > end[:, 1]))[:, None]
+    return np.where(swap, end, start), np.where(swap, start, end)
+
+
+class SegmentArray:
+
+    """Many line segments stored as columns
+
+    Struct of arrays version of LineSegment, every attribute is a column
+    with one row per segment. Indexing with an int gives a LineSegment
+    view of that row, any other index gives a new SegmentArray.
+
+    Attributes:
+        a (ndarray): (M,2) start points nearest to the origin
+        b (ndarray): (M,2) end points furthest to the origin
+        vector (ndarray): (M,2) the vectors b-a
+        unit (ndarray): (M,2) the unit vectors, 0 for empty segments
+        length (ndarray): the size of each vector
+        dist_to_origin (ndarray): the size of each a
+        angle_precision (int): decimal point precision,defaults to 4
+
+    The columns after a and b are computed on first use, most arrays
+    built by the merge steps only need some of them.
+    """
+
+    __slots__ = ['a', 'b', 'angle_precision', '_vector', '_unit', '_length', '_dist_to_origin']
+
+    def __init__(self, point_a, point_b, angle_precision=4, orient=True):
+        """
+        Args:
+            point_a (ArrayLike): (M,2) start points
+            point_b (ArrayLike): (M,2) end points
+            angle_precision (int): decimal point precision,defaults to 4
+            orient (bool): swap the points like LineSegment,
+                False when they already are in order
+        """
+        point_a = np.array(point_a, dtype=np.float64).reshape(-1, 2)
+        point_b = np.array(point_b, dtype=np.float64).reshape(-1, 2)
+        if orient:
+            point_a, point_b = orient_points(point_a, point_b)
+        self.a = point_a
+        self.b = point_b
+        self.angle_precision = angle_precision
+        self._set_vectors()
+
+    def _set_vectors(self):
+        self._vector = None
+        self._unit = None
+        self._length = None
+        self._dist_to_origin = None
+
+    @property
+    def vector(self):
+        if self._vector is None:
+            self._vector = self.b - self.a
+        return self._vector
+
+    @property
+    def length(self):
+        if self._length is None:
+            self._length = vector_length(self.vector.T)
+        return self._length
+
+    @property
+    def unit(self):
+        if self._unit is None:
+            self._unit = np.zeros_like(self.vector)
+            np.divide(self.vector, self.length[:, None], out=self._unit,
+                      where=self.length[:, None] > 0.0)
+        return self._unit
+
+    @property
+    def dist_to_origin(self):
+        if self._dist_to_origin is None:
+            self._dist_to_origin = vector_length(self.a.T)
+        return self._dist_to_origin
+
+    @classmethod
+    def wrap(cls, point_a, point_b, angle_precision=4):
+        """Array on (M,2) float64 points already in order, without a copy"""
+        segments = cls.__new__(cls)
+        segments.a = point_a
+        segments.b = point_b
+        segments.angle_precision = angle_precision
+        segments._set_vectors()
+        return segments
+
+    @classmethod
+    def from_segments(cls, segments, angle_precision=4):
+        """Build the array from LineSegment items
+
+        Args:
+            segments (Iterable): LineSegment items, a SegmentArray is
+                returned as it is
+            angle_precision (int): decimal point precision,defaults to 4
+        """
+        if isinstance(segments, cls):
+            return segments
+        segments = list(segments)
+        return cls([segment.a for segment in segments],
+                   [segment.b for segment in segments],
+                   angle_precision=angle_precision, orient=False)
+
+    @classmethod
+    def concat(cls, arrays):
+        """Join many SegmentArray on a new one"""
+        arrays = list(arrays)
+        return cls.wrap(np.concatenate([array.a for array in arrays]),
+                        np.concatenate([array.b for array in arrays]),
+                        arrays[0].angle_precision)
+
+    def __len__(self):
+        return len(self.a)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError("segment index out of range")
+            return LineSegment.view(self, int(index))
+        return SegmentArray(self.a[index], self.b[index],
+                            angle_precision=self.angle_precision, orient=False)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield LineSegment.view(self, index)
+
+    def __repr__(self):
+        return "SegmentArray(%d segments)" % len(self)
+
+    def angles(self, relative_to=(1, 0)):
+        """ get the angle between every segment and some vector
+                Args:
+                        relative_to (ArrayLike): optional defaults to 1,0
+        """
+        v2_u = relative_to
+        if relative_to != (1, 0):
+            v2_u = LineSegment.get_unit_vector(relative_to[0], relative_to[1])
+        angle = np.arccos(np.abs(self.unit.dot(v2_u)))
+        angle[self.length <= 0.0] = 0.0
+        return np.round(angle, self.angle_precision)
+
+    def orientations(self):
+        """ get the undirected angle of every segment with the x axis
+
+        Unlike angles, a segment and its mirror on the x axis get different
+        values, they are on [0,pi) and pi is the same as 0
+        """
+        angle = np.round(
+            np.arctan2(self.vector[:, 1], self.vector[:, 0]) % np.pi, self.angle_precision)
+        angle[(self.length <= 0.0) | (angle >= round(np.pi, self.angle_precision))] = 0.0
+        return angle
+
+    def project(self, to_project, where=None):
+        """Project the segments on unit vectors, keeping their a point
+
+        Args:
+            to_project (ArrayLike): one unit vector or one per segment
+            where (ndarray): optional mask of the segments to project,
+                the others are kept as they are
+        """
+        to_project = np.asarray(to_project, dtype=np.float64)
+        dot = (self.vector*to_project).sum(axis=1)
+        point_a, point_b = orient_points(self.a, self.a + dot[:, None]*to_project)
+        if where is not None:
+            where = np.asarray(where)[:, None]
+            point_a = np.where(where, point_a, self.a)
+            point_b = np.where(where, point_b, self.b)
+        return SegmentArray.wrap(point_a, point_b, self.angle_precision)
+
+    def argsort(self):
+        """Order of the segments by distance to origin, stable"""
+        return np.argsort(self.dist_to_origin, kind="stable")
+
+    def sorted(self):
+        """The segments sorted by distance to origin"""
+        return self[self.argsort()]
+
+    def offsets(self, norm):
+        """Signed distance of every segment line to a parallel line on the origin
+
+        Args:
+            norm (ArrayLike): one unit vector or one per segment
+        """
+        norm = np.asarray(norm, dtype=np.float64)
+        return norm[..., 0]*self.a[:, 1] - norm[..., 1]*self.a[:, 0]
+
+    def merge_lines(self, norm, gap_epsilon=10, line_epsilon=3, group=None):
+        """Merge the collinear segments of every group at once
+
+        The segments of a group are clustered on lines by their offset,
+        then the intervals of each line closer than gap_epsilon are merged
+        with a sort and a running max of their ends. Lines on the same
+        offset or intervals of the same line are all kept.
+
+        Args:
+            norm (ArrayLike): unit vector of the group, one or one per segment
+            gap_epsilon: what is the gap_epsilon to merge
+            line_epsilon: max offset between neighbour segments of a line
+            group (ndarray): optional group of each segment
+        Returns:
+            Tuple(SegmentArray,ndarray): merged lines, sorted by group,
+                offset and position on the line, and the group of each one
+        """
+        total = len(self)
+        if group is None:
+            group = np.zeros(total, dtype=np.intp)
+        if not total:
+            return self, group
+        norm = np.asarray(norm, dtype=np.float64)
+        offset = self.offsets(norm)
+        at_a = (self.a*norm).sum(axis=1)
+        at_b = (self.b*norm).sum(axis=1)
+        start = np.minimum(at_a, at_b)
+        end = np.maximum(at_a, at_b)
+
+        # Lines are runs of close offsets inside a group
+        order = np.lexsort((start, offset, group))
+        new_line = np.empty(total, dtype=bool)
+        new_line[0] = True
+        sorted_group = group[order]
+        new_line[1:] = (sorted_group[1:] != sorted_group[:-1]) | (np.diff(offset[order]) > line_epsilon)
+        line = np.empty(total, dtype=np.intp)
+        line[order] = np.cumsum(new_line)
+
+        # Intervals of each line by start, the running max end restarts on every line.
+        # It runs on the integer ranks of the ends, a float shift would round them
+        order = np.lexsort((start, line))
+        line, start, end = line[order], start[order], end[order]
+        by_end = np.argsort(end, kind="stable")
+        rank = np.empty_like(by_end)
+        rank[by_end] = np.arange(total)
+        shift = line*total
+        furthest = by_end[np.maximum.accumulate(rank + shift) - shift]
+        reach = end[furthest]
+        new_run = np.empty(total, dtype=bool)
+        new_run[0] = True
+        new_run[1:] = (line[1:] != line[:-1]) | (start[1:] - reach[:-1] >= gap_epsilon)
+        first = np.flatnonzero(new_run)
+        # The highest end rank of a run is the segment with its furthest end
+        last = by_end[np.maximum.reduceat(rank, first)]
+
+        first, last = order[first], order[last]
+        swap_first = (at_a[first] > at_b[first])[:, None]
+        swap_last = (at_a[last] > at_b[last])[:, None]
+        point_a = np.where(swap_first, self.b[first], self.a[first])
+        point_b = np.where(swap_last, self.a[last], self.b[last])
+        return SegmentArray.wrap(point_a, point_b, self.angle_precision), group[first]
+
+
 class LineSegment:
 
     """Represents a line segment on a pixel plane
 
     Since we are handling pixels there all coordinates are discrete(int)
+    A LineSegment taken from a SegmentArray keeps its row, changing its
+    points with add_segment also changes the array.
 
     Attributes:
         a (Tuple(int,int)): start point nearest to the origin
@@ -21,8 +287,8 @@ class LineSegment:
         angle_precision (int): decimal point precision,defaults to 4
     """
 
-    __slots__ = ['a', 'b', 'x', 'y', 'vector',
-                 'unit_vector', 'length', 'angle_precision','dist_to_origin']
+    __slots__ = ['a', 'b', 'x', 'y', 'vector', 'unit_vector', 'length',
+                 'angle_precision', 'dist_to_origin', 'segments', 'index']
 
     def __init__(self, point_a, point_b, angle_precision=4):
         """
@@ -32,23 +298,45 @@ class LineSegment:
             angle_precision (int): decimal point precision,defaults to 4
         """
         if point_a[0] > point_b[0] or point_a[1] > point_b[1]:
-            temp = point_a
-            point_a = point_b
-            point_b = temp
-        self.a = point_a
-        self.b = point_b
+            point_a, point_b = point_b, point_a
+        self.a = tuple(point_a)
+        self.b = tuple(point_b)
         self.angle_precision = angle_precision
+        self.segments = None
+        self.index = None
         self._set_vector()
-        self.unit_vector = LineSegment.get_unit_vector(self.x, self.y)
 
-    def _set_vector(self):
-        self.vector = [self.b[0]-self.a[0], self.b[1]-self.a[1]]
-        self.x = self.vector[0]
-        self.y = self.vector[1]
-        self.length = vector_length(self.vector)
-        self.dist_to_origin = vector_length(self.a)
+    @classmethod
+    def view(cls, segments, index):
+        """Segment of a row of a SegmentArray
 
+        Args:
+            segments (SegmentArray): the array
+            index (int): the row
+        """
+        segment = cls.__new__(cls)
+        segment.a = tuple(segments.a[index].tolist())
+        segment.b = tuple(segments.b[index].tolist())
+        segment.angle_precision = segments.angle_precision
+        segment.segments = segments
+        segment.index = index
+        segment._set_vector()
+        return segment
 
+    def _set_vector(self):
+        self.x = self.b[0]-self.a[0]
+        self.y = self.b[1]-self.a[1]
+        self.vector = [self.x, self.y]
+        self.length = math.sqrt(self.x*self.x + self.y*self.y)
+        self.dist_to_origin = math.sqrt(self.a[0]*self.a[0] + self.a[1]*self.a[1])
+        if self.length > 0.0:
+            self.unit_vector = [self.x/self.length, self.y/self.length]
+        else:
+            self.unit_vector = None
+        if self.segments is not None:
+            self.segments.a[self.index] = self.a
+            self.segments.b[self.index] = self.b
+            self.segments._set_vectors()
 
     @staticmethod
     def get_unit_vector(x, y):
@@ -58,12 +346,10 @@ class LineSegment:
             x (int): x coordinate
             y (int): y coordinate
         """
-        vector = [x, y]
-        length = np.linalg.norm(vector) 
+        length = math.sqrt(x*x + y*y)
         if(length <= 0.0):
             return None
-        norm = vector / length
-        return [norm[0], norm[1]]
+        return [x/length, y/length]
 
     def get_angle(self, relative_to=(1, 0)):
         """ get the angle between this segment and some vector
@@ -73,11 +359,11 @@ class LineSegment:
         v2_u = relative_to
         if relative_to != (1, 0):
             v2_u = LineSegment.get_unit_vector(relative_to[0], relative_to[1])
-        # Not using the length since we are using both unit vectors
-        angle = np.arccos(abs(np.dot(self.unit_vector, v2_u)))
-        if np.isnan(angle):
+        if self.unit_vector is None or v2_u is None:
             return 0.0
-        return round(angle, self.angle_precision)
+        # Not using the length since we are using both unit vectors
+        cos = abs(self.unit_vector[0]*v2_u[0] + self.unit_vector[1]*v2_u[1])
+        return round(math.acos(min(cos, 1.0)), self.angle_precision)
 
     def __repr__(self):
         text = "[(%d,%d),(%d,%d)]  = (%d,%d) %dpx"
@@ -90,7 +376,7 @@ class LineSegment:
 
     def __hash__(self):
         return (self.a[0], self.a[1], self.b[0], self.b[1]).__hash__()
-    
+
     def __lt__(self, other):
         return self.dist_to_origin<other.dist_to_origin
 
@@ -98,7 +384,7 @@ class LineSegment:
     def get_projection(vector, uv):
         """Get the projection of vector on uv
         """
-        a1 = np.dot(vector, uv)
+        a1 = vector[0]*uv[0] + vector[1]*uv[1]
         return [a1*uv[0], a1*uv[1]]
 
     def get_projected_segment(self, to_project):
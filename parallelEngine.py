@@ -0,0 +1,228 @@
+"""Parallel engine
+    Shape engine splitting the candidates of one page over worker
+    processes.
+
+    The contour points of the page are packed once in a shared memory
+    block, the offsets index first and the (N,2) points after it. A task
+    only carries the block name and a contour range, the worker attaches
+    the block and runs the engine on views of it, so no contour is
+    pickled. The ranges hold about the same number of points and the
+    results are joined back on the contour order.
+
+    engine = ParallelEngine(workers=8)
+    get_filled_contours("page.png", engine=engine)
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+from boxDetector.contourArray import contour_points, is_boxy_many
+from boxDetector.detectionStats import DetectionStats, stage_timer
+from boxDetector.shapeEngines import engine_name, get_engine
+
+OFFSET_DTYPE = np.dtype(np.int64)
+
+
+def block_views(buffer, count, dtype):
+    """Offsets and points views of a packed block
+
+    Args:
+        buffer (memoryview): the shared memory buffer
+        count (int): number of contours
+        dtype (str): dtype of the points
+    Returns:
+        Tuple(ndarray,ndarray): (count+1,) offsets and (N,2) points
+    """
+    offsets = np.ndarray((count + 1,), dtype=OFFSET_DTYPE, buffer=buffer)
+    points = np.ndarray((int(offsets[-1]), 2), dtype=np.dtype(dtype), buffer=buffer,
+                        offset=OFFSET_DTYPE.itemsize*(count + 1))
+    return offsets, points
+
+
+def attach(name):
+    """Open an existing block, its creator is the one unlinking it"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 the block is always tracked, the pool workers
+        # share the resource tracker of the process that created it
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedContours:
+
+    """Contours of a page packed on a shared memory block
+
+    Attributes:
+        name (str): shared memory block name
+        count (int): number of contours
+        dtype (str): dtype of the points
+        offsets (ndarray): first point of every contour, plus the end
+        points (ndarray): (N,2) points of all contours
+    """
+
+    def __init__(self, contours):
+        """
+        Args:
+            contours (List[ArrayLike]): contours or point lists
+        """
+        arrays = [contour_points(contour) for contour in contours]
+        dtype = np.result_type(*arrays) if arrays else np.dtype(np.int32)
+        self.count = len(arrays)
+        self.dtype = dtype.str
+        total = sum(len(points) for points in arrays)
+        size = OFFSET_DTYPE.itemsize*(self.count + 1) + dtype.itemsize*2*total
+        self._block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.name = self._block.name
+        self.offsets, self.points = None, None
+        offsets = np.ndarray((self.count + 1,), dtype=OFFSET_DTYPE, buffer=self._block.buf)
+        offsets[0] = 0
+        np.cumsum([len(points) for points in arrays], out=offsets[1:])
+        self.offsets, self.points = block_views(self._block.buf, self.count, self.dtype)
+        for start, points in zip(offsets[:-1].tolist(), arrays):
+            self.points[start:start + len(points)] = points
+
+    def ranges(self, parts):
+        """Up to parts (start, stop) contour ranges of about the same points
+
+        Args:
+            parts (int): number of ranges
+        """
+        if not self.count:
+            return []
+        quotas = np.linspace(0, self.offsets[-1], max(parts, 1) + 1)[1:-1]
+        bounds = np.unique(np.concatenate((
+            [0], np.searchsorted(self.offsets[1:], quotas, side="left") + 1, [self.count])))
+        return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    def close(self):
+        """Free the block, the views can not be used after it"""
+        if self._block is None:
+            return
+        self.offsets, self.points = None, None
+        self._block.close()
+        self._block.unlink()
+        self._block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def evaluate_range(name, count, dtype, start, stop, engine, params, with_stats=False):
+    """Run an engine on a contour range of a shared block, in a worker
+
+    Args:
+        name (str): shared memory block name
+        count (int): number of contours of the block
+        dtype (str): dtype of the points
+        start (int): first contour
+        stop (int): contour after the last one
+        engine (str|Callable): shape engine, "robust" runs is_boxy_many
+            on the block views without splitting them
+        params (dict): engine keyword arguments
+        with_stats (bool): also return the DetectionStats of the range
+    Returns:
+        Tuple(ndarray,DetectionStats): a bool per contour and the stats or None
+    """
+    block = attach(name)
+    try:
+        stats = DetectionStats() if with_stats else None
+        boxy = _evaluate(block.buf, count, dtype, start, stop, engine, params, stats)
+        return boxy, stats
+    finally:
+        try:
+            block.close()
+        except BufferError:
+            # A failing engine can keep a view alive on its traceback
+            pass
+
+
+def _evaluate(buffer, count, dtype, start, stop, engine, params, stats):
+    offsets, points = block_views(buffer, count, dtype)
+    first, last = int(offsets[start]), int(offsets[stop])
+    chunk_offsets = offsets[start:stop + 1] - first
+    if engine == "robust":
+        boxy = is_boxy_many(points[first:last], chunk_offsets, stats=stats, **params)
+    else:
+        contours = [points[a:b] for a, b in zip(offsets[start:stop].tolist(), offsets[start + 1:stop + 1].tolist())]
+        boxy = get_engine(engine)(contours, stats=stats, **params)
+    # A copy, nothing returned may point to the block
+    return np.array(boxy, dtype=bool)
+
+
+class ParallelEngine:
+
+    """Shape engine running another one on worker processes
+
+    Attributes:
+        workers (int): worker processes
+        engine (str|Callable): engine run by the workers, a name or a
+            module level function so it can be sent to them
+        min_contours (int): fewer candidates run on the calling process
+        chunks_per_worker (int): ranges per worker, more ranges even out
+            contours of very different cost
+    """
+
+    def __init__(self, workers=None, engine="robust", min_contours=256, chunks_per_worker=4):
+        self.workers = workers or os.cpu_count() or 1
+        self.engine = engine
+        self.min_contours = min_contours
+        self.chunks_per_worker = chunks_per_worker
+        self._pool = None
+
+    def __getstate__(self):
+        # The pool stays with the process that started it
+        state = dict(self.__dict__)
+        state["_pool"] = None
+        return state
+
+    def __repr__(self):
+        return "ParallelEngine(engine=%r)" % (self.engine,)
+
+    @property
+    def cache_name(self):
+        """Name on cache keys, the result does not depend on the workers"""
+        name = engine_name(self.engine)
+        return None if name is None else "ParallelEngine(%s)" % name
+
+    def __call__(self, contours, angle_epsilon=8, parallel_epsilon=0.5, min_size=5, gap_epsilon=10, line_epsilon=3,
+                 stats=None):
+        params = dict(angle_epsilon=angle_epsilon, parallel_epsilon=parallel_epsilon,
+                      min_size=min_size, gap_epsilon=gap_epsilon, line_epsilon=line_epsilon)
+        if not len(contours):
+            return np.zeros(0, dtype=bool)
+        if len(contours) < self.min_contours or self.workers == 1:
+            return np.asarray(get_engine(self.engine)(contours, stats=stats, **params), dtype=bool)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        with stage_timer(stats, "parallel.pack"):
+            shared = SharedContours(contours)
+        with shared:
+            ranges = shared.ranges(self.workers*self.chunks_per_worker)
+            if stats is not None:
+                stats.add_count("parallel.ranges", len(ranges))
+            futures = [self._pool.submit(
+                evaluate_range, shared.name, shared.count, shared.dtype, start, stop,
+                self.engine, params, stats is not None) for start, stop in ranges]
+            results = [future.result() for future in futures]
+        for _, range_stats in results:
+            if range_stats is not None:
+                stats.merge(range_stats)
+        return np.concatenate([boxy for boxy, _ in results])
+
+    def close(self):
+        """Stop the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
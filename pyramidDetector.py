@@ -0,0 +1,107 @@
+"""Pyramid detection
+    Coarse to fine detection of high resolution pages.
+
+    The page is downscaled and every box outline, filled or not, is found
+    on the small image with the "list" retrieval. The normal detection
+    then runs at full resolution only on a small ROI around each coarse
+    candidate, so threshold, findContours and is_boxy never see the rest
+    of the page. The coarse level uses the fast engine by default, a few
+    pixels per side are enough for approxPolyDP and every candidate is
+    checked again at full resolution.
+
+    min_rect_size, min_size and gap_epsilon are pixel sizes, they are
+    multiplied by the scale on the coarse level.
+"""
+from boxDetector.checkBoxDetector import iter_filled_contours, iter_scored_contours, to_gray
+from boxDetector.detectionStats import stage_timer
+from boxDetector.lazyImport import lazy_module
+from boxDetector.spatialIndex import box_bounds, suppress_overlaps
+from boxDetector.tiledDetector import Tile, box_center, merge_duplicates
+
+cv2 = lazy_module("cv2")
+
+# Smallest coarse min_rect_size that still finds boxes, under it the page is not scaled
+MIN_COARSE_RECT = 8
+
+
+def coarse_params(params, scale, engine="fast"):
+    """iter_scored_contours keyword arguments of the coarse level"""
+    coarse = dict((name, params[name]) for name in
+                  ("angle_epsilon", "parallel_epsilon") if name in params)
+    coarse["engine"] = engine
+    coarse["min_rect_size"] = params.get("min_rect_size", 30)*scale
+    coarse["min_size"] = max(params.get("min_size", 5)*scale, 1)
+    coarse["gap_epsilon"] = params.get("gap_epsilon", 10)*scale
+    return coarse
+
+
+def coarse_candidates(gray, scale=0.5, coarse_engine="fast", **params):
+    """Boxes of the downscaled page, filled or not, in page coordinates
+
+    The inner outline of an empty box is dropped, it is inside the outer one.
+
+    Args:
+        gray (ndarray): grayscale page
+        scale (float): size of the coarse level
+        coarse_engine (str|Callable): shape engine of the coarse level
+        params: iter_filled_contours keyword arguments of the full page
+    """
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    found = iter_scored_contours(small, retrieval="list", fill_threshold=0.0,
+                                 score_fill=False, **coarse_params(params, scale, coarse_engine))
+    return suppress_overlaps([[(x/scale, y/scale) for x, y in scored.box] for scored in found])
+
+
+def candidate_roi(box, width, height, padding=0.25, min_padding=4):
+    """Tile around a candidate box, padded by part of its size
+
+    Args:
+        box (List): box points in page coordinates
+        width (int): page width
+        height (int): page height
+        padding (float): part of the box size added on each side
+        min_padding (int): min pixels added on each side
+    """
+    left, top, right, bottom = box_bounds([box])[0].tolist()
+    pad = max(padding*max(right - left, bottom - top), min_padding)
+    return Tile(max(int(left - pad), 0), max(int(top - pad), 0),
+                min(int(right + pad) + 1, width), min(int(bottom + pad) + 1, height))
+
+
+def get_filled_contours_pyramid(img, scale=0.5, padding=0.25, tolerance=2.0, coarse_engine="fast", stats=None, **params):
+    """Filled boxes of a big image, found on a downscaled copy first
+
+    A page too small for the scaled min_rect_size is detected at full
+    resolution.
+
+    Args:
+        img (ndarray): BGR, BGRA or grayscale page
+        scale (float): size of the coarse level, e.g. 0.5 or 0.25
+        padding (float): part of a candidate size added around its ROI
+        tolerance (float): max center distance of the same box on 2 ROIs
+        coarse_engine (str|Callable): shape engine of the coarse level
+        stats (DetectionStats): optional time of each level and counts
+        params: iter_filled_contours keyword arguments
+    """
+    gray = to_gray(img)
+    if params.get("min_rect_size", 30)*scale < MIN_COARSE_RECT:
+        return list(iter_filled_contours(gray, stats=stats, **params))
+    height, width = gray.shape[:2]
+    with stage_timer(stats, "pyramid.coarse"):
+        candidates = coarse_candidates(gray, scale=scale, coarse_engine=coarse_engine, **params)
+    if stats is not None:
+        stats.add_count("pyramid.candidates", len(candidates))
+    boxes = []
+    with stage_timer(stats, "pyramid.fine"):
+        for candidate in candidates:
+            roi = candidate_roi(candidate, width, height, padding=padding)
+            left, top, right, bottom = box_bounds([candidate])[0].tolist()
+            slack = (1.0/scale) + tolerance
+            view = gray[roi.top:roi.bottom, roi.left:roi.right]
+            for box in iter_filled_contours(view, **params):
+                box = [(x + roi.left, y + roi.top) for x, y in box]
+                x, y = box_center(box)
+                # Only the box of this candidate, a neighbour has its own ROI
+                if left - slack <= x <= right + slack and top - slack <= y <= bottom + slack:
+                    boxes.append(box)
+    return merge_duplicates(boxes, tolerance=tolerance)
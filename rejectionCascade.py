@@ -0,0 +1,84 @@
+"""Rejection cascade
+    Cheap geometric tests that reject contours before is_boxy.
+
+    The stages run from the cheapest to the most expensive and stop on
+    the first rejection, each one counts how many candidates it rejected
+    so the thresholds can be tuned on a corpus. A stage set to None is
+    skipped.
+"""
+from collections import OrderedDict
+
+from boxDetector.lazyImport import lazy_module
+
+cv2 = lazy_module("cv2")
+
+STAGES = ("size", "aspect_ratio", "fill_ratio", "vertices")
+
+
+class RejectionCascade:
+
+    """Configurable rejection stages with counters
+
+    Attributes:
+        max_size (float): max width and height of the minAreaRect
+        max_aspect_ratio (float): max long side / short side
+        min_fill_ratio (float): min contour area / rect area
+        min_vertices (int): min approxPolyDP vertex count
+        max_vertices (int): max approxPolyDP vertex count
+        approx_epsilon (float): approxPolyDP epsilon as part of the perimeter
+        seen (int): candidates checked
+        passed (int): candidates accepted
+        rejected (OrderedDict): candidates rejected by each stage
+    """
+
+    def __init__(self, max_size=None, max_aspect_ratio=1.5, min_fill_ratio=0.6,
+                 min_vertices=4, max_vertices=6, approx_epsilon=0.04):
+        self.max_size = max_size
+        self.max_aspect_ratio = max_aspect_ratio
+        self.min_fill_ratio = min_fill_ratio
+        self.min_vertices = min_vertices
+        self.max_vertices = max_vertices
+        self.approx_epsilon = approx_epsilon
+        self.reset()
+
+    def reset(self):
+        """Zero all counters"""
+        self.seen = 0
+        self.passed = 0
+        self.rejected = OrderedDict((stage, 0) for stage in STAGES)
+
+    def _reject(self, stage):
+        self.rejected[stage] += 1
+        return False
+
+    def accept(self, cnt, rect):
+        """Whether a candidate should go on to is_boxy
+        Args:
+            cnt (ndarray): the contour
+            rect (Tuple): its cv2.minAreaRect
+        """
+        self.seen += 1
+        width, height = rect[1]
+        if self.max_size is not None and max(width, height) > self.max_size:
+            return self._reject("size")
+        short_side = min(width, height)
+        if self.max_aspect_ratio is not None:
+            if short_side <= 0 or max(width, height)/short_side > self.max_aspect_ratio:
+                return self._reject("aspect_ratio")
+        if self.min_fill_ratio is not None:
+            rect_area = width*height
+            if rect_area <= 0 or cv2.contourArea(cnt)/rect_area < self.min_fill_ratio:
+                return self._reject("fill_ratio")
+        if self.min_vertices is not None or self.max_vertices is not None:
+            perimeter = cv2.arcLength(cnt, True)
+            vertices = len(cv2.approxPolyDP(cnt, self.approx_epsilon*perimeter, True))
+            if self.min_vertices is not None and vertices < self.min_vertices:
+                return self._reject("vertices")
+            if self.max_vertices is not None and vertices > self.max_vertices:
+                return self._reject("vertices")
+        self.passed += 1
+        return True
+
+    def __repr__(self):
+        rejected = ", ".join("%s=%d" % item for item in self.rejected.items())
+        return "RejectionCascade(seen=%d, passed=%d, %s)" % (self.seen, self.passed, rejected)
@@ -0,0 +1,229 @@
+"""Result cache
+    Content addressed cache of the filled boxes of a page.
+
+    The key is a hash of the image content plus the detector parameters,
+    so the same page sent again returns its boxes without running the
+    contour analysis. Encoded files and buffers are hashed as they are,
+    the same bytes always decode to the same pixels, so a hit also skips
+    the decoding.
+
+    The memory tier is a bounded LRU of the current process. The disk
+    tier is optional, every entry is a file written to a temporary name
+    and renamed, so worker processes can share the same directory.
+    Entries are evicted by last use when the directory grows over
+    max_disk_bytes.
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from boxDetector.shapeEngines import engine_name
+
+# Parameters changing the result, with the get_filled_contours defaults
+KEY_PARAMS = OrderedDict((
+    ("min_rect_size", 30),
+    ("angle_epsilon", 8),
+    ("parallel_epsilon", 0.5),
+    ("min_size", 5),
+    ("gap_epsilon", 10),
+    ("line_epsilon", 3),
+    ("engine", "robust"),
+    ("fill_threshold", None),
+    ("retrieval", "tree"),
+    ("fill_border", 0.25),
+    ("suppress", False),
+))
+
+
+def content_key(content, params=None):
+    """Hex key of an image content and the detector parameters
+
+    Args:
+        content (bytes|ndarray): encoded bytes or decoded pixels
+        params (dict): detector keyword arguments, the missing ones take
+            their default value and the ones not in KEY_PARAMS are ignored
+    Raises:
+        ValueError: the engine has no stable name, see engine_name
+    """
+    params = params or {}
+    digest = hashlib.sha256()
+    if isinstance(content, np.ndarray):
+        digest.update(("pixels %s %s" % (content.dtype.str, content.shape)).encode())
+        digest.update(memoryview(np.ascontiguousarray(content)).cast("B"))
+    else:
+        digest.update(b"encoded")
+        digest.update(content)
+    values = []
+    for name, default in KEY_PARAMS.items():
+        value = params.get(name, default)
+        if name == "engine":
+            name = engine_name(value)
+            if name is None:
+                raise ValueError("The engine %r has no cache_name" % (value,))
+            value = name
+        elif isinstance(value, (int, float)):
+            value = float(value)
+        values.append(value)
+    digest.update(repr(values).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+
+    """Memory LRU and optional disk tier of detected boxes
+
+    Attributes:
+        max_entries (int): entries kept on the memory tier
+        directory (str): disk tier folder, None keeps only the memory tier
+        max_disk_bytes (int): size of the disk tier before evicting
+        hits (int): lookups answered by this process
+        misses (int): lookups not found
+    """
+
+    def __init__(self, max_entries=1024, directory=None, max_disk_bytes=256*1024*1024):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self._init_process()
+
+    def _init_process(self):
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._written = None
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # Only the settings go to a worker, it starts an empty memory tier
+        return {"max_entries": self.max_entries, "directory": self.directory,
+                "max_disk_bytes": self.max_disk_bytes}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_process()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        """Cached boxes of a key or None"""
+        with self._lock:
+            boxes = self._memory.get(key)
+            if boxes is not None:
+                self._memory.move_to_end(key)
+        if boxes is None and self.directory is not None:
+            boxes = self._read(key)
+            if boxes is not None:
+                self._remember(key, boxes)
+        if boxes is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [list(box) for box in boxes]
+
+    def put(self, key, boxes):
+        """Store the boxes of a key on every tier"""
+        boxes = [[(float(x), float(y)) for x, y in box] for box in boxes]
+        self._remember(key, boxes)
+        if self.directory is not None:
+            self._write(key, boxes)
+
+    def clear(self):
+        """Drop every entry of both tiers"""
+        with self._lock:
+            self._memory.clear()
+        for path, _, _ in self._disk_entries():
+            _remove(path)
+
+    def _remember(self, key, boxes):
+        with self._lock:
+            self._memory[key] = boxes
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _read(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as entry:
+                boxes = json.load(entry)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # A broken entry is a miss, it is written again
+            _remove(path)
+            return None
+        try:
+            # Last use time for the eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return [[tuple(point) for point in box] for box in boxes]
+
+    def _write(self, key, boxes):
+        path = self._path(key)
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w") as entry:
+                json.dump(boxes, entry)
+            os.replace(temp_path, path)
+        except BaseException:
+            _remove(temp_path)
+            raise
+        # The folder is only listed again after writing a part of its max size
+        size = os.path.getsize(path)
+        if self._written is None or self._written + size > self.max_disk_bytes//16:
+            self._written = 0
+            self._evict()
+        else:
+            self._written += size
+
+    def _disk_entries(self):
+        """(path, size, last use) of every disk entry"""
+        if self.directory is None:
+            return []
+        entries = []
+        for folder in os.scandir(self.directory):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        entries = self._disk_entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_disk_bytes:
+            return
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            _remove(path)
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
+
+    def __repr__(self):
+        return "ResultCache(entries=%d, directory=%r, hits=%d, misses=%d)" % (
+            len(self._memory), self.directory, self.hits, self.misses)
+
+
+def _remove(path):
+    # Another process may have evicted it first
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
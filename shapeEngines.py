@@ -0,0 +1,150 @@
+"""Shape engines
+    The box test run on the filled candidates of get_filled_contours.
+
+    An engine takes a list of contours plus the is_boxy keyword arguments
+    and returns one bool per contour:
+
+    robust: the segment/angle analysis of is_boxy, on is_boxy_many
+    fast: approxPolyDP to a quadrilateral, then its corner angles and
+        opposite side ratios
+    cascade: the fast engine, the contours it can not settle go on to
+        the robust one
+
+    Any callable with the same signature can be used as an engine. The
+    result cache only keeps the boxes of engines with a stable name, see
+    engine_name.
+"""
+import types
+
+import numpy as np
+
+from boxDetector.contourArray import contour_points, is_boxy_many, pack_contours
+from boxDetector.detectionStats import stage_timer
+from boxDetector.lazyImport import lazy_module
+
+cv2 = lazy_module("cv2")
+
+BOX = 1
+NOT_A_BOX = 0
+AMBIGUOUS = -1
+
+
+def quad_verdicts(contours, angle_epsilon=8, parallel_epsilon=0.5, min_size=5, approx_epsilon=0.04):
+    """Settle the contours that clearly are or are not a box
+
+    A contour approximated to a convex quadrilateral with corners within
+    angle_epsilon of 90 degrees and opposite sides of about the same size
+    is a box. One with less than 4 or more than 6 vertices, a corner off
+    by more than twice angle_epsilon or uneven opposite sides is not.
+    Everything else, e.g. 5 vertices from a rounded corner, is ambiguous.
+
+    Args:
+        contours (List[ArrayLike]): contours or point lists
+        angle_epsilon: angle diff from 90 degrees of a corner
+        parallel_epsilon: how much can opposite sides differ
+        min_size: min size of every side
+        approx_epsilon (float): approxPolyDP epsilon as part of the perimeter
+    Returns:
+        ndarray: BOX, NOT_A_BOX or AMBIGUOUS for each contour
+    """
+    verdicts = np.full(len(contours), NOT_A_BOX, dtype=np.int8)
+    quads = []
+    quad_index = []
+    for i, cnt in enumerate(contours):
+        cnt = contour_points(cnt).reshape(-1, 1, 2)
+        if cnt.dtype != np.int32:
+            cnt = cnt.astype(np.float32)
+        approx = cv2.approxPolyDP(cnt, approx_epsilon*cv2.arcLength(cnt, True), True)
+        vertices = len(approx)
+        if vertices == 4 and cv2.isContourConvex(approx):
+            quads.append(approx.reshape(4, 2))
+            quad_index.append(i)
+        elif 4 <= vertices <= 6:
+            verdicts[i] = AMBIGUOUS
+    if not quads:
+        return verdicts
+
+    quads = np.asarray(quads, dtype=np.float64)
+    sides = np.roll(quads, -1, axis=1) - quads
+    lengths = np.linalg.norm(sides, axis=2)
+    safe = np.maximum(lengths, 1e-9)
+    # |cos| of every corner, the corner deviation from 90 degrees is its arcsin
+    cos = np.abs((sides*np.roll(sides, 1, axis=1)).sum(axis=2))/(safe*np.roll(safe, 1, axis=1))
+    deviation = np.arcsin(np.clip(cos.max(axis=1), 0.0, 1.0))
+    first_pair = np.minimum(lengths[:, 0], lengths[:, 2])/np.maximum(safe[:, 0], safe[:, 2])
+    second_pair = np.minimum(lengths[:, 1], lengths[:, 3])/np.maximum(safe[:, 1], safe[:, 3])
+    even = ((1 - first_pair) < parallel_epsilon) & ((1 - second_pair) < parallel_epsilon)
+    big = lengths.min(axis=1) >= min_size
+
+    rad_angle_epsilon = np.radians(angle_epsilon)
+    quad_verdict = np.full(len(quads), NOT_A_BOX, dtype=np.int8)
+    quad_verdict[big & even & (deviation <= 2*rad_angle_epsilon)] = AMBIGUOUS
+    quad_verdict[big & even & (deviation <= rad_angle_epsilon)] = BOX
+    verdicts[quad_index] = quad_verdict
+    return verdicts
+
+
+def robust_engine(contours, angle_epsilon=8, parallel_epsilon=0.5, min_size=5, gap_epsilon=10, line_epsilon=3, stats=None):
+    """is_boxy of every contour, on a single is_boxy_many call"""
+    return is_boxy_many(*pack_contours(contours), angle_epsilon=angle_epsilon,
+                        parallel_epsilon=parallel_epsilon, min_size=min_size,
+                        gap_epsilon=gap_epsilon, line_epsilon=line_epsilon, stats=stats)
+
+
+def fast_engine(contours, angle_epsilon=8, parallel_epsilon=0.5, min_size=5, gap_epsilon=10, line_epsilon=3, stats=None):
+    """Only the contours approxPolyDP clearly settles as a box"""
+    with stage_timer(stats, "engine.fast"):
+        verdicts = quad_verdicts(contours, angle_epsilon=angle_epsilon,
+                                 parallel_epsilon=parallel_epsilon, min_size=min_size)
+    return verdicts == BOX
+
+
+def cascade_engine(contours, angle_epsilon=8, parallel_epsilon=0.5, min_size=5, gap_epsilon=10, line_epsilon=3, stats=None):
+    """The fast engine, the ambiguous contours go on to the robust one"""
+    with stage_timer(stats, "engine.fast"):
+        verdicts = quad_verdicts(contours, angle_epsilon=angle_epsilon,
+                                 parallel_epsilon=parallel_epsilon, min_size=min_size)
+    boxy = verdicts == BOX
+    ambiguous = np.flatnonzero(verdicts == AMBIGUOUS)
+    if stats is not None:
+        stats.add_count("engine.ambiguous", len(ambiguous))
+    if len(ambiguous):
+        boxy[ambiguous] = robust_engine(
+            [contours[i] for i in ambiguous], angle_epsilon=angle_epsilon,
+            parallel_epsilon=parallel_epsilon, min_size=min_size,
+            gap_epsilon=gap_epsilon, line_epsilon=line_epsilon, stats=stats)
+    return boxy
+
+
+ENGINES = {
+    "robust": robust_engine,
+    "fast": fast_engine,
+    "cascade": cascade_engine,
+}
+
+
+def get_engine(engine):
+    """The engine function of a name, a callable is returned as it is"""
+    if callable(engine):
+        return engine
+    try:
+        return ENGINES[engine]
+    except KeyError:
+        raise ValueError("Unknown engine %r, use one of %s" % (engine, ", ".join(sorted(ENGINES))))
+
+
+def engine_name(engine):
+    """Name of an engine used on cache keys, None when it has no stable one
+
+    Engine names, module level functions and objects with a cache_name
+    attribute have one. Lambdas, nested functions, partials and bound
+    methods do not, two of them with the same name can give other boxes.
+    """
+    if not callable(engine):
+        return engine
+    name = getattr(engine, "cache_name", None)
+    if name is not None:
+        return name
+    if isinstance(engine, (types.FunctionType, types.BuiltinFunctionType)) and "<" not in engine.__qualname__:
+        return "%s.%s" % (engine.__module__, engine.__qualname__)
+    return None
@@ -0,0 +1,217 @@
+"""Spatial index
+    Grid hash over detected boxes, so overlap, nearest neighbour and
+    row/column queries only look at the boxes of the nearby cells
+    instead of every pair.
+
+    Boxes are given as their 4 points, the output of get_filled_contours.
+    Every box is stored on the grid cells its axis aligned bounds cover,
+    cells are about the size of a box so a query touches few cells.
+"""
+import numpy as np
+
+from boxDetector.lazyImport import lazy_module
+
+cv2 = lazy_module("cv2")
+
+
+def box_bounds(boxes):
+    """(M,4) left, top, right, bottom of every box"""
+    points = np.asarray(boxes, dtype=np.float64).reshape(-1, 4, 2)
+    return np.concatenate((points.min(axis=1), points.max(axis=1)), axis=1)
+
+
+def polygon_overlap(box, other):
+    """Intersection area of 2 convex boxes"""
+    area, _ = cv2.intersectConvexConvex(
+        np.asarray(box, dtype=np.float32).reshape(-1, 2),
+        np.asarray(other, dtype=np.float32).reshape(-1, 2))
+    return max(area, 0.0)
+
+
+class BoxIndex:
+
+    """Grid hash of boxes
+
+    Attributes:
+        boxes (ndarray): (M,4,2) box points
+        bounds (ndarray): (M,4) axis aligned bounds
+        centers (ndarray): (M,2) box centers
+        cell_size (float): grid cell side
+    """
+
+    def __init__(self, boxes, cell_size=None):
+        """
+        Args:
+            boxes (List): boxes as lists of 4 points
+            cell_size (float): grid cell side, the median box side by default
+        """
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4, 2)
+        self.bounds = box_bounds(self.boxes)
+        self.centers = self.boxes.mean(axis=1)
+        if cell_size is None:
+            sides = np.maximum(self.bounds[:, 2:] - self.bounds[:, :2], 1.0)
+            cell_size = float(np.median(sides)) if len(sides) else 1.0
+        self.cell_size = cell_size
+        self.cells = {}
+        for i in range(len(self.boxes)):
+            self._add(i)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def _cell_range(self, bounds):
+        first = np.floor(np.asarray(bounds[:2])/self.cell_size).astype(int)
+        last = np.floor(np.asarray(bounds[2:])/self.cell_size).astype(int)
+        return range(first[0], last[0] + 1), range(first[1], last[1] + 1)
+
+    def _add(self, i):
+        columns, rows = self._cell_range(self.bounds[i])
+        for column in columns:
+            for row in rows:
+                self.cells.setdefault((column, row), []).append(i)
+
+    def query(self, bounds):
+        """Indexes of the boxes whose bounds touch bounds, sorted
+
+        Args:
+            bounds (ArrayLike): left, top, right, bottom
+        """
+        columns, rows = self._cell_range(bounds)
+        found = set()
+        for column in columns:
+            for row in rows:
+                found.update(self.cells.get((column, row), ()))
+        if not found:
+            return []
+        found = np.fromiter(found, dtype=np.intp, count=len(found))
+        near = self.bounds[found]
+        touch = ((near[:, 0] <= bounds[2]) & (near[:, 2] >= bounds[0])
+                 & (near[:, 1] <= bounds[3]) & (near[:, 3] >= bounds[1]))
+        return sorted(found[touch].tolist())
+
+    def overlapping(self, i):
+        """Indexes of the other boxes whose bounds touch box i"""
+        return [j for j in self.query(self.bounds[i]) if j != i]
+
+    def nearest(self, point, k=1, max_distance=None):
+        """Indexes of the k box centers nearest to point, nearest first
+
+        The grid is searched on growing rings of cells and stops once a
+        ring is further than the k-th center found.
+
+        Args:
+            point (Tuple(float,float)): x, y
+            k (int): number of boxes
+            max_distance (float): optional max center distance
+        """
+        if not len(self):
+            return []
+        point = np.asarray(point, dtype=np.float64)
+        cell = np.floor(point/self.cell_size).astype(int)
+        limit = max_distance if max_distance is not None else np.inf
+        span = np.ptp(np.concatenate((self.bounds[:, :2], self.bounds[:, 2:], [point])), axis=0)
+        max_ring = int(np.ceil(span.max()/self.cell_size)) + 1
+        seen = set()
+        for ring in range(max_ring + 1):
+            for column in range(cell[0] - ring, cell[0] + ring + 1):
+                for row in range(cell[1] - ring, cell[1] + ring + 1):
+                    if max(abs(column - cell[0]), abs(row - cell[1])) != ring:
+                        continue
+                    seen.update(self.cells.get((column, row), ()))
+            # Centers on the cells after this ring are at least ring cells away
+            reach = ring*self.cell_size
+            if reach > limit:
+                break
+            if len(seen) >= k:
+                candidates = np.fromiter(seen, dtype=np.intp, count=len(seen))
+                distance = np.hypot(*(self.centers[candidates] - point).T)
+                if np.partition(distance, k - 1)[k - 1] <= reach:
+                    break
+        if not seen:
+            return []
+        candidates = np.fromiter(seen, dtype=np.intp, count=len(seen))
+        distance = np.hypot(*(self.centers[candidates] - point).T)
+        order = np.lexsort((candidates, distance))
+        return [int(candidates[i]) for i in order[:k] if distance[i] <= limit]
+
+    def rows(self, tolerance=None):
+        """Boxes grouped on rows by a sweep over their sorted centers
+
+        Args:
+            tolerance (float): max vertical gap between centers of a row,
+                half the cell size by default
+        Returns:
+            List[List[int]]: rows from top to bottom, each one left to right
+        """
+        return self._lines(1, 0, tolerance)
+
+    def columns(self, tolerance=None):
+        """Boxes grouped on columns, like rows
+
+        Returns:
+            List[List[int]]: columns from left to right, each one top to bottom
+        """
+        return self._lines(0, 1, tolerance)
+
+    def _lines(self, axis, along, tolerance):
+        if not len(self):
+            return []
+        if tolerance is None:
+            tolerance = self.cell_size/2.0
+        order = np.argsort(self.centers[:, axis], kind="stable")
+        gaps = np.diff(self.centers[order, axis]) > tolerance
+        lines = np.split(order, np.flatnonzero(gaps) + 1)
+        return [line[np.argsort(self.centers[line, along], kind="stable")].tolist()
+                for line in lines]
+
+
+def non_max_suppression(boxes, scores=None, iou_threshold=0.5, containment_threshold=0.8):
+    """Indexes of the boxes kept after suppressing the overlapping ones
+
+    Boxes are visited from the best score, a box is dropped when it
+    overlaps a kept one with an IoU over iou_threshold or when most of
+    the smaller one is inside the other. Only the kept boxes of the
+    nearby grid cells are compared, so the cost is about the sort.
+
+    Args:
+        boxes (List): boxes as lists of 4 points
+        scores (ArrayLike): optional score of each box, the box area by
+            default so the outer border of a box wins over the inner one
+        iou_threshold (float): max intersection over union
+        containment_threshold (float): max intersection over the smaller area
+    Returns:
+        List[int]: kept indexes, by score
+    """
+    index = BoxIndex(boxes)
+    if not len(index):
+        return []
+    areas = np.array([cv2.contourArea(box.astype(np.float32)) for box in index.boxes])
+    if scores is None:
+        scores = areas
+    order = np.lexsort((np.arange(len(index)), -np.asarray(scores, dtype=np.float64)))
+    kept = []
+    is_kept = np.zeros(len(index), dtype=bool)
+    for i in order.tolist():
+        suppressed = False
+        for k in index.overlapping(i):
+            if not is_kept[k]:
+                continue
+            overlap = polygon_overlap(index.boxes[i], index.boxes[k])
+            if not overlap:
+                continue
+            union = areas[i] + areas[k] - overlap
+            smaller = min(areas[i], areas[k])
+            if (union > 0 and overlap/union > iou_threshold) or \
+                    (smaller > 0 and overlap/smaller > containment_threshold):
+                suppressed = True
+                break
+        if not suppressed:
+            is_kept[i] = True
+            kept.append(i)
+    return kept
+
+
+def suppress_overlaps(boxes, scores=None, iou_threshold=0.5, containment_threshold=0.8):
+    """The boxes left by non_max_suppression, on their original order"""
+    kept = non_max_suppression(boxes, scores, iou_threshold, containment_threshold)
+    return [boxes[i] for i in sorted(kept)]
@@ -0,0 +1,81 @@
+"""Streaming detection
+    This module reads pages lazily from image files, multi-page TIFFs
+    and directories and yields the filled boxes as soon as they pass
+    is_boxy.
+
+    Only one decoded page is held at a time and a consumer can stop
+    at any moment, e.g. with itertools.islice after the first N boxes.
+"""
+from collections import namedtuple
+import os
+
+
+from boxDetector.checkBoxDetector import iter_filled_contours
+from boxDetector.lazyImport import lazy_module
+
+cv2 = lazy_module("cv2")
+
+PageId = namedtuple("PageId", "path page")
+
+IMAGE_EXTENSIONS = (".bmp", ".jpeg", ".jpg", ".png", ".tif", ".tiff", ".webp")
+MULTI_PAGE_EXTENSIONS = (".tif", ".tiff")
+
+
+def read_pages(source):
+    """Yield the pages of a file or directory one at a time
+
+    Multi-page TIFFs are decoded page by page when the OpenCV version
+    can read a page range, otherwise all their pages are read at once.
+
+    Args:
+        source (str): image file, multi-page TIFF or directory, the
+            directory images are read sorted by name
+    Yields:
+        Tuple(PageId,ndarray): page id and BGR page
+    """
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            path = os.path.join(source, name)
+            if os.path.isfile(path) and name.lower().endswith(IMAGE_EXTENSIONS):
+                for page in read_pages(path):
+                    yield page
+        return
+    if source.lower().endswith(MULTI_PAGE_EXTENSIONS):
+        if hasattr(cv2, "imcount"):
+            for number in range(cv2.imcount(source)):
+                read, pages = cv2.imreadmulti(source, number, 1, flags=cv2.IMREAD_COLOR)
+                if not read:
+                    raise IOError("Could not read page %d of %s" % (number, source))
+                img = pages[0]
+                # dropping the references before the next page is decoded
+                del pages
+                yield PageId(source, number), img
+                del img
+            return
+        read, pages = cv2.imreadmulti(source, flags=cv2.IMREAD_COLOR)
+        if read:
+            for number, img in enumerate(pages):
+                yield PageId(source, number), img
+            return
+    img = cv2.imread(source)
+    if img is None:
+        raise IOError("Could not read the image %s" % source)
+    yield PageId(source, 0), img
+
+
+def stream_filled_contours(source, chunk_size=64, **params):
+    """Yield the filled boxes of every page as they are found
+
+    Args:
+        source (str): image file, multi-page TIFF or directory
+        chunk_size (int): candidates checked on each is_boxy_many call
+        params: iter_filled_contours keyword arguments
+    Yields:
+        Tuple(PageId,List): page id and the 4 box points
+    """
+    for page_id, img in read_pages(source):
+        boxes = iter_filled_contours(img, chunk_size=chunk_size, **params)
+        # only the generator keeps the page, it is gone before the next one
+        del img
+        for box in boxes:
+            yield page_id, box
@@ -0,0 +1,87 @@
+import math
+from unittest import TestCase
+
+import numpy as np
+
+from boxDetector.checkBoxDetector import LineGroup, flatten_angles, is_boxy, minRadAngle
+from boxDetector.contourArray import angle_bins, bin_groups, is_boxy_many, pack_contours
+from boxDetector.lineSegment import LineSegment, SegmentArray
+
+
+def rotated_box(degrees, size=50):
+    angle = math.radians(degrees)
+    rotation = np.array([[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]])
+    corners = np.array([(0, 0), (size, 0), (size, size), (0, size), (0, 0)])
+    return np.rint(corners.dot(rotation.T) + 100).astype(np.int32)
+
+
+class TestAngleBins(TestCase):
+
+    def test_orientations(self):
+        segments = SegmentArray([(0, 0), (0, 0), (0, 0), (0, 0)], [(10, 1), (10, -1), (0, 10), (0, 0)])
+        angles = segments.orientations()
+        self.assertAlmostEqual(angles[0], round(math.atan2(1, 10), 4))
+        self.assertAlmostEqual(angles[1], round(math.pi - math.atan2(1, 10), 4))
+        self.assertEqual(angles[2], round(math.pi/2, 4))
+        self.assertEqual(angles[3], 0.0)
+
+    def test_bins(self):
+        bins, count = angle_bins(np.array([0.0, 0.05, 0.15, 3.1]), 0.1)
+        self.assertEqual(count, 32)
+        self.assertEqual(bins.tolist(), [0, 0, 1, 31])
+
+    def test_exact_bins(self):
+        bins, count = angle_bins(np.array([0.5, 0.1, 0.5, 0.1001]), 0)
+        self.assertEqual(count, 6)
+        self.assertEqual(bin_groups(np.zeros(4, dtype=np.intp), bins, count).tolist(), [1, 2, 1, 0])
+
+    def test_groups_wrap(self):
+        # bins 0 and 31 are neighbours, bins 10 to 13 make 2 groups
+        bins = np.array([0, 31, 10, 11, 12, 13])
+        groups = bin_groups(np.zeros(6, dtype=np.intp), bins, 32)
+        self.assertEqual(groups[0], groups[1])
+        self.assertEqual(groups[2], groups[3])
+        self.assertEqual(groups[4], groups[5])
+        self.assertEqual(len(set(groups.tolist())), 3)
+
+    def test_groups_many_contours(self):
+        owner = np.array([0, 0, 2, 2])
+        bins = np.array([3, 5, 3, 4])
+        groups = bin_groups(owner, bins, 8)
+        self.assertEqual(groups.tolist(), [0, 1, 2, 2])
+
+    def test_noisy_groups_are_bounded(self):
+        # every bin used, groups still hold 2 bins at most
+        bins = np.arange(23)
+        groups = bin_groups(np.zeros(23, dtype=np.intp), bins, 23)
+        self.assertEqual(len(set(groups.tolist())), 12)
+
+    def test_flatten_across_pi(self):
+        near_zero = LineSegment((0, 0), (20, 1))
+        near_pi = LineSegment((0, 1), (20, 0))
+        angle_map = {
+            0.05: LineGroup(near_zero.unit_vector, near_zero.vector, [near_zero]),
+            math.pi - 0.05: LineGroup(near_pi.unit_vector, near_pi.vector, [near_pi]),
+        }
+        flatten = flatten_angles(angle_map, rad_angle_epsilon=minRadAngle)
+        self.assertEqual(list(flatten), [0.05])
+        self.assertEqual(len(flatten[0.05].lines), 2)
+
+    def test_rotated_boxes(self):
+        boxes = [rotated_box(degrees) for degrees in (0, 10, 30, 45, 60, 89)]
+        self.assertTrue(all(is_boxy(box) for box in boxes))
+        self.assertTrue(is_boxy_many(*pack_contours(boxes)).all())
+
+    def test_tiny_angle_epsilon(self):
+        boxes = [rotated_box(0), rotated_box(30)]
+        # Under about 0.003 degrees the epsilon rounds to 0, exact angles
+        self.assertTrue(is_boxy(boxes[0], angle_epsilon=0.01))
+        for angle_epsilon in (0, 0.001, 0.01):
+            self.assertEqual(is_boxy_many(*pack_contours(boxes), angle_epsilon=angle_epsilon).tolist(),
+                             [is_boxy(box, angle_epsilon=angle_epsilon) for box in boxes])
+
+    def test_rhombus_is_not_boxy(self):
+        rhombus = np.array([(0, 0), (60, 0), (90, 40), (30, 40), (0, 0)])
+        self.assertFalse(is_boxy(rhombus))
+        self.assertFalse(is_boxy_many(*pack_contours([rhombus]))[0])
+
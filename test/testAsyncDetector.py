@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+from unittest import TestCase
+
+import cv2
+
+from boxDetector.asyncDetector import AsyncDetector, DetectorBusy
+from boxDetector.benchmark.loadTest import load, post
+from boxDetector.checkBoxDetector import get_filled_contours_from_image
+from boxDetector.httpService import query_params, serve
+from boxDetector.shapeEngines import robust_engine
+from boxDetector.test.testFilledContours import draw_page
+
+gate = threading.Event()
+
+
+def gated_engine(contours, **params):
+    gate.wait(5)
+    return robust_engine(contours, **params)
+
+
+def slow_engine(contours, **params):
+    time.sleep(0.2)
+    return robust_engine(contours, **params)
+
+
+def broken_engine(contours, **params):
+    raise ZeroDivisionError("division by zero")
+
+
+def encode(img):
+    return cv2.imencode('.png', img)[1].tobytes()
+
+
+class TestAsyncDetector(TestCase):
+
+    def setUp(self):
+        self.img = draw_page()
+        self.body = encode(self.img)
+        self.expected = get_filled_contours_from_image(self.img)
+        gate.clear()
+
+    def tearDown(self):
+        gate.set()
+
+    def test_detect(self):
+        async def detect():
+            async with AsyncDetector(workers=2, batch_size=4, batch_delay=0.01) as detector:
+                results = await asyncio.gather(*[detector.detect(self.body) for _ in range(8)])
+                return results, detector.batches
+        results, batches = asyncio.run(detect())
+        self.assertEqual(results, [self.expected]*8)
+        self.assertLess(batches, 8)
+
+    def test_params_and_errors(self):
+        async def detect():
+            async with AsyncDetector(workers=1) as detector:
+                small = await detector.detect(self.body, min_rect_size=200)
+                with self.assertRaises(IOError):
+                    await detector.detect(b'not an image')
+                with self.assertRaises(ValueError):
+                    await detector.detect(self.body, engine='unknown')
+                return small
+        self.assertEqual(asyncio.run(detect()), [])
+
+    def test_backpressure_and_timeout(self):
+        async def detect():
+            async with AsyncDetector(workers=1, max_queue=1, batch_size=1,
+                                     engine=gated_engine) as detector:
+                running = asyncio.ensure_future(detector.detect(self.body))
+                await asyncio.sleep(0.05)
+                queued = asyncio.ensure_future(detector.detect(self.body, timeout=0.1))
+                await asyncio.sleep(0)
+                with self.assertRaises(DetectorBusy):
+                    await detector.detect(self.body)
+                with self.assertRaises(asyncio.TimeoutError):
+                    await queued
+                gate.set()
+                boxes = await running
+                return boxes, detector.rejected, detector.timeouts
+        self.assertEqual(asyncio.run(detect()), (self.expected, 1, 1))
+
+    def test_timeout_covers_wait_and_run(self):
+        async def detect():
+            async with AsyncDetector(workers=1, max_queue=1, batch_size=1,
+                                     engine=slow_engine) as detector:
+                first = asyncio.ensure_future(detector.detect(self.body))
+                await asyncio.sleep(0.01)
+                second = asyncio.ensure_future(detector.detect(self.body))
+                await asyncio.sleep(0)
+                # Room at 0.2s and a run until 0.6s, past the 0.5s deadline
+                start = time.perf_counter()
+                with self.assertRaises(asyncio.TimeoutError):
+                    await detector.detect(self.body, timeout=0.5, wait=True)
+                elapsed = time.perf_counter() - start
+                await asyncio.gather(first, second)
+                return elapsed
+        self.assertLess(asyncio.run(detect()), 0.58)
+
+    def test_http(self):
+        async def requests():
+            async with AsyncDetector(workers=2) as detector:
+                server = await serve(detector, '127.0.0.1', 0, max_body=1024*1024)
+                port = server.sockets[0].getsockname()[1]
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                answers = [
+                    await post(reader, writer, '/detect', self.body),
+                    await post(reader, writer, '/detect?min_rect_size=200', self.body),
+                    await post(reader, writer, '/detect', b'not an image'),
+                    await post(reader, writer, '/detect?unknown=1', self.body),
+                    await post(reader, writer, '/other', b''),
+                ]
+                writer.close()
+                summary = await load('127.0.0.1', port, [self.body], concurrency=4, requests=12)
+                server.close()
+                await server.wait_closed()
+                return answers, summary
+        answers, summary = asyncio.run(requests())
+        self.assertEqual(answers[0], (200, {'boxes': [[list(point) for point in box] for box in self.expected]}))
+        self.assertEqual(answers[1], (200, {'boxes': []}))
+        self.assertEqual([status for status, _ in answers[2:]], [400, 400, 404])
+        self.assertEqual(summary['statuses'], {'200': 12})
+        self.assertIn('p99', summary['latency'])
+
+    def test_http_errors(self):
+        async def requests():
+            async with AsyncDetector(workers=1, engine=broken_engine) as detector:
+                server = await serve(detector, '127.0.0.1', 0)
+                port = server.sockets[0].getsockname()[1]
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                # The connection keeps answering after every error
+                answers = [
+                    await post(reader, writer, '/detect', b''),
+                    await post(reader, writer, '/detect', self.body),
+                    await post(reader, writer, '/health', b''),
+                ]
+                writer.close()
+                server.close()
+                await server.wait_closed()
+                return answers
+        with self.assertLogs('boxDetector.httpService', 'ERROR'):
+            answers = asyncio.run(requests())
+        self.assertEqual([status for status, _ in answers], [400, 500, 405])
+        self.assertIn('ZeroDivisionError', answers[1][1]['error'])
+
+    def test_query_params(self):
+        self.assertEqual(query_params('engine=fast&min_rect_size=20'),
+                         {'engine': 'fast', 'min_rect_size': 20.0})
+        with self.assertRaises(ValueError):
+            query_params('min_rect_size=big')
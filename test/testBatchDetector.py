@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from boxDetector.batchDetector import get_filled_contours_batch
+from boxDetector.checkBoxDetector import get_filled_contours
+from boxDetector.test.testFilledContours import draw_page
+
+
+class TestBatchDetector(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.page = os.path.join(self.folder, 'page.png')
+        cv2.imwrite(self.page, draw_page())
+        self.blank = os.path.join(self.folder, 'blank.png')
+        cv2.imwrite(self.blank, np.full((300, 400, 3), 255, np.uint8))
+        self.missing = os.path.join(self.folder, 'missing.png')
+        self.paths = [self.page, self.missing, self.blank, self.page]
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_ordered(self):
+        results = list(get_filled_contours_batch(self.paths, workers=2, max_in_flight=2))
+        self.assertEqual([result.index for result in results], [0, 1, 2, 3])
+        self.assertEqual([result.img_path for result in results], self.paths)
+        expected = get_filled_contours(self.page)
+        self.assertEqual(results[0].boxes, expected)
+        self.assertEqual(results[3].boxes, expected)
+        self.assertIsNone(results[0].error)
+
+    def test_error_does_not_stop_the_batch(self):
+        results = list(get_filled_contours_batch(self.paths, workers=2))
+        self.assertIsNone(results[1].boxes)
+        self.assertIn('missing.png', results[1].error)
+        self.assertEqual(results[2].boxes, [])
+
+    def test_as_completed(self):
+        results = list(get_filled_contours_batch(self.paths, workers=2, ordered=False))
+        self.assertEqual(sorted(result.index for result in results), [0, 1, 2, 3])
+
+    def test_params(self):
+        results = list(get_filled_contours_batch([self.page], workers=1, min_rect_size=100))
+        self.assertEqual(results[0].boxes, [])
+
+    def test_stop_early(self):
+        results = get_filled_contours_batch(iter(self.paths * 10), workers=2, max_in_flight=2)
+        self.assertEqual(next(results).index, 0)
+        results.close()
@@ -0,0 +1,120 @@
+import numpy as np
+from unittest import TestCase
+
+from boxDetector.checkBoxDetector import is_boxy
+from boxDetector.lineSegment import LineSegment
+from boxDetector.contourArray import (
+    contour_points,
+    has_parallel_groups,
+    is_boxy_array,
+    is_boxy_many,
+    pack_contours,
+    segment_arrays
+)
+
+
+def random_contour(rng, size):
+    steps = rng.integers(-6, 7, size=(size, 2))
+    steps[(steps == 0).all(axis=1)] = [1, 0]
+    return np.cumsum(steps, axis=0)
+
+
+def noisy_box(rng, size):
+    corners = np.array([(0, 0), (size, 0), (size, size), (0, size), (0, 0)])
+    points = np.concatenate(
+        [np.linspace(p, q, 6)[:-1] for p, q in zip(corners[:-1], corners[1:])])
+    angle = rng.uniform(0, 0.3)
+    rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    points = points.dot(rotation.T) + rng.integers(-1, 2, size=points.shape)
+    return np.rint(points).astype(np.int32)
+
+
+class TestBoxyArray(TestCase):
+    def setUp(self):
+        self.perfect_box = [(0,0),(0,10),(10,10),(10,0),(0,0)]
+        self.box_with_noise = [(0,0),(1,1),(2,2),(0,2),(0,10),(10,10),(10,0),(0,0)]
+        self.open = [(0,0),(1,1),(2,2),(0,10),(10,10)]
+
+    def test_contour_view(self):
+        contour = np.array(self.perfect_box, dtype=np.int32).reshape(-1, 1, 2)
+        points = contour_points(contour)
+        self.assertEqual(points.shape, (5, 2))
+        self.assertTrue(np.shares_memory(points, contour))
+
+    def test_same_segments(self):
+        points = [(0, 0), (2, 0), (5, 0), (5, 3), (5, 9), (1, 9)]
+        _, segments = segment_arrays(np.array(points), [0, len(points)], min_size=5)
+        self.assertEqual(
+            [(segment.a, segment.b) for segment in segments],
+            [((0, 0), (5, 0)), ((5, 0), (5, 9)), ((1, 9), (5, 9))])
+
+    def test_same_segments_as_loop(self):
+        rng = np.random.default_rng(5)
+        for _ in range(100):
+            points = random_contour(rng, int(rng.integers(2, 40))).tolist()
+            expected = []
+            ref_point = points[0]
+            segment = None
+            for point in points[1:]:
+                segment = LineSegment(ref_point, point)
+                if segment.length < 5:
+                    continue
+                expected.append(segment)
+                ref_point = point
+            if segment is not None and ref_point != points[-1]:
+                expected.append(segment)
+            _, segments = segment_arrays(np.array(points), [0, len(points)], min_size=5)
+            self.assertEqual(list(segments), expected)
+
+    def test_perfect_box(self):
+        self.assertTrue(is_boxy_array(self.perfect_box))
+        contour = np.array(self.perfect_box, dtype=np.int32).reshape(-1, 1, 2)
+        self.assertTrue(is_boxy_array(contour))
+
+    def test_noise(self):
+        self.assertTrue(is_boxy_array(self.box_with_noise))
+
+    def test_open(self):
+        self.assertFalse(is_boxy_array(self.open))
+
+    def test_same_batched_and_alone(self):
+        rng = np.random.default_rng(7)
+        for _ in range(100):
+            params = dict(
+                angle_epsilon=float(rng.choice([0, 4, 8, 20])),
+                parallel_epsilon=float(rng.choice([0.1, 0.5])),
+                min_size=int(rng.choice([0, 2, 5])),
+                gap_epsilon=float(rng.choice([-2, 0, 10])),
+                line_epsilon=float(rng.choice([0, 3])))
+            contours = [noisy_box(rng, int(rng.integers(10, 60))) for _ in range(3)]
+            contours += [random_contour(rng, int(rng.integers(3, 40))) for _ in range(3)]
+            points, offsets = pack_contours(contours)
+            boxy = is_boxy_many(points, offsets, **params)
+            alone = [is_boxy([tuple(point) for point in contour.tolist()], **params) for contour in contours]
+            self.assertEqual(boxy.tolist(), alone, params)
+
+    def test_many(self):
+        rng = np.random.default_rng(3)
+        contours = [self.perfect_box, [], self.open, [(4, 4)], self.box_with_noise]
+        contours += [noisy_box(rng, int(rng.integers(10, 60))) for _ in range(100)]
+        contours += [random_contour(rng, int(rng.integers(3, 40))) for _ in range(100)]
+        points, offsets = pack_contours(contours)
+        boxy = is_boxy_many(points, offsets)
+        self.assertEqual(len(boxy), len(contours))
+        expected = [
+            len(points) > 1 and is_boxy([tuple(point) for point in np.asarray(points).tolist()])
+            for points in contours]
+        self.assertEqual(boxy.tolist(), expected)
+
+    def test_many_epsilons(self):
+        contours = [self.perfect_box, self.box_with_noise]
+        points, offsets = pack_contours(contours)
+        boxy = is_boxy_many(points, offsets, parallel_epsilon=0.0)
+        self.assertEqual(boxy.tolist(), [False, False])
+
+    def test_parallel_empty_lines(self):
+        group = np.array([0, 0, 1, 1])
+        length = np.array([0.0, 0.0, 3.0, 3.0])
+        with np.errstate(all="raise"):
+            parallel = has_parallel_groups(group, length, parallel_epsilon=2.0)
+        self.assertEqual(parallel.tolist(), [1])
@@ -0,0 +1,75 @@
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from boxDetector.benchmark.importTime import child_env
+from boxDetector.checkBoxDetector import get_filled_contours
+from boxDetector.commandLine import iter_paths, main
+from boxDetector.test.testFilledContours import draw_page
+
+
+class TestCommandLine(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.page = os.path.join(self.folder, 'page.png')
+        cv2.imwrite(self.page, draw_page())
+        self.blank = os.path.join(self.folder, 'blank.png')
+        cv2.imwrite(self.blank, np.full((300, 400, 3), 255, np.uint8))
+        with open(os.path.join(self.folder, 'notes.txt'), 'w') as notes:
+            notes.write('not an image')
+        self.missing = os.path.join(self.folder, 'missing.png')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def run_main(self, argv, stdin=''):
+        output = io.StringIO()
+        status = main(argv, stdin=io.StringIO(stdin), stdout=output)
+        return status, [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_paths(self):
+        self.assertEqual(list(iter_paths([self.folder])), [self.blank, self.page])
+        stdin = io.StringIO('%s\n\n%s\n' % (self.page, self.blank))
+        self.assertEqual(list(iter_paths([], stdin)), [self.page, self.blank])
+        self.assertEqual(list(iter_paths([self.page, '-'], io.StringIO(self.blank))),
+                         [self.page, self.blank])
+
+    def test_records(self):
+        status, records = self.run_main(['-j', '2', '--ordered', self.folder])
+        self.assertEqual(status, 0)
+        self.assertEqual([record['path'] for record in records], [self.blank, self.page])
+        self.assertEqual(records[0]['boxes'], [])
+        expected = [[list(point) for point in box] for box in get_filled_contours(self.page)]
+        self.assertEqual(records[1]['boxes'], expected)
+        self.assertIsNone(records[1]['error'])
+        self.assertNotIn('stats', records[1])
+        self.assertGreater(records[1]['seconds'], 0)
+        _, records = self.run_main(['-j', '1', '--suppress', self.page])
+        expected = [[list(point) for point in box] for box in get_filled_contours(self.page, suppress=True)]
+        self.assertEqual(records[0]['boxes'], expected)
+
+    def test_stdin_errors_and_stats(self):
+        status, records = self.run_main(
+            ['-j', '1', '--stats', '--min-rect-size', '100'], '%s\n%s\n' % (self.page, self.missing))
+        self.assertEqual(status, 1)
+        by_path = dict((record['path'], record) for record in records)
+        self.assertEqual(by_path[self.page]['boxes'], [])
+        self.assertGreater(by_path[self.page]['seconds'], 0)
+        self.assertNotIn('seconds', by_path[self.page]['stats'])
+        self.assertIn('findContours', by_path[self.page]['stats']['times'])
+        self.assertIn('missing.png', by_path[self.missing]['error'])
+
+    def test_module(self):
+        output = subprocess.run(
+            [sys.executable, '-m', 'boxDetector', '--engine', 'fast', self.page], env=child_env(),
+            stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+        self.assertEqual(len(json.loads(output)['boxes']), len(get_filled_contours(self.page, engine='fast')))
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from boxDetector.checkBoxDetector import get_filled_contours, is_boxy
+from boxDetector.contourArray import is_boxy_many, pack_contours
+from boxDetector.detectionStats import DetectionStats, stage_timer
+from boxDetector.rejectionCascade import RejectionCascade
+from boxDetector.test.testFilledContours import draw_page
+
+
+class TestDetectionStats(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.img_path = os.path.join(self.folder, 'page.png')
+        cv2.imwrite(self.img_path, draw_page())
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_pipeline(self):
+        stats = DetectionStats()
+        boxes = get_filled_contours(self.img_path, stats=stats)
+        self.assertEqual(boxes, get_filled_contours(self.img_path))
+        for stage in ('imread', 'to_gray', 'threshold', 'findContours', 'hierarchy',
+                      'min_rect', 'is_boxy', 'is_boxy.segments', 'is_boxy.flatten_angles',
+                      'is_boxy.flatten_line_segment', 'is_boxy.parallel',
+                      'is_boxy.perpendicular'):
+            self.assertIn(stage, stats.times)
+            self.assertGreaterEqual(stats.times[stage], 0.0)
+        counts = stats.counts
+        self.assertGreaterEqual(counts['contours'], counts['filled'])
+        self.assertGreaterEqual(counts['filled'], counts['min_rect_size'])
+        self.assertEqual(counts['min_rect_size'], counts['is_boxy.contours'])
+        self.assertEqual(counts['is_boxy.boxy'], len(boxes))
+        self.assertGreaterEqual(counts['is_boxy.segments'], counts['is_boxy.lines'])
+
+    def test_cascade_counts(self):
+        stats = DetectionStats()
+        cascade = RejectionCascade()
+        get_filled_contours(self.img_path, cascade=cascade, stats=stats)
+        self.assertIn('cascade', stats.times)
+        self.assertEqual(stats.counts['cascade'], cascade.passed)
+
+    def test_outline_fill_counts(self):
+        # The outline test of list retrieval is not the caller cascade
+        stats = DetectionStats()
+        get_filled_contours(self.img_path, retrieval='list', stats=stats)
+        self.assertIn('outline_fill', stats.times)
+        self.assertGreater(stats.counts['outline_fill'], 0)
+        self.assertNotIn('cascade', stats.times)
+        self.assertNotIn('cascade', stats.counts)
+        cascade = RejectionCascade(max_aspect_ratio=None, min_fill_ratio=None)
+        stats = DetectionStats()
+        get_filled_contours(self.img_path, retrieval='list', cascade=cascade, stats=stats)
+        self.assertEqual(stats.counts['cascade'], cascade.passed)
+        self.assertNotIn('outline_fill', stats.counts)
+
+    def test_callback(self):
+        calls = []
+        stats = DetectionStats(callback=lambda stage, seconds: calls.append(stage))
+        get_filled_contours(self.img_path, stats=stats)
+        self.assertEqual(calls[0], 'imread')
+        self.assertEqual(set(calls), set(stats.times))
+
+    def test_is_boxy_counts(self):
+        box = np.array([(0, 0), (1, 1), (2, 2), (0, 2), (0, 10), (10, 10), (10, 0), (0, 0)])
+        stats = DetectionStats()
+        many = DetectionStats()
+        self.assertTrue(is_boxy(box, stats=stats))
+        self.assertTrue(is_boxy_many(*pack_contours([box]), stats=many)[0])
+        for name in ('is_boxy.segments', 'is_boxy.angle_groups', 'is_boxy.lines'):
+            self.assertEqual(stats.counts[name], many.counts[name])
+
+    def test_merge(self):
+        stats = DetectionStats()
+        other = DetectionStats()
+        stats.add_time('threshold', 1.0)
+        other.add_time('threshold', 0.5)
+        other.add_count('contours', 3)
+        stats.merge(other)
+        self.assertEqual(stats.as_dict(), {'times': {'threshold': 1.5}, 'counts': {'contours': 3}})
+
+    def test_disabled(self):
+        with stage_timer(None, 'threshold'):
+            pass
+        stats = DetectionStats()
+        with stage_timer(stats, 'threshold'):
+            pass
+        self.assertEqual(list(stats.times), ['threshold'])
@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from boxDetector.checkBoxDetector import (
+    get_filled_contours_from_image,
+    get_scored_contours_from_image
+)
+from boxDetector.fillScore import fill_ratios, ink_integral
+from boxDetector.resultCache import content_key
+from boxDetector.test.testFilledContours import draw_page
+from boxDetector.test.testTiledDetector import draw_form
+from boxDetector.tiledDetector import box_center
+
+
+def corners(left, top, size, angle=0):
+    return cv2.boxPoints(((left + size/2.0, top + size/2.0), (size, size), angle))
+
+
+class TestFillScore(TestCase):
+
+    def setUp(self):
+        self.img = np.full((100, 300), 255, np.uint8)
+        cv2.rectangle(self.img, (10, 10), (50, 50), 0, 3)
+        cv2.rectangle(self.img, (110, 10), (150, 50), 0, 3)
+        cv2.line(self.img, (110, 10), (150, 50), 0, 3)
+        cv2.line(self.img, (150, 10), (110, 50), 0, 3)
+        cv2.rectangle(self.img, (210, 10), (250, 50), 0, -1)
+
+    def test_ratios(self):
+        integral = ink_integral(self.img)
+        empty, checked, solid = fill_ratios(
+            integral, [corners(9, 9, 43), corners(109, 9, 43), corners(209, 9, 43)]).tolist()
+        self.assertEqual(empty, 0.0)
+        self.assertGreater(checked, 0.1)
+        self.assertLess(checked, 0.5)
+        self.assertEqual(solid, 1.0)
+        self.assertEqual(len(fill_ratios(integral, [])), 0)
+
+    def test_rotated(self):
+        img = np.full((100, 100), 255, np.uint8)
+        box = np.rint(corners(30, 30, 40, 30)).astype(np.int32)
+        cv2.fillPoly(img, [box], 0)
+        self.assertEqual(fill_ratios(ink_integral(img), [box]).tolist(), [1.0])
+
+    def test_scored(self):
+        scored = get_scored_contours_from_image(draw_page())
+        self.assertEqual([item.box for item in scored], get_filled_contours_from_image(draw_page()))
+        self.assertGreater(scored[0].fill, 0.1)
+        self.assertEqual(get_scored_contours_from_image(draw_page(), fill_threshold=0.9), [])
+
+    def test_without_hierarchy(self):
+        img = draw_form()
+        expected = sorted(box_center(box) for box in get_filled_contours_from_image(img))
+        for retrieval in ('list', 'external'):
+            scored = get_scored_contours_from_image(img, retrieval=retrieval, engine='cascade')
+            found = sorted(box_center(item.box) for item in scored)
+            self.assertEqual(len(found), len(expected))
+            for center, other in zip(found, expected):
+                self.assertLess(np.hypot(center[0] - other[0], center[1] - other[1]), 2.0)
+            self.assertTrue(all(item.fill >= 0.1 for item in scored))
+
+    def test_glyph_is_not_a_box(self):
+        scored = get_scored_contours_from_image(draw_page(), retrieval='list')
+        self.assertEqual(len(scored), 1)
+
+    def test_unknown_retrieval(self):
+        with self.assertRaises(ValueError):
+            get_scored_contours_from_image(draw_page(), retrieval='ccomp')
+
+    def test_cache_key(self):
+        img = draw_page()
+        self.assertNotEqual(content_key(img), content_key(img, {'fill_threshold': 0.2}))
+        self.assertNotEqual(content_key(img), content_key(img, {'retrieval': 'list'}))
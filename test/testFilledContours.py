@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from boxDetector.checkBoxDetector import (
+    filled_indices,
+    get_filled_contours,
+    get_filled_contours_from_buffer,
+    get_filled_contours_from_image,
+    get_filled_contours_from_raw
+)
+
+
+def draw_page():
+    """A page with a checked box, an empty box and some text"""
+    img = np.full((300, 400, 3), 255, np.uint8)
+    cv2.rectangle(img, (5, 5), (394, 294), (0, 0, 0), 2)
+    cv2.rectangle(img, (40, 40), (90, 90), (0, 0, 0), 3)
+    cv2.line(img, (40, 40), (90, 90), (0, 0, 0), 4)
+    cv2.line(img, (90, 40), (40, 90), (0, 0, 0), 4)
+    cv2.rectangle(img, (240, 40), (290, 90), (0, 0, 0), 3)
+    cv2.putText(img, 'Name', (40, 200), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 3)
+    return img
+
+
+class TestFilledContours(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.img_path = os.path.join(self.folder, 'page.png')
+        cv2.imwrite(self.img_path, draw_page())
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_checked_box(self):
+        boxes = get_filled_contours(self.img_path)
+        self.assertEqual(len(boxes), 1)
+        self.assertEqual(sorted(boxes[0]), [(37.0, 37.0), (37.0, 93.0), (93.0, 37.0), (93.0, 93.0)])
+
+    def test_min_rect_size(self):
+        self.assertEqual(get_filled_contours(self.img_path, min_rect_size=100), [])
+
+    def test_from_image(self):
+        expected = get_filled_contours(self.img_path)
+        img = draw_page()
+        self.assertEqual(get_filled_contours_from_image(img), expected)
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        self.assertEqual(get_filled_contours_from_image(gray), expected)
+        self.assertEqual(get_filled_contours_from_image(gray[:, :, None]), expected)
+
+    def test_from_buffer(self):
+        expected = get_filled_contours(self.img_path)
+        with open(self.img_path, 'rb') as img_file:
+            encoded = img_file.read()
+        self.assertEqual(get_filled_contours_from_buffer(encoded), expected)
+        self.assertEqual(get_filled_contours_from_buffer(memoryview(encoded)), expected)
+        with self.assertRaises(IOError):
+            get_filled_contours_from_buffer(b'not an image')
+
+    def test_from_raw(self):
+        expected = get_filled_contours(self.img_path)
+        gray = cv2.cvtColor(draw_page(), cv2.COLOR_BGR2GRAY)
+        raw_path = os.path.join(self.folder, 'page.raw')
+        with open(raw_path, 'wb') as raw_file:
+            raw_file.write(b'head')
+            raw_file.write(gray.tobytes())
+        height, width = gray.shape
+        self.assertEqual(
+            get_filled_contours_from_raw(raw_path, width, height, offset=4), expected)
+
+    def test_filled_indices(self):
+        hierarchy = np.array([[
+            [-1, -1, 1, -1],
+            [3, -1, 2, 0],
+            [4, -1, -1, 1],
+            [-1, 1, 5, 0],
+            [-1, 2, -1, 1],
+            [-1, -1, -1, 3]]])
+        self.assertEqual(filled_indices(hierarchy).tolist(), [1])
+
+    def test_filled_indices_without_outer_frame(self):
+        # two pages, the box is the first contour and the second page is a
+        # root with a split child
+        hierarchy = np.array([[
+            [-1, -1, 1, 2],
+            [3, -1, -1, 0],
+            [5, -1, 0, -1],
+            [-1, 1, -1, 0],
+            [-1, -1, -1, 6],
+            [-1, 2, 6, -1],
+            [7, -1, 4, 5],
+            [-1, 6, -1, 5]]])
+        self.assertEqual(filled_indices(hierarchy).tolist(), [0])
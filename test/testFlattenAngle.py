@@ -37,7 +37,7 @@ class TestFlattenAngle(TestCase):
         uv = segments[4].unit_vector
         lines = [segments[4],segments[5]] 
         ok2 = LineGroup(uv, None, lines)
-        angle_ok_2 = angle_flatten+0.1
+        angle_ok_2 = angle_flatten+minRadAngle+0.1
         angleDict[angle_ok_2] = ok2
 
         uv = segments[6].unit_vector
@@ -14,7 +14,8 @@ class TestFlattenLineSegment(TestCase):
         b = LineSegment((2, 2), (3, 3))
         c = LineSegment((5, 5), (10, 10))
         flatten = flatten_line_segment([a,b,c],a.unit_vector)
-        joined = flatten[0.0]
+        self.assertEqual(len(flatten), 1)
+        joined = flatten[0]
         self.assertEqual(joined.a, (0, 0))
         self.assertEqual(joined.b, (10, 10))
 
@@ -24,10 +25,28 @@ class TestFlattenLineSegment(TestCase):
         c = LineSegment((15, 2), (15, 10))
         flatten = flatten_line_segment([a,b,c],a.unit_vector,gap_epsilon=6)
         # CHecking it respected the levels erasing the merged ones
-        self.assertIn(0.0, flatten)
-        self.assertNotIn(3.0, flatten)
-        self.assertIn(15.0, flatten)
-        joined = flatten[0.0]
+        self.assertEqual(flatten.offsets(a.unit_vector).tolist(), [-15.0, 0.0])
+        joined = flatten[1]
         self.assertEqual(joined.a, a.a)
         self.assertEqual(joined.b, b.b)
-        self.assertEqual(flatten[15.0], c)
+        self.assertEqual(flatten[0], c)
+
+    def test_same_distance_is_kept(self):
+        # same distance to the origin on both sides, and 2 far parts of a line
+        a = LineSegment((0, -5), (10, -5))
+        b = LineSegment((0, 5), (10, 5))
+        c = LineSegment((40, 5), (50, 5))
+        flatten = flatten_line_segment([a,b,c],a.unit_vector)
+        self.assertEqual(len(flatten), 3)
+        self.assertEqual(list(flatten), [a, b, c])
+
+    def test_overlapping(self):
+        a = LineSegment((0, 0), (30, 0))
+        b = LineSegment((5, 1), (10, 1))
+        c = LineSegment((35, 0), (40, 0))
+        flatten = flatten_line_segment([b,c,a],a.unit_vector)
+        self.assertEqual(len(flatten), 1)
+        self.assertEqual((flatten[0].a, flatten[0].b), ((0, 0), (40, 0)))
+
+    def test_empty(self):
+        self.assertEqual(len(flatten_line_segment([], (1, 0))), 0)
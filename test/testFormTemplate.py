@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from boxDetector.checkBoxDetector import get_filled_contours_from_image
+from boxDetector.formTemplate import TemplateRegistry
+
+CORNERS = [(60, 60), (60, 160), (60, 260), (300, 60), (300, 160), (300, 260)]
+
+
+def draw_sheet(checked, shift=(0, 0)):
+    """A form with a box on every corner, checked[i] marks box i"""
+    img = np.full((400, 500, 3), 255, np.uint8)
+    dx, dy = shift
+    for (x, y), is_checked in zip(CORNERS, checked):
+        x, y = x + dx, y + dy
+        cv2.rectangle(img, (x, y), (x + 40, y + 40), (0, 0, 0), 3)
+        if is_checked:
+            cv2.line(img, (x, y), (x + 40, y + 40), (0, 0, 0), 3)
+            cv2.line(img, (x + 40, y), (x, y + 40), (0, 0, 0), 3)
+        cv2.putText(img, 'Item', (x + 60, y + 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+    return img
+
+
+def rounded(boxes):
+    return sorted([tuple(round(v) for point in box for v in point) for box in boxes])
+
+
+class TestFormTemplate(TestCase):
+
+    def setUp(self):
+        self.registry = TemplateRegistry()
+        template = self.registry.register('form', draw_sheet([True]*6))
+        self.assertEqual(len(template.boxes), 6)
+
+    def test_aligned(self):
+        checked = [True, False, True, False, False, True]
+        page = draw_sheet(checked, shift=(5, -3))
+        result = self.registry.detect('form', page)
+        self.assertTrue(result.aligned)
+        self.assertEqual(result.offset, (5.0, -3.0))
+        order = np.argsort([np.mean(box, axis=0)[0]*1000 + np.mean(box, axis=0)[1]
+                            for box in self.registry.templates['form'].boxes])
+        self.assertEqual([result.filled[i] for i in order], checked)
+        self.assertEqual(rounded(result.boxes), rounded(get_filled_contours_from_image(page)))
+
+    def test_full_scan_fallback(self):
+        page = draw_sheet([True, True, False, False, False, False], shift=(60, 0))
+        result = self.registry.detect('form', page)
+        self.assertFalse(result.aligned)
+        self.assertIsNone(result.offset)
+        self.assertEqual(result.boxes, get_filled_contours_from_image(page))
+
+    def test_blank_page(self):
+        result = self.registry.detect('form', np.full((400, 500), 255, np.uint8))
+        self.assertFalse(result.aligned)
+        self.assertEqual(result.filled, [False]*6)
+
+    def test_save_load(self):
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, 'templates.json')
+            self.registry.save(path)
+            loaded = TemplateRegistry()
+            loaded.load(path)
+        finally:
+            shutil.rmtree(folder)
+        self.assertIn('form', loaded)
+        page = draw_sheet([False, True, False, True, False, True], shift=(-4, 6))
+        self.assertEqual(loaded.detect('form', page), self.registry.detect('form', page))
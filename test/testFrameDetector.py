@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from boxDetector.detectionStats import DetectionStats
+from boxDetector.frameDetector import FrameDetector, Tile, dirty_regions, merge_regions
+from boxDetector.test.testTiledDetector import draw_form
+
+
+def check(img, x, y):
+    cv2.line(img, (x, y), (x + 40, y + 40), (0, 0, 0), 3)
+    cv2.line(img, (x + 40, y), (x, y + 40), (0, 0, 0), 3)
+
+
+def state(result):
+    return sorted((tuple(box.box[0]), box.filled) for box in result.boxes)
+
+
+class TestFrameDetector(TestCase):
+
+    def setUp(self):
+        self.frame = draw_form()
+        self.detector = FrameDetector()
+        self.first = self.detector.update(self.frame)
+
+    def test_first_frame(self):
+        self.assertEqual(len(self.first.boxes), 7)
+        self.assertEqual(sum(box.filled for box in self.first.boxes), 5)
+        self.assertEqual([change.kind for change in self.first.changes], ['new']*7)
+        self.assertEqual(self.first.dirty, [Tile(0, 0, 900, 700)])
+
+    def test_static_frames(self):
+        stats = DetectionStats()
+        for index in range(1, 4):
+            result = self.detector.update(self.frame.copy(), stats=stats)
+            self.assertEqual(result.index, index)
+            self.assertEqual(result.boxes, self.first.boxes)
+            self.assertEqual((result.changes, result.dirty), ([], []))
+        self.assertNotIn('frame.detect', stats.times)
+        self.assertEqual(stats.counts['frame.dirty_regions'], 0)
+
+    def test_sequence(self):
+        ids = dict((tuple(box.box[0]), box.id) for box in self.first.boxes)
+        empty = [box for box in self.first.boxes if not box.filled][0]
+        frame = self.frame.copy()
+        x, y = [int(round(v)) for v in np.min(empty.box, axis=0)]
+        check(frame, x + 1, y + 1)
+        result = self.detector.update(frame)
+        self.assertEqual([tuple(change) for change in result.changes], [(empty.id, 'filled')])
+        self.assertTrue(self.detector.boxes[empty.id].filled)
+        self.assertEqual(len(result.dirty), 1)
+        self.assertLess(result.dirty[0].right - result.dirty[0].left, 150)
+
+        cv2.rectangle(frame, (700, 500), (740, 540), (0, 0, 0), 3)
+        result = self.detector.update(frame)
+        self.assertEqual([change.kind for change in result.changes], ['new'])
+        self.assertEqual(len(result.boxes), 8)
+
+        cv2.rectangle(frame, (35, 35), (85, 85), (255, 255, 255), -1)
+        result = self.detector.update(frame)
+        removed = [change.id for change in result.changes if change.kind == 'removed']
+        self.assertEqual(len(removed), 1)
+        self.assertNotIn(removed[0], self.detector.boxes)
+        # Untouched boxes keep their ids
+        for box in result.boxes:
+            if tuple(box.box[0]) in ids:
+                self.assertEqual(box.id, ids[tuple(box.box[0])])
+        self.assertEqual(state(result), state(FrameDetector().update(frame)))
+
+    def test_new_size_restarts(self):
+        result = self.detector.update(cv2.resize(self.frame, (450, 350)))
+        self.assertEqual(result.dirty, [Tile(0, 0, 450, 350)])
+        self.assertTrue(all(change.kind == 'new' for change in result.changes))
+
+    def test_dirty_regions(self):
+        changed = np.zeros((100, 130), bool)
+        self.assertEqual(dirty_regions(changed, block_size=32), [])
+        changed[5, 5] = changed[40, 40] = changed[90, 125] = changed[99, 129] = True
+        self.assertEqual(dirty_regions(changed, block_size=32),
+                         [Tile(0, 0, 64, 64), Tile(96, 64, 130, 100)])
+        self.assertEqual(dirty_regions(changed, block_size=32, min_changed=1), [])
+        self.assertEqual(merge_regions([Tile(0, 0, 10, 10), Tile(20, 0, 30, 10), Tile(5, 5, 25, 8)]),
+                         [Tile(0, 0, 30, 10)])
@@ -0,0 +1,37 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+from boxDetector.benchmark.importTime import child_env, import_time, run
+from boxDetector.lazyImport import LazyModule, lazy_module
+
+
+class TestImportTime(TestCase):
+
+    def test_no_cv2(self):
+        result = run(modules=("boxDetector.checkBoxDetector",), repeat=1)
+        self.assertEqual(result["failures"], [])
+        self.assertFalse(result["modules"]["boxDetector.checkBoxDetector"]["cv2"])
+        self.assertTrue(result["reference"]["cv2"]["cv2"])
+
+    def test_budget(self):
+        result = run(modules=("boxDetector.lineSegment",), repeat=1, max_ms=0)
+        self.assertEqual(len(result["failures"]), 1)
+
+    def test_loaded_on_use(self):
+        code = ("import sys\n"
+                "import numpy as np\n"
+                "from boxDetector.checkBoxDetector import get_filled_contours_from_image, is_boxy\n"
+                "assert is_boxy([(0, 0), (0, 50), (50, 50), (50, 0), (0, 0)])\n"
+                "assert 'cv2' not in sys.modules\n"
+                "get_filled_contours_from_image(np.full((60, 60), 255, np.uint8))\n"
+                "assert 'cv2' in sys.modules\n")
+        subprocess.run([sys.executable, "-c", code], env=child_env(), check=True)
+
+    def test_lazy_module(self):
+        module = LazyModule("json")
+        self.assertFalse(module.loaded)
+        self.assertEqual(module.dumps([1]), "[1]")
+        self.assertTrue(module.loaded)
+        self.assertIs(lazy_module("sys"), sys)
+        self.assertIn("seconds", import_time("boxDetector.lazyImport", repeat=1))
@@ -0,0 +1,83 @@
+import pickle
+from unittest import TestCase
+
+import cv2
+
+from boxDetector.benchmark.syntheticPage import make_page
+from boxDetector.checkBoxDetector import filled_candidates, get_filled_contours_from_image
+from boxDetector.detectionStats import DetectionStats
+from boxDetector.parallelEngine import ParallelEngine, SharedContours, evaluate_range
+from boxDetector.shapeEngines import fast_engine, robust_engine
+
+
+def page_candidates():
+    page = make_page(seed=1, width=1200, height=1600, checkboxes=30, box_size=50,
+                     distractors=10, rotation=3, noise=0.003)
+    ret, thresh = cv2.threshold(page.img, 127, 255, 0)
+    contours, hierarchy = cv2.findContours(thresh, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)[-2:]
+    return page.img, [cnt for cnt, _ in filled_candidates(contours, hierarchy, min_rect_size=5)]
+
+
+class TestParallelEngine(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.img, cls.candidates = page_candidates()
+        cls.engine = ParallelEngine(workers=2, min_contours=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.close()
+
+    def test_shared_contours(self):
+        contours = [[(0, 0), (0, 5)], [(1, 1)], [(2, 2), (3, 3), (4, 4)]]
+        with SharedContours(contours) as shared:
+            self.assertEqual(shared.offsets.tolist(), [0, 2, 3, 6])
+            self.assertEqual(shared.points[3:].tolist(), [[2, 2], [3, 3], [4, 4]])
+            self.assertEqual(shared.ranges(1), [(0, 3)])
+            self.assertEqual(shared.ranges(2), [(0, 2), (2, 3)])
+            ranges = shared.ranges(10)
+            self.assertEqual(ranges[0][0], 0)
+            self.assertEqual(ranges[-1][1], 3)
+        self.assertIsNone(shared.points)
+        with SharedContours([]) as shared:
+            self.assertEqual(shared.ranges(4), [])
+
+    def test_evaluate_range(self):
+        with SharedContours(self.candidates) as shared:
+            boxy, stats = evaluate_range(shared.name, shared.count, shared.dtype, 3, 20,
+                                         "robust", {}, with_stats=True)
+        self.assertEqual(boxy.tolist(), robust_engine(self.candidates[3:20]).tolist())
+        self.assertEqual(stats.counts["is_boxy.contours"], 17)
+
+    def test_same_as_engines(self):
+        self.assertGreater(len(self.candidates), 50)
+        self.assertEqual(self.engine(self.candidates).tolist(),
+                         robust_engine(self.candidates).tolist())
+        fast = ParallelEngine(workers=2, engine="fast", min_contours=0)
+        with fast:
+            self.assertEqual(fast(self.candidates).tolist(), fast_engine(self.candidates).tolist())
+        self.assertEqual(len(self.engine([])), 0)
+
+    def test_stats(self):
+        stats = DetectionStats()
+        self.engine(self.candidates, stats=stats)
+        self.assertEqual(stats.counts["is_boxy.contours"], len(self.candidates))
+        self.assertGreater(stats.counts["parallel.ranges"], 1)
+        self.assertIn("parallel.pack", stats.times)
+
+    def test_small_pages_stay_local(self):
+        engine = ParallelEngine(workers=2)
+        self.assertEqual(engine(self.candidates[:10]).tolist(),
+                         robust_engine(self.candidates[:10]).tolist())
+        self.assertIsNone(engine._pool)
+        self.assertEqual(repr(pickle.loads(pickle.dumps(self.engine))), "ParallelEngine(engine='robust')")
+
+    def test_cache_name(self):
+        self.assertEqual(ParallelEngine(workers=2).cache_name, ParallelEngine(workers=4).cache_name)
+        self.assertNotEqual(ParallelEngine(engine='fast').cache_name, ParallelEngine().cache_name)
+        self.assertIsNone(ParallelEngine(engine=lambda contours, **params: contours).cache_name)
+
+    def test_pipeline(self):
+        self.assertEqual(get_filled_contours_from_image(self.img, engine=self.engine),
+                         get_filled_contours_from_image(self.img))
@@ -0,0 +1,53 @@
+from unittest import TestCase
+
+import cv2
+
+from boxDetector.benchmark.syntheticPage import make_page, match_boxes
+from boxDetector.checkBoxDetector import get_filled_contours_from_image
+from boxDetector.detectionStats import DetectionStats
+from boxDetector.pyramidDetector import (
+    Tile,
+    candidate_roi,
+    coarse_candidates,
+    coarse_params,
+    get_filled_contours_pyramid
+)
+from boxDetector.test.testTiledDetector import draw_form, rounded
+
+
+class TestPyramidDetector(TestCase):
+
+    def test_coarse_params(self):
+        params = coarse_params({"min_rect_size": 40, "engine": "robust", "cascade": None}, 0.25)
+        self.assertEqual(params, {"engine": "fast", "min_rect_size": 10.0,
+                                  "min_size": 1.25, "gap_epsilon": 2.5})
+
+    def test_candidates(self):
+        gray = cv2.cvtColor(draw_form(), cv2.COLOR_BGR2GRAY)
+        # Filled or not, every box is a candidate
+        self.assertEqual(len(coarse_candidates(gray, scale=0.5)), 7)
+        roi = candidate_roi([(10, 10), (50, 10), (50, 50), (10, 50)], 60, 100)
+        self.assertEqual(roi, Tile(0, 0, 60, 61))
+
+    def test_same_as_full(self):
+        img = draw_form()
+        stats = DetectionStats()
+        found = get_filled_contours_pyramid(img, scale=0.5, stats=stats)
+        self.assertEqual(rounded(found), rounded(get_filled_contours_from_image(img)))
+        self.assertEqual(stats.counts["pyramid.candidates"], 7)
+        self.assertIn("pyramid.fine", stats.times)
+
+    def test_too_small_to_scale(self):
+        img = draw_form()
+        stats = DetectionStats()
+        found = get_filled_contours_pyramid(img, scale=0.1, stats=stats)
+        self.assertEqual(rounded(found), rounded(get_filled_contours_from_image(img)))
+        self.assertNotIn("pyramid.coarse", stats.times)
+
+    def test_high_resolution(self):
+        page = make_page(seed=2, width=1600, height=2200, checkboxes=20, box_size=70,
+                         distractors=10, rotation=3, noise=0.002)
+        full = match_boxes(get_filled_contours_from_image(page.img), page.boxes)
+        pyramid = match_boxes(get_filled_contours_pyramid(page.img, scale=0.5), page.boxes)
+        self.assertEqual(pyramid[0], full[0])
+        self.assertLessEqual(pyramid[1], full[1])
@@ -0,0 +1,63 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from boxDetector.checkBoxDetector import iter_filled_contours
+from boxDetector.rejectionCascade import RejectionCascade
+from boxDetector.test.testFilledContours import draw_page
+
+
+def as_contour(points):
+    return np.array(points, dtype=np.int32).reshape(-1, 1, 2)
+
+
+class TestRejectionCascade(TestCase):
+
+    def setUp(self):
+        self.box = as_contour([(0, 0), (0, 40), (40, 40), (40, 0)])
+        self.bar = as_contour([(0, 0), (0, 10), (80, 10), (80, 0)])
+        self.triangle = as_contour([(0, 0), (40, 0), (0, 40)])
+        self.star = cv2.ellipse2Poly((50, 50), (40, 40), 0, 0, 360, 10).reshape(-1, 1, 2)
+
+    def check(self, cascade, cnt):
+        return cascade.accept(cnt, cv2.minAreaRect(cnt))
+
+    def test_box_passes(self):
+        cascade = RejectionCascade()
+        self.assertTrue(self.check(cascade, self.box))
+        self.assertEqual(cascade.passed, 1)
+
+    def test_stages(self):
+        cascade = RejectionCascade(max_size=60)
+        self.assertFalse(self.check(cascade, self.bar))
+        self.assertEqual(cascade.rejected["size"], 1)
+        cascade = RejectionCascade()
+        self.assertFalse(self.check(cascade, self.bar))
+        self.assertFalse(self.check(cascade, self.triangle))
+        self.assertFalse(self.check(cascade, self.star))
+        self.assertEqual(cascade.seen, 3)
+        self.assertEqual(cascade.passed, 0)
+        self.assertEqual(dict(cascade.rejected), {
+            "size": 0, "aspect_ratio": 1, "fill_ratio": 1, "vertices": 1})
+
+    def test_disabled_stages(self):
+        cascade = RejectionCascade(max_aspect_ratio=None, min_fill_ratio=None,
+                                   min_vertices=None, max_vertices=None)
+        self.assertTrue(self.check(cascade, self.bar))
+        self.assertTrue(self.check(cascade, self.triangle))
+
+    def test_reset(self):
+        cascade = RejectionCascade()
+        self.check(cascade, self.bar)
+        cascade.reset()
+        self.assertEqual(cascade.seen, 0)
+        self.assertEqual(sum(cascade.rejected.values()), 0)
+
+    def test_pipeline(self):
+        img = draw_page()
+        cascade = RejectionCascade()
+        self.assertEqual(
+            list(iter_filled_contours(img, cascade=cascade)), list(iter_filled_contours(img)))
+        self.assertGreaterEqual(cascade.passed, 1)
+        self.assertEqual(cascade.seen, cascade.passed + sum(cascade.rejected.values()))
@@ -0,0 +1,105 @@
+import os
+import pickle
+import shutil
+import tempfile
+from unittest import TestCase
+
+import cv2
+
+from boxDetector.batchDetector import get_filled_contours_batch
+from boxDetector.checkBoxDetector import (
+    get_filled_contours,
+    get_filled_contours_from_buffer,
+    get_filled_contours_from_image
+)
+from boxDetector.detectionStats import DetectionStats
+from boxDetector.rejectionCascade import RejectionCascade
+from boxDetector.resultCache import ResultCache, content_key
+from boxDetector.test.testFilledContours import draw_page
+
+
+class TestResultCache(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache_folder = os.path.join(self.folder, 'cache')
+        self.img_path = os.path.join(self.folder, 'page.png')
+        cv2.imwrite(self.img_path, draw_page())
+        self.expected = get_filled_contours(self.img_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_key(self):
+        img = draw_page()
+        self.assertEqual(content_key(img), content_key(img.copy(), {'min_rect_size': 30}))
+        self.assertNotEqual(content_key(img), content_key(img, {'min_rect_size': 31}))
+        self.assertEqual(content_key(img), content_key(img, {'line_epsilon': 3}))
+        self.assertNotEqual(content_key(img), content_key(img, {'line_epsilon': 6}))
+        self.assertNotEqual(content_key(img), content_key(img[:, :, 0]))
+        self.assertNotEqual(content_key(img), content_key(img.tobytes()))
+        self.assertEqual(content_key(img, {'stats': DetectionStats()}), content_key(img))
+
+    def test_memory_tier(self):
+        cache = ResultCache(max_entries=1)
+        self.assertEqual(get_filled_contours(self.img_path, cache=cache), self.expected)
+        stats = DetectionStats()
+        self.assertEqual(get_filled_contours(self.img_path, cache=cache, stats=stats), self.expected)
+        self.assertEqual(stats.counts, {'cache.hits': 1})
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # A different key pushes the page out of the memory tier
+        get_filled_contours(self.img_path, min_rect_size=31, cache=cache)
+        get_filled_contours(self.img_path, cache=cache)
+        self.assertEqual(cache.hits, 1)
+
+    def test_disk_tier(self):
+        cache = ResultCache(directory=self.cache_folder)
+        get_filled_contours_from_image(draw_page(), cache=cache)
+        other = ResultCache(directory=self.cache_folder)
+        self.assertEqual(get_filled_contours_from_image(draw_page(), cache=other), self.expected)
+        self.assertEqual(other.hits, 1)
+        other.clear()
+        self.assertIsNone(ResultCache(directory=self.cache_folder).get(content_key(draw_page())))
+
+    def test_buffer(self):
+        cache = ResultCache()
+        with open(self.img_path, 'rb') as img_file:
+            encoded = img_file.read()
+        get_filled_contours(self.img_path, cache=cache)
+        self.assertEqual(get_filled_contours_from_buffer(encoded, cache=cache), self.expected)
+        self.assertEqual(cache.hits, 1)
+
+    def test_disk_eviction(self):
+        cache = ResultCache(directory=self.cache_folder, max_disk_bytes=400)
+        box = [(0.0, 0.0), (0.0, 1.0), (1.0, 1.0), (1.0, 0.0)]
+        for i in range(20):
+            cache.put(content_key(str(i).encode()), [box])
+        size = sum(entry[1] for entry in cache._disk_entries())
+        self.assertLessEqual(size, 400 + 400//16 + 100)
+        self.assertIsNotNone(ResultCache(directory=self.cache_folder).get(content_key(b'19')))
+
+    def test_broken_entry(self):
+        cache = ResultCache(directory=self.cache_folder)
+        key = content_key(b'page')
+        cache.put(key, [])
+        with open(cache._path(key), 'w') as entry:
+            entry.write('{')
+        self.assertIsNone(ResultCache(directory=self.cache_folder).get(key))
+
+    def test_cascade_is_not_cached(self):
+        cache = ResultCache()
+        cascade = RejectionCascade()
+        get_filled_contours(self.img_path, cascade=cascade, cache=cache)
+        get_filled_contours(self.img_path, cascade=cascade, cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+        self.assertEqual(cascade.seen, 4)
+
+    def test_workers_share_the_disk(self):
+        cache = ResultCache(directory=self.cache_folder)
+        copy = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(copy.directory, self.cache_folder)
+        paths = [self.img_path]*3
+        results = list(get_filled_contours_batch(paths, workers=2, cache=cache))
+        self.assertEqual([result.boxes for result in results], [self.expected]*3)
+        self.assertEqual(get_filled_contours(self.img_path, cache=cache), self.expected)
+        self.assertEqual(cache.hits, 1)
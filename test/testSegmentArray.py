@@ -0,0 +1,87 @@
+from unittest import TestCase
+
+import numpy as np
+
+from boxDetector.lineSegment import LineSegment, SegmentArray
+
+
+class TestSegmentArray(TestCase):
+
+    def setUp(self):
+        self.segments = SegmentArray(
+            [(5, 0), (0, 0), (0, 6), (3, 3)],
+            [(0, 0), (0, 5), (4, 6), (7, 7)])
+
+    def test_orientation(self):
+        self.assertEqual(self.segments[0].a, (0, 0))
+        self.assertEqual(self.segments[0].b, (5, 0))
+        for segment in self.segments:
+            expected = LineSegment(segment.a, segment.b)
+            self.assertEqual(segment, expected)
+            self.assertEqual(segment.vector, expected.vector)
+            self.assertEqual(segment.unit_vector, expected.unit_vector)
+            self.assertEqual(segment.length, expected.length)
+            self.assertEqual(segment.dist_to_origin, expected.dist_to_origin)
+
+    def test_columns(self):
+        self.assertEqual(self.segments.vector.tolist(), [[5, 0], [0, 5], [4, 0], [4, 4]])
+        self.assertEqual(self.segments.length[:3].tolist(), [5, 5, 4])
+        self.assertEqual(self.segments.dist_to_origin[:3].tolist(), [0, 0, 6])
+
+    def test_angles(self):
+        expected = [segment.get_angle() for segment in self.segments]
+        self.assertEqual(self.segments.angles().tolist(), expected)
+
+    def test_view_is_shared(self):
+        segment = self.segments[2]
+        segment.add_segment(LineSegment((4, 6), (9, 6)))
+        self.assertEqual(self.segments.b[2].tolist(), [9, 6])
+        self.assertEqual(self.segments.length[2], 9)
+
+    def test_project(self):
+        norm = [1, 0]
+        projected = self.segments.project(norm)
+        for segment, expected in zip(projected, self.segments):
+            self.assertEqual(segment, expected.get_projected_segment(norm))
+        only_last = self.segments.project(norm, where=np.array([False, False, False, True]))
+        self.assertEqual(only_last[1], self.segments[1])
+        self.assertEqual(only_last[3].b, (7, 3))
+
+    def test_sorted(self):
+        ordered = self.segments.sorted()
+        self.assertEqual(ordered.dist_to_origin.tolist(), sorted(self.segments.dist_to_origin.tolist()))
+        self.assertEqual(ordered[0], self.segments[0])
+        self.assertEqual(ordered[1], self.segments[1])
+
+    def test_merge_lines(self):
+        segments = SegmentArray([(0, 0), (2, 2), (5, 5), (20, 20)], [(1, 1), (3, 3), (10, 10), (25, 25)])
+        norm = np.array([1.0, 1.0])/np.sqrt(2)
+        merged, group = segments.merge_lines(norm, gap_epsilon=10)
+        self.assertEqual(len(merged), 2)
+        self.assertEqual((merged[0].a, merged[0].b), ((0, 0), (10, 10)))
+        self.assertEqual(merged[1], segments[3])
+        self.assertEqual(group.tolist(), [0, 0])
+
+    def test_merge_lines_groups_and_offsets(self):
+        segments = SegmentArray([(0, 0), (2, 2), (0, 8)], [(1, 1), (3, 3), (2, 10)])
+        norm = np.array([1.0, 1.0])/np.sqrt(2)
+        merged, group = segments.merge_lines(norm, gap_epsilon=10, group=np.array([0, 1, 1]))
+        # One line per group, the segment 8/sqrt(2) away is on its own line
+        self.assertEqual(len(merged), 3)
+        self.assertEqual(group.tolist(), [0, 1, 1])
+        merged, _ = segments.merge_lines(norm, gap_epsilon=10, line_epsilon=6)
+        self.assertEqual(len(merged), 1)
+
+    def test_merge_lines_exact_gap(self):
+        # The gap of group 1 is exactly gap_epsilon, the rotated group 0 must not change it
+        segments = SegmentArray([(0, 0), (2, 48), (25, 48)], [(14, 1), (15, 48), (35, 48)])
+        norm = np.array([segments.unit[0], (1.0, 0.0), (1.0, 0.0)])
+        merged, group = segments.merge_lines(norm, gap_epsilon=10, group=np.array([0, 1, 1]))
+        self.assertEqual(group.tolist(), [0, 1, 1])
+        self.assertEqual(len(segments[1:].merge_lines((1.0, 0.0), gap_epsilon=10)[0]), 2)
+
+    def test_from_segments(self):
+        lines = [LineSegment((0, 0), (1, 1)), LineSegment((2, 2), (3, 3))]
+        segments = SegmentArray.from_segments(lines)
+        self.assertEqual(list(segments), lines)
+        self.assertIs(SegmentArray.from_segments(segments), segments)
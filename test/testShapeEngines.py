@@ -0,0 +1,94 @@
+from functools import partial
+from unittest import TestCase
+
+import numpy as np
+
+from boxDetector.checkBoxDetector import get_filled_contours_from_image
+from boxDetector.detectionStats import DetectionStats
+from boxDetector.resultCache import ResultCache, content_key
+from boxDetector.shapeEngines import (
+    AMBIGUOUS,
+    BOX,
+    NOT_A_BOX,
+    cascade_engine,
+    engine_name,
+    fast_engine,
+    get_engine,
+    quad_verdicts,
+    robust_engine
+)
+from boxDetector.test.testFilledContours import draw_page
+from boxDetector.test.testTiledDetector import draw_form, rounded
+
+
+class TestShapeEngines(TestCase):
+
+    def setUp(self):
+        self.square = np.array([(0, 0), (0, 50), (50, 50), (50, 0)], np.int32)
+        self.rhombus = np.array([(0, 0), (60, 0), (90, 40), (30, 40)], np.int32)
+        self.cut_corner = np.array([(0, 0), (0, 50), (40, 50), (50, 40), (50, 0)], np.int32)
+        self.tilted = np.array([(0, 0), (0, 50), (50, 61), (50, 11)], np.int32)
+        self.line = np.array([(0, 0), (50, 0), (50, 1)], np.int32)
+
+    def test_verdicts(self):
+        verdicts = quad_verdicts([self.square, self.rhombus, self.cut_corner, self.tilted, self.line])
+        self.assertEqual(verdicts.tolist(), [BOX, NOT_A_BOX, AMBIGUOUS, AMBIGUOUS, NOT_A_BOX])
+
+    def test_cascade_sends_ambiguous_to_robust(self):
+        contours = [self.square, self.rhombus, self.cut_corner]
+        stats = DetectionStats()
+        boxy = cascade_engine(contours, stats=stats)
+        self.assertEqual(stats.counts['engine.ambiguous'], 1)
+        self.assertEqual(stats.counts['is_boxy.contours'], 1)
+        self.assertEqual(boxy.tolist(), [True, False, robust_engine([self.cut_corner])[0]])
+        self.assertEqual(fast_engine(contours).tolist(), [True, False, False])
+
+    def test_same_boxes(self):
+        img = draw_form()
+        expected = rounded(get_filled_contours_from_image(img))
+        for engine in ('fast', 'cascade', robust_engine):
+            self.assertEqual(rounded(get_filled_contours_from_image(img, engine=engine)), expected)
+
+    def test_line_epsilon(self):
+        seen = []
+
+        def recording_engine(contours, **params):
+            seen.append(params['line_epsilon'])
+            return robust_engine(contours, **params)
+        img = draw_form()
+        get_filled_contours_from_image(img, engine=recording_engine, line_epsilon=6)
+        self.assertEqual(seen, [6])
+
+    def test_get_engine(self):
+        self.assertIs(get_engine('fast'), fast_engine)
+        self.assertIs(get_engine(robust_engine), robust_engine)
+        with self.assertRaises(ValueError):
+            get_engine('slow')
+        with self.assertRaises(ValueError):
+            get_filled_contours_from_image(draw_page(), engine='slow')
+
+    def test_cache_key(self):
+        img = draw_page()
+        self.assertEqual(content_key(img), content_key(img, {'engine': 'robust'}))
+        self.assertNotEqual(content_key(img), content_key(img, {'engine': 'fast'}))
+        self.assertNotEqual(content_key(img, {'engine': fast_engine}), content_key(img, {'engine': 'fast'}))
+
+    def test_engine_name(self):
+        self.assertEqual(engine_name('fast'), 'fast')
+        self.assertEqual(engine_name(fast_engine), 'boxDetector.shapeEngines.fast_engine')
+        strict = partial(robust_engine, parallel_epsilon=0.1)
+        self.assertIsNone(engine_name(strict))
+        self.assertIsNone(engine_name(lambda contours, **params: robust_engine(contours, **params)))
+        with self.assertRaises(ValueError):
+            content_key(draw_page(), {'engine': strict})
+        strict.cache_name = 'strict'
+        self.assertEqual(engine_name(strict), 'strict')
+
+    def test_unnamed_engines_skip_the_cache(self):
+        # Both lambdas would have the same key
+        img = draw_page()
+        cache = ResultCache()
+        for boxy, expected in ((False, []), (True, get_filled_contours_from_image(img))):
+            engine = lambda contours, **params: robust_engine(contours, **params) if boxy else np.zeros(len(contours), bool)
+            self.assertEqual(get_filled_contours_from_image(img, cache=cache, engine=engine), expected)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
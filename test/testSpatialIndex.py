@@ -0,0 +1,78 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from boxDetector.benchmark.syntheticPage import make_page
+from boxDetector.checkBoxDetector import get_filled_contours_from_image
+from boxDetector.detectionStats import DetectionStats
+from boxDetector.resultCache import content_key
+from boxDetector.spatialIndex import BoxIndex, non_max_suppression, suppress_overlaps
+
+
+def square(left, top, size, angle=0):
+    return cv2.boxPoints(((left + size/2.0, top + size/2.0), (size, size), angle)).tolist()
+
+
+class TestSpatialIndex(TestCase):
+
+    def setUp(self):
+        # 3 rows of 4 boxes, the rows slightly uneven
+        self.boxes = [square(20 + 60*column, 30 + 80*row + column, 30)
+                      for row in range(3) for column in range(4)]
+
+    def test_query(self):
+        index = BoxIndex(self.boxes)
+        self.assertEqual(index.query((0, 0, 10, 10)), [])
+        self.assertEqual(index.query((25, 35, 30, 40)), [0])
+        self.assertEqual(index.query((40, 40, 90, 50)), [0, 1])
+        self.assertEqual(index.overlapping(0), [])
+
+    def test_nearest(self):
+        index = BoxIndex(self.boxes)
+        self.assertEqual(index.nearest((36, 44)), [0])
+        self.assertEqual(index.nearest((400, 10), k=2), [3, 7])
+        self.assertEqual(index.nearest((1000, 1000), max_distance=50), [])
+        self.assertEqual(len(index.nearest((0, 0), k=50)), 12)
+        self.assertEqual(BoxIndex([]).nearest((0, 0)), [])
+
+    def test_nearest_brute_force(self):
+        rng = np.random.RandomState(3)
+        boxes = [square(x, y, size) for x, y, size in
+                 zip(rng.uniform(0, 500, 60), rng.uniform(0, 500, 60), rng.uniform(10, 40, 60))]
+        index = BoxIndex(boxes)
+        for point in rng.uniform(-50, 550, (20, 2)):
+            distance = np.hypot(*(index.centers - point).T)
+            self.assertEqual(index.nearest(point, k=3), np.argsort(distance)[:3].tolist())
+
+    def test_rows_columns(self):
+        index = BoxIndex(self.boxes)
+        self.assertEqual(index.rows(), [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9, 10, 11]])
+        self.assertEqual(index.columns(), [[0, 4, 8], [1, 5, 9], [2, 6, 10], [3, 7, 11]])
+        self.assertEqual(BoxIndex([]).rows(), [])
+
+    def test_suppression(self):
+        outer = square(10, 10, 40)
+        inner = square(13, 13, 34)
+        tilted = square(11, 11, 38, 2)
+        apart = square(100, 10, 40)
+        kept = non_max_suppression([inner, outer, tilted, apart])
+        self.assertEqual(kept, [1, 3])
+        self.assertEqual(suppress_overlaps([inner, outer, apart]), [outer, apart])
+        self.assertEqual(non_max_suppression([inner, outer], scores=[1, 0]), [0])
+        self.assertEqual(non_max_suppression([]), [])
+
+    def test_touching_kept(self):
+        left = square(10, 10, 40)
+        right = square(45, 10, 40)
+        self.assertEqual(non_max_suppression([left, right]), [0, 1])
+
+    def test_pipeline_suppress(self):
+        page = make_page(seed=0, width=500, height=500, checkboxes=6, distractors=2, rotation=20, noise=0.01)
+        stats = DetectionStats()
+        found = get_filled_contours_from_image(page.img)
+        kept = get_filled_contours_from_image(page.img, suppress=True, stats=stats)
+        self.assertLess(len(kept), len(found))
+        self.assertEqual(stats.counts['suppressed'], len(found) - len(kept))
+        self.assertEqual(kept, suppress_overlaps(found))
+        self.assertNotEqual(content_key(page.img), content_key(page.img, {'suppress': True}))
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+from itertools import islice
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from boxDetector.checkBoxDetector import get_filled_contours, iter_filled_contours
+from boxDetector.streamDetector import PageId, read_pages, stream_filled_contours
+from boxDetector.test.testFilledContours import draw_page
+
+
+class TestStreamDetector(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.page = os.path.join(self.folder, 'a.png')
+        cv2.imwrite(self.page, draw_page())
+        self.blank = os.path.join(self.folder, 'b.png')
+        cv2.imwrite(self.blank, np.full((300, 400, 3), 255, np.uint8))
+        self.tiff = os.path.join(self.folder, 'c.tiff')
+        cv2.imwritemulti(self.tiff, [draw_page(), draw_page(), np.full((300, 400, 3), 255, np.uint8)])
+        with open(os.path.join(self.folder, 'notes.txt'), 'w') as notes:
+            notes.write('not an image')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_read_directory(self):
+        ids = [page_id for page_id, _ in read_pages(self.folder)]
+        self.assertEqual(ids, [
+            PageId(self.page, 0), PageId(self.blank, 0),
+            PageId(self.tiff, 0), PageId(self.tiff, 1), PageId(self.tiff, 2)])
+
+    def test_multi_page(self):
+        pages = list(read_pages(self.tiff))
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(pages[0][1].shape, (300, 400, 3))
+
+    def test_stream(self):
+        expected = get_filled_contours(self.page)
+        found = list(stream_filled_contours(self.folder))
+        self.assertEqual(found, [
+            (PageId(self.page, 0), expected[0]),
+            (PageId(self.tiff, 0), expected[0]),
+            (PageId(self.tiff, 1), expected[0])])
+
+    def test_stop_early(self):
+        found = list(islice(stream_filled_contours(self.folder), 1))
+        self.assertEqual(found[0][0], PageId(self.page, 0))
+
+    def test_chunks(self):
+        img = draw_page()
+        self.assertEqual(
+            list(iter_filled_contours(img, chunk_size=1)), list(iter_filled_contours(img)))
+
+    def test_missing(self):
+        with self.assertRaises(IOError):
+            list(read_pages(os.path.join(self.folder, 'missing.png')))
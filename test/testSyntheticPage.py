@@ -0,0 +1,43 @@
+import json
+from unittest import TestCase
+
+import numpy as np
+
+from boxDetector.benchmark.runBenchmark import compare, run
+from boxDetector.benchmark.syntheticPage import make_page, match_boxes
+from boxDetector.checkBoxDetector import get_filled_contours_from_image
+
+
+class TestSyntheticPage(TestCase):
+
+    def test_deterministic(self):
+        first = make_page(seed=3, width=600, height=600, checkboxes=6, distractors=4, rotation=5)
+        second = make_page(seed=3, width=600, height=600, checkboxes=6, distractors=4, rotation=5)
+        self.assertTrue(np.array_equal(first.img, second.img))
+        self.assertEqual([box.center for box in first.boxes], [box.center for box in second.boxes])
+        other = make_page(seed=4, width=600, height=600, checkboxes=6, distractors=4)
+        self.assertFalse(np.array_equal(first.img, other.img))
+
+    def test_ground_truth(self):
+        page = make_page(width=600, height=600, checkboxes=8, filled_ratio=0.25, distractors=4)
+        self.assertEqual(page.img.shape, (600, 600))
+        self.assertEqual(len(page.boxes), 8)
+        self.assertEqual(sum(box.filled for box in page.boxes), 2)
+        found = get_filled_contours_from_image(page.img)
+        self.assertEqual(match_boxes(found, page.boxes), (2, 2, 2))
+
+    def test_too_many_items(self):
+        with self.assertRaises(ValueError):
+            make_page(width=300, height=300, checkboxes=10)
+
+    def test_run(self):
+        result = run(pages=1, repeat=1, width=600, height=600, checkboxes=6, distractors=4)
+        json.dumps(result)
+        self.assertEqual(result["accuracy"]["recall"], 1.0)
+        for stage in ("build_segments_angle_map", "flatten_angles", "flatten_line_segment",
+                      "is_boxy", "is_boxy_many", "pipeline"):
+            self.assertIn("seconds", result["stages"][stage])
+        self.assertIn("peak_traced_bytes", result["stages"]["pipeline"])
+        self.assertIn("is_boxy.box_5_points", result["single_contour"])
+        ratios = compare(result, result)
+        self.assertEqual(ratios["single_contour.is_boxy.box_5_points"], 1.0)
@@ -0,0 +1,71 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from boxDetector.benchmark.syntheticPage import make_page
+from boxDetector.checkBoxDetector import get_filled_contours_from_image
+from boxDetector.tiledDetector import Tile, get_filled_contours_tiled, iter_tiles, merge_duplicates
+
+
+def draw_form():
+    """A big page with checked boxes, some of them across tile edges"""
+    img = np.full((700, 900, 3), 255, np.uint8)
+    corners = [(40, 40), (180, 180), (230, 90), (480, 230), (610, 600), (800, 300), (370, 500)]
+    for i, (x, y) in enumerate(corners):
+        cv2.rectangle(img, (x, y), (x + 40, y + 40), (0, 0, 0), 3)
+        if i % 3 != 2:
+            cv2.line(img, (x, y), (x + 40, y + 40), (0, 0, 0), 3)
+            cv2.line(img, (x + 40, y), (x, y + 40), (0, 0, 0), 3)
+    for x, y in [(300, 40), (600, 150), (100, 400), (620, 450), (300, 660), (120, 300)]:
+        cv2.putText(img, 'Text', (x, y), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+    return img
+
+
+def rounded(boxes):
+    return sorted([tuple(round(v, 3) for point in box for v in point) for box in boxes])
+
+
+class TestTiledDetector(TestCase):
+
+    def test_tiles(self):
+        tiles = list(iter_tiles(300, 150, tile_size=100, overlap=20))
+        self.assertEqual(len(tiles), 6)
+        self.assertEqual(tiles[0], Tile(0, 0, 120, 120))
+        self.assertEqual(tiles[4], Tile(80, 80, 220, 150))
+
+    def test_same_as_untiled(self):
+        img = draw_form()
+        expected = get_filled_contours_from_image(img)
+        self.assertEqual(len(expected), 5)
+        for workers in (1, 3):
+            found = get_filled_contours_tiled(img, tile_size=200, overlap=60, workers=workers)
+            self.assertEqual(rounded(found), rounded(expected))
+
+    def test_same_as_untiled_on_noise(self):
+        # Noise leaves inner and outer outlines of some boxes, both are kept
+        for seed in (0, 1):
+            img = make_page(seed=seed, width=1600, height=1200, noise=0.005).img
+            expected = np.array(sorted(get_filled_contours_from_image(img)))
+            found = np.array(sorted(get_filled_contours_tiled(img, tile_size=300, overlap=80)))
+            self.assertEqual(found.shape, expected.shape)
+            np.testing.assert_allclose(found, expected, atol=0.01)
+
+    def test_gray(self):
+        img = draw_form()
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        self.assertEqual(
+            rounded(get_filled_contours_tiled(gray, tile_size=250, overlap=60)),
+            rounded(get_filled_contours_from_image(img)))
+
+    def test_merge_duplicates(self):
+        box = [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0)]
+        moved = [(x + 0.5, y) for x, y in box]
+        other = [(x + 30, y) for x, y in box]
+        self.assertEqual(merge_duplicates([box, moved, other]), [box, other])
+
+    def test_merge_duplicates_of_other_sources(self):
+        outer = [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0)]
+        inner = [(1.0, 1.0), (9.0, 1.0), (9.0, 9.0), (1.0, 9.0)]
+        merged = merge_duplicates([outer, inner, outer, inner], sources=[0, 0, 1, 1])
+        self.assertEqual(merged, [outer, inner])
@@ -0,0 +1,128 @@
+"""Tiled detection
+    This module runs the detection on overlapping tiles of a big page so
+    threshold and findContours only work on one tile at a time.
+
+    Every tile is a core cell of the page grid plus overlap pixels on each
+    side. A box is kept from a tile only when it does not touch an inner
+    tile edge, so the overlap must be bigger than the biggest checkbox.
+    The boxes are moved back to page coordinates and the ones found on
+    more than one tile are merged.
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from boxDetector.checkBoxDetector import iter_filled_contours
+
+Tile = namedtuple("Tile", "left top right bottom")
+
+
+def iter_tiles(width, height, tile_size=1024, overlap=128):
+    """Yield the tiles covering a page
+
+    Args:
+        width (int): page width
+        height (int): page height
+        tile_size (int): size of the core cell of every tile
+        overlap (int): pixels added on each side of the core cell
+    """
+    for top in range(0, height, tile_size):
+        for left in range(0, width, tile_size):
+            yield Tile(max(left - overlap, 0), max(top - overlap, 0),
+                       min(left + tile_size + overlap, width),
+                       min(top + tile_size + overlap, height))
+
+
+def detect_tile(img, tile, params):
+    """Filled boxes of a tile in page coordinates
+
+    Boxes touching an edge of the tile that is not a page edge are cut,
+    they are left to the tile that holds them whole.
+
+    Args:
+        img (ndarray): the whole page
+        tile (Tile): tile bounds
+        params (dict): iter_filled_contours keyword arguments
+    """
+    height, width = img.shape[:2]
+    boxes = []
+    view = img[tile.top:tile.bottom, tile.left:tile.right]
+    for box in iter_filled_contours(view, **params):
+        box = [(x + tile.left, y + tile.top) for x, y in box]
+        xs = [x for x, _ in box]
+        ys = [y for _, y in box]
+        if tile.left > 0 and min(xs) <= tile.left:
+            continue
+        if tile.top > 0 and min(ys) <= tile.top:
+            continue
+        if tile.right < width and max(xs) >= tile.right - 1:
+            continue
+        if tile.bottom < height and max(ys) >= tile.bottom - 1:
+            continue
+        boxes.append(box)
+    return boxes
+
+
+def box_center(box):
+    return (sum(x for x, _ in box)/len(box), sum(y for _, y in box)/len(box))
+
+
+def merge_duplicates(boxes, tolerance=2.0, sources=None):
+    """Keep the first of the boxes with about the same center
+
+    Only boxes of different sources are merged, and a kept box takes at
+    most one box of each other source. The inner and outer outlines of
+    a box found on one tile stay 2 boxes, like on the untiled page.
+
+    Args:
+        boxes (List): boxes as lists of points
+        tolerance (float): max center distance of the same box
+        sources (List): optional source of each box, e.g. its tile, by
+            default every box is its own source
+    """
+    if sources is None:
+        sources = range(len(boxes))
+    kept = []
+    cells = {}
+    matched = set()
+    for box, source in zip(boxes, sources):
+        x, y = box_center(box)
+        cell_x, cell_y = int(x // tolerance), int(y // tolerance)
+        duplicate = None
+        for near_x in (cell_x - 1, cell_x, cell_x + 1):
+            for near_y in (cell_y - 1, cell_y, cell_y + 1):
+                for other_x, other_y, index, other_source in cells.get((near_x, near_y), ()):
+                    if other_source == source or (index, source) in matched:
+                        continue
+                    if (x - other_x)**2 + (y - other_y)**2 <= tolerance**2:
+                        duplicate = index if duplicate is None else min(duplicate, index)
+        if duplicate is not None:
+            matched.add((duplicate, source))
+            continue
+        cells.setdefault((cell_x, cell_y), []).append((x, y, len(kept), source))
+        kept.append(box)
+    return kept
+
+
+def get_filled_contours_tiled(img, tile_size=1024, overlap=128, workers=None, tolerance=2.0, **params):
+    """Filled boxes of a big image processed on overlapping tiles
+
+    Tiles run on a thread pool, at most workers tiles are thresholded at
+    the same time and all of them are views of the same page.
+
+    Args:
+        img (ndarray): BGR, BGRA or grayscale page
+        tile_size (int): size of the core cell of every tile
+        overlap (int): pixels added on each side, bigger than any checkbox
+        workers (int): tiles processed at the same time, 1 runs them in order
+        tolerance (float): max center distance of the same box on 2 tiles
+        params: iter_filled_contours keyword arguments
+    """
+    height, width = img.shape[:2]
+    tiles = list(iter_tiles(width, height, tile_size=tile_size, overlap=overlap))
+    if workers == 1:
+        found = [detect_tile(img, tile, params) for tile in tiles]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            found = list(pool.map(lambda tile: detect_tile(img, tile, params), tiles))
+    sources = [index for index, boxes in enumerate(found) for _ in boxes]
+    return merge_duplicates([box for boxes in found for box in boxes], tolerance=tolerance, sources=sources)